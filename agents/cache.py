@@ -0,0 +1,173 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+from agents.frame import as_frames
+
+
+def normalize_message(message):
+    """
+    normalize prompt message, ignore leading/trailing spaces and repeated whitespaces
+    """
+    return re.sub(r"\s+", " ", message.strip())
+
+
+class ResponseCache:
+    """
+    on-disk content-addressed cache for client responses, with size-bounded LRU eviction
+    each entry is saved as <key>.json in the cache folder, file mtime is used as last access time
+    the folder may be shared by several processes, entries written by others are adopted on lookup,
+    and eviction is based on the folder contents, which are rescanned every rescan_interval writes
+    """
+    def __init__(self, folder_path, max_entries=20000, rescan_interval=100):
+        self.folder_path = folder_path
+        self.max_entries = max_entries
+        self.rescan_interval = rescan_interval
+        self._writes = 0
+
+        # hit and miss counters
+        self.hits = 0
+        self.misses = 0
+
+        # lazily loaded LRU index, key -> last access time
+        self._index = None
+        self._lock = threading.Lock()
+
+
+    def make_key(self, model, message, image_path=None, early_stop=None):
+        """
+        build cache key from model, normalized message and image content hash
+        image_path can be image paths, encoded frames or rgb arrays, so the same frame shares one cache key
+        early_stop is the pattern a streamed response was cut at, truncated responses never answer full requests
+        """
+        content = {
+            "model": model,
+            "message": normalize_message(message),
+            "images": [frame.digest for frame in as_frames(image_path)],
+        }
+        if early_stop is not None:
+            content["early_stop"] = early_stop.pattern
+        content_str = json.dumps(content, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(content_str.encode("utf-8")).hexdigest()
+
+
+    def get(self, key):
+        """
+        return cached response or None, and refresh its access time
+        """
+        with self._lock:
+            self._load_index()
+            # read the entry even if it is not indexed, it may have been written by another process
+            entry_path = self._entry_path(key)
+            try:
+                with open(entry_path, "r", encoding="utf-8") as f:
+                    response = json.load(f)["response"]
+            except (OSError, ValueError, KeyError): # missing, evicted by another process, or broken
+                self._index.pop(key, None)
+                self.misses += 1
+                return None
+
+            # mark as most recently used
+            now = time.time()
+            try:
+                os.utime(entry_path, (now, now))
+            except OSError: # evicted by another process meanwhile
+                pass
+            self._index[key] = now
+            self._index.move_to_end(key)
+            self.hits += 1
+            return response
+
+
+    def set(self, key, response):
+        """
+        save response to cache folder, and evict least recently used entries if necessary
+        """
+        if response is None:
+            return
+        with self._lock:
+            self._load_index()
+
+            # write to a temporary file first so that concurrent readers never see partial entries
+            entry_path = self._entry_path(key)
+            tmp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"response": response}, f, ensure_ascii=False)
+            os.replace(tmp_path, entry_path)
+
+            self._index[key] = time.time()
+            self._index.move_to_end(key)
+            self._evict()
+
+
+    def stats(self):
+        """
+        return hit and miss counters
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total > 0 else 0.0,
+            "entries": len(self._index) if self._index is not None else 0,
+        }
+
+
+    def clear(self):
+        """
+        remove all cached entries
+        """
+        with self._lock:
+            self._load_index()
+            for key in list(self._index.keys()):
+                self._remove(key)
+
+
+    def _entry_path(self, key):
+        return os.path.join(self.folder_path, f"{key}.json")
+
+
+    def _load_index(self):
+        """
+        scan cache folder once, order entries by last access time
+        """
+        if self._index is not None:
+            return
+        os.makedirs(self.folder_path, exist_ok=True)
+        entries = []
+        for file_name in os.listdir(self.folder_path):
+            if not file_name.endswith(".json"):
+                continue
+            file_path = os.path.join(self.folder_path, file_name)
+            try:
+                entries.append((os.path.getmtime(file_path), file_name[:-len(".json")]))
+            except OSError:
+                continue
+        entries.sort()
+        self._index = OrderedDict((key, mtime) for mtime, key in entries)
+
+
+    def _evict(self):
+        """
+        remove least recently used entries of the cache folder, including those written by other processes
+        """
+        self._writes += 1
+        if len(self._index) <= self.max_entries and self._writes % self.rescan_interval != 0:
+            return
+        self._index = None
+        self._load_index()
+        while len(self._index) > self.max_entries:
+            key = next(iter(self._index))
+            self._remove(key)
+
+
+    def _remove(self, key):
+        self._index.pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
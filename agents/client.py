@@ -1,60 +1,103 @@
 import os
-import base64
+import re
+import asyncio
 import requests
 import json
 from openai import OpenAI
 import openai
 
+from agents.cache import ResponseCache
+from agents.frame import as_frame, as_frames
+from agents.transport import TRANSPORT, RetryableError
+from utils.trace_utils import TRACER
+
 # unset all_proxy and ALL_PROXY
 os.environ['all_proxy'] = ""
 os.environ['ALL_PROXY'] = ""
 
+# transient errors retried by the transport with backoff
+RETRYABLE_ERRORS = (
+    RetryableError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    openai.APIConnectionError, # includes openai.APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+# stop streaming as soon as the answer slot ("A: True", or a bare "True" line) is decided, the judgement must be
+# followed by punctuation or another word, so that an echoed "A: <True or False>" template never stops the stream
+TRUE_FALSE_PATTERN = re.compile(
+    r"(?:^|A:)[\s<*]*(true|false)\b(?:[ \t]*[.;,!>*\n]|[ \t]+(?!or\b)[a-z]+\W)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
 
 def encode_image(image_path):
-    # open the image file in binary reading mode
-    with open(image_path, "rb") as image_file:
-        # decode the encoded byte string into a UTF-8 string for use in text environments
-        return base64.b64encode(image_file.read()).decode("utf-8")
+    # image path, encoded frame or rgb array to base64 string, frames are only encoded once
+    return as_frame(image_path).base64
 
 
 class OllamaClient:
     """
     aims to build standard api for Ollama style agent calling
     """
-    def __init__(self, model, url):
+    def __init__(self, model, url, cache=None, transport=None):
         self.url = url
         self.model = model
+        self.cache = cache
+        self.transport = transport or TRANSPORT
     
-    def get_response(self, message, image_path=None):
+    def get_response(self, message, image_path=None, use_cache=True, early_stop=None):
+        """
+        early_stop is a compiled pattern, the stream is closed once the partial response matches it
+        """
+        with TRACER.span("ollama", "client_request", model=self.model) as span_args:
+            return self._get_response(message, image_path, use_cache, early_stop, span_args)
+
+    def _get_response(self, message, image_path, use_cache, early_stop, span_args):
+        frames = as_frames(image_path)
+        
+        # look up response cache first
+        cache_key = None
+        if self.cache is not None and use_cache:
+            cache_key = self.cache.make_key(self.model, message, frames, early_stop=early_stop)
+            response = self.cache.get(cache_key)
+            if response is not None:
+                span_args["cache_hits"] = 1
+                return response
         
         # prepare structured data
-        if image_path != None:
-            base64_image = encode_image(image_path)
+        if len(frames) > 0:
             data = {
                 "model": self.model,
                 "prompt": message,
-                "images": [base64_image]
+                "images": [frame.base64 for frame in frames]
             }
         else:
             data = {
                 "model": self.model,
                 "prompt": message
             }
+        span_args["payload_bytes"] = len(json.dumps(data))
         
-        # get POST response
-        try:
-            with requests.post(url, json=data, stream=True) as response:
-                if response.status_code == 200:
-                    responses = [
-                        json.loads(line.decode('utf-8'))['response']
-                        for line in response.iter_lines() if line
-                        if 'response' in json.loads(line.decode('utf-8'))
-                    ]
-                    complete_response = ''.join(responses)
-                else:
-                    print("Fail request:", response.status_code, response.text)
-        except requests.exceptions.RequestException as e:
-            print("Error in client response:", e)
+        def request():
+            # get POST response, streamed line by line
+            complete_response = ""
+            with self.transport.post(self.url, json=data, stream=True) as response:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    complete_response += json.loads(line.decode('utf-8')).get('response', "")
+                    if early_stop is not None and early_stop.search(complete_response):
+                        break
+            return complete_response
+        
+        complete_response = self.transport.call(request, retryable=RETRYABLE_ERRORS, span_args=span_args)
+        span_args["response_chars"] = len(complete_response)
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, complete_response)
         return complete_response
 
 
@@ -62,47 +105,43 @@ class OpenAIClient:
     """
     aims to build standard api for openai style agent calling
     """
-    def __init__(self, model, api_key, base_url):
+    def __init__(self, model, api_key, base_url, cache=None, transport=None):
         self.model = model
         self.api_key = api_key
         self.base_url = base_url
+        self.cache = cache
+        self.transport = transport or TRANSPORT
         self.client = OpenAI(
             api_key=self.api_key,
             base_url=self.base_url,
-            timeout=1800,
+            timeout=self.transport.timeout,
+            max_retries=0, # retried by the transport with backoff
+            http_client=self.transport.http_client,
         )
     
-    def get_response(self, message, image_path=None):
+    def get_response(self, message, image_path=None, use_cache=True, early_stop=None):
+        """
+        early_stop is a compiled pattern, if given the response is streamed and closed once the partial response matches it
+        """
+        with TRACER.span("openai", "client_request", model=self.model) as span_args:
+            return self._get_response(message, image_path, use_cache, early_stop, span_args)
+
+    def _get_response(self, message, image_path, use_cache, early_stop, span_args):
+        # image paths, encoded frames or rgb arrays, each frame is encoded once and reused by cache key and payload
+        frames = as_frames(image_path)
+        
+        # look up response cache first
+        cache_key = None
+        if self.cache is not None and use_cache:
+            cache_key = self.cache.make_key(self.model, message, frames, early_stop=early_stop)
+            response = self.cache.get(cache_key)
+            if response is not None:
+                span_args["cache_hits"] = 1
+                return response
         
         # prepare structured data
-        if isinstance(image_path, str):
-            base64_image = encode_image(image_path)
-            image_url = f"data:image/jpg;base64,{base64_image}"
-            system_prompt = "You are a speculative visual assistant. "
-            message = [
-                {
-                    "role": "system",
-                    "content": system_prompt
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": message
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": image_url,
-                                "detail": "auto"
-                            }
-                        }
-                    ]
-                }
-            ]
-        elif isinstance(image_path, list):
-            image_urls = [f"data:image/jpg;base64,{encode_image(image_path[i])}" for i in range(len(image_path))]
+        if len(frames) > 0:
+            image_urls = [f"data:image/jpg;base64,{frame.base64}" for frame in frames]
             system_prompt = "You are a speculative visual assistant. "
             message = [
                 {
@@ -141,53 +180,102 @@ class OpenAIClient:
                 }
             ]
         
-        # handle content filter and internal server error
-        for t in range(10):
-            try:
-                # get POST response
+        span_args["payload_bytes"] = len(json.dumps(message))
+        
+        def request():
+            if early_stop is None:
                 chat_completion = self.client.chat.completions.create(
                     model=self.model,
                     messages=message,
                     stream=False
                 )
                 response = chat_completion.choices[0].message.content
-                if response is not None:
-                    break
-                else:
-                    print("Content is None, retry...")
-            except openai.InternalServerError:
-                    print("502 Bad Gateway, retry...")
-                    continue
+                if chat_completion.usage is not None:
+                    span_args["prompt_tokens"] = chat_completion.usage.prompt_tokens
+                    span_args["completion_tokens"] = chat_completion.usage.completion_tokens
+            else:
+                # short structured answer, close the stream as soon as it is decided
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=message,
+                    stream=True
+                )
+                response = ""
+                with stream:
+                    for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            response += chunk.choices[0].delta.content
+                            if early_stop.search(response):
+                                break
+            
+            # handle content filter
+            if not response:
+                raise RetryableError("content is None")
+            return response
+        
+        response = self.transport.call(request, retryable=RETRYABLE_ERRORS, span_args=span_args)
 
+        if cache_key is not None:
+            self.cache.set(cache_key, response)
         return response
+    
+    async def get_response_async(self, message, image_path=None, use_cache=True, early_stop=None):
+        """
+        awaitable variant of get_response, run the blocking request in a worker thread
+        so that several requests can be in flight at the same time
+        """
+        return await asyncio.to_thread(self.get_response, message, image_path, use_cache, early_stop)
 
 
 class ReasonClient:
     """
     aims to build standard api calling for reasoning agent
     """
-    def __init__(self, model, api_key, base_url):
+    def __init__(self, model, api_key, base_url, cache=None, transport=None):
         self.model = model
         self.api_key = api_key
         self.base_url = base_url
+        self.cache = cache
+        self.transport = transport or TRANSPORT
         self.client = OpenAI(
             api_key=self.api_key,
             base_url=self.base_url,
-            timeout=1800,
+            timeout=self.transport.timeout, # read timeout applies between streamed chunks
+            max_retries=0, # retried by the transport with backoff
+            http_client=self.transport.http_client,
         )
     
-    def get_response(self, message, verbose=False):
+    def get_response(self, message, verbose=False, use_cache=True):
         """
         use stream 
         """
-        try:
+        with TRACER.span("reason", "client_request", model=self.model) as span_args:
+            return self._get_response(message, verbose, use_cache, span_args)
+
+    def _get_response(self, message, verbose, use_cache, span_args):
+        # look up response cache first
+        cache_key = None
+        if self.cache is not None and use_cache:
+            cache_key = self.cache.make_key(self.model, message)
+            response = self.cache.get(cache_key)
+            if response is not None:
+                if verbose:
+                    print()
+                    print("--- Cached Response ---")
+                    print(response)
+                span_args["cache_hits"] = 1
+                return response
+        span_args["payload_bytes"] = len(message.encode("utf-8"))
+        
+        def request():
             # initiate streaming requests
             stream = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "user", "content": message}
                 ],
-                stream=True  # enable streaming output
+                stream=True,  # enable streaming output
+                stream_options={"include_usage": True},
             )
 
             full_response = ""
@@ -196,24 +284,43 @@ class ReasonClient:
                 print("--- Start of Response ---")
 
             # gradually output response content
-            for chunk in stream:
-                if hasattr(chunk.choices[0].delta, 'reasoning_content') and chunk.choices[0].delta.reasoning_content:
-                    if verbose:
-                        print(chunk.choices[0].delta.reasoning_content, end="", flush=True)
-                if chunk.choices[0].delta.content:
-                    if verbose:
-                        print(chunk.choices[0].delta.content, end="", flush=True)
-                    full_response += chunk.choices[0].delta.content
+            with stream:
+                for chunk in stream:
+                    # usage is reported in the last chunk, which has no choices
+                    if getattr(chunk, "usage", None) is not None:
+                        span_args["prompt_tokens"] = chunk.usage.prompt_tokens
+                        span_args["completion_tokens"] = chunk.usage.completion_tokens
+                    if not chunk.choices:
+                        continue
+                    if hasattr(chunk.choices[0].delta, 'reasoning_content') and chunk.choices[0].delta.reasoning_content:
+                        if verbose:
+                            print(chunk.choices[0].delta.reasoning_content, end="", flush=True)
+                    if chunk.choices[0].delta.content:
+                        if verbose:
+                            print(chunk.choices[0].delta.content, end="", flush=True)
+                        full_response += chunk.choices[0].delta.content
             
             if verbose:
                 print()
                 print("--- End of Response ---")
 
+            if not full_response:
+                raise RetryableError("content is empty")
             return full_response
 
-        except Exception as e:
-            print(f"Request failed: {e}")
+        full_response = self.transport.call(request, retryable=RETRYABLE_ERRORS, span_args=span_args)
+        span_args["response_chars"] = len(full_response)
+        if cache_key is not None:
+            self.cache.set(cache_key, full_response)
+        return full_response
+
 
+### Response cache shared by all clients ###
+
+RESPONSE_CACHE = ResponseCache(
+    folder_path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cache", "response"),
+    max_entries=20000,
+)
 
 ### Ollama API client ###
 
@@ -224,7 +331,8 @@ model = "deepseek-r1:70b"
 
 OLLAMA_CLIENT = OllamaClient(
     url=url, 
-    model=model
+    model=model,
+    cache=RESPONSE_CACHE,
 )
 
 ### Openai API client ###
@@ -235,6 +343,7 @@ OPENAI_CLIENT = OpenAIClient(
     model=model,
     api_key=api_key,
     base_url=base_url,
+    cache=RESPONSE_CACHE,
 )
 
 ### Reason client ###
@@ -245,6 +354,7 @@ REASON_CLIENT = ReasonClient(
     model=model,
     api_key=api_key,
     base_url=base_url,
+    cache=RESPONSE_CACHE,
 )
 
 
@@ -0,0 +1,117 @@
+import re
+
+import robocasa.utils.checker as checker
+import robocasa.utils.controller_dict as CD
+
+
+# verb prefix in checker name or controller command -> state words used in condition sentences
+STATE_WORDS = {
+    "open": ["open", "opened"],
+    "close": ["closed", "close"],
+    "turn on": ["turned on", "on", "switched on"],
+    "turn off": ["turned off", "off", "switched off"],
+}
+
+# common misspellings produced by the condition generator
+SUBJECT_ALIASES = {
+    "fauset": "faucet",
+}
+
+
+def normalize_condition(condition):
+    """
+    lower case, strip trailing period and repeated whitespaces
+    """
+    condition = re.sub(r"\s+", " ", condition.strip().lower()).rstrip(".").strip()
+    for alias, name in SUBJECT_ALIASES.items():
+        condition = re.sub(rf"\b{alias}\b", name, condition)
+    return condition
+
+
+def split_verb(phrase):
+    """
+    split 'turn on stove' or 'turn_on_stove' into verb 'turn on' and subject 'stove'
+    """
+    phrase = phrase.replace("_", " ").strip()
+    for verb in sorted(STATE_WORDS.keys(), key=len, reverse=True):
+        if phrase.startswith(verb + " "):
+            return verb, phrase[len(verb):].strip()
+    return None, None
+
+
+class ConditionResolver:
+    """
+    resolve condition sentences to ground truth checker calls without querying LLM
+    the grammar is derived from robocasa.utils.checker.ALL_CHECKERS and the controller_dict commands
+    """
+    def __init__(self):
+        self.state_checkers = {} # (subject, state word) -> checker function
+        self.bindings = {} # (normalized condition, robot id) -> callable(env, obs), or None if unresolvable
+
+        # fixture state checkers, e.g. open_microwave_door_checker -> the microwave door is open
+        for checker_name in checker.ALL_CHECKERS.split(", "):
+            verb, subject = split_verb(checker_name[:-len("_checker")])
+            if verb is not None:
+                self._add_state_checker(verb, subject, getattr(checker, checker_name))
+
+        # policy commands with a success checker, e.g. 'turn on faucet' -> turn_on_faucet_checker
+        for key, config in CD.controller_dict.items():
+            if config.get("checker") is None:
+                continue
+            verb, subject = split_verb(key)
+            if verb is not None:
+                self._add_state_checker(verb, subject, config["checker"])
+
+        subjects = "|".join(sorted({re.escape(subject) for subject, _ in self.state_checkers}, key=len, reverse=True))
+        states = "|".join(sorted({re.escape(word) for words in STATE_WORDS.values() for word in words}, key=len, reverse=True))
+        self.state_pattern = re.compile(rf"^(?:the )?({subjects}) is ({states})$")
+        self.not_hold_pattern = re.compile(r"^(?:the )?gripper is not holding(?: anything| something)?$")
+        self.hold_pattern = re.compile(r"^(?:the )?gripper is holding(?: something| anything)?$")
+        self.hold_obj_pattern = re.compile(r"^(?:the )?gripper is holding (?:the |a |an )?([a-z0-9_]+)$")
+        self.location_pattern = re.compile(r"^there is (?:a |an |the )?([a-z0-9_]+) in the image$")
+
+
+    def _add_state_checker(self, verb, subject, checker_fn):
+        subject = subject.replace("_", " ")
+        for state in STATE_WORDS[verb]:
+            self.state_checkers.setdefault((subject, state), checker_fn)
+
+
+    def resolve(self, condition, id=0):
+        """
+        return a callable(env, obs) evaluating the condition, or None if the sentence cannot be parsed
+        resolved bindings are memoized per condition sentence and robot id
+        """
+        key = (normalize_condition(condition), id)
+        if key not in self.bindings:
+            self.bindings[key] = self._compile(key[0], id)
+        return self.bindings[key]
+
+
+    def _compile(self, condition, id):
+        if self.not_hold_pattern.match(condition):
+            return lambda env, obs: checker.not_hold_checker(env, id=id)
+
+        if self.hold_pattern.match(condition):
+            return lambda env, obs: checker.hold_checker(env, id=id)
+
+        match = self.hold_obj_pattern.match(condition)
+        if match:
+            obj = match.group(1)
+            return lambda env, obs: checker.hold_checker(env, obj, id=id)
+
+        match = self.location_pattern.match(condition)
+        if match:
+            target = match.group(1)
+            return lambda env, obs: checker.location_checker(env, obs, target, id=id)
+
+        match = self.state_pattern.match(condition)
+        if match:
+            checker_fn = self.state_checkers.get((match.group(1), match.group(2)))
+            if checker_fn is not None:
+                return lambda env, obs: checker_fn(env)
+
+        return None
+
+
+CONDITION_RESOLVER = ConditionResolver()
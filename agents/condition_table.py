@@ -0,0 +1,160 @@
+import os
+import re
+import json
+import threading
+
+import robocasa
+import robocasa.utils.controller_dict as CD
+
+from utils.file_utils import file_lock
+
+BASE_PATH = os.path.abspath(robocasa.__file__ + '/../../../')
+
+# fixtures that need a container placed on them first when the environment provides one
+CONTEXT_CONTAINERS = {
+    "sink": "bowl",
+    "stove": "pan",
+}
+
+
+def split_command(task):
+    """
+    split task into controller_dict command prefix and argument, e.g. 'place to sink' -> ('place to', 'sink')
+    return (None, None) if task cannot match any controller
+    """
+    task = task.strip().rstrip(".").strip()
+    for key in CD.controller_dict.keys():
+        if task.startswith(key):
+            return key, task.replace(key, "", 1).strip()
+    return None, None
+
+
+def get_condition_context(task, env_info, history_execution):
+    """
+    context rule of the condition, e.g. the fish should be placed to the bowl in sink if a bowl is available
+    """
+    prefix, argument = split_command(task)
+    if prefix != "place to" or argument not in CONTEXT_CONTAINERS:
+        return ""
+    container = CONTEXT_CONTAINERS[argument]
+    if container not in env_info:
+        return ""
+    for execution in reversed(history_execution):
+        # get last pick up to infer what object the agent is holding
+        if execution.startswith("pick up"):
+            if execution == f"pick up {container}":
+                return ""
+            return f"{container} on {argument}" # holding other things
+    return ""
+
+
+class ConditionTable:
+    """
+    pre/post-condition table keyed by controller_dict command prefix, argument and context rule
+    seeded from few-shot examples, extended with LLM answers and persisted to a json file
+    seeds are kept in memory only and win over stored entries, so edited examples take effect on the next run
+    the file may be shared by several worker processes, it is merged with the entries of this process on save
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.table = {"pre": {}, "post": {}} # entries of the file and recorded by this process
+        self._seeds = {"pre": {}, "post": {}} # few-shot examples, never written to the file
+        self._recorded = {"pre": {}, "post": {}} # entries recorded by this process, they win over the file on save
+        self._lock = threading.Lock()
+
+        with self._lock:
+            data = self._read()
+            for kind in self.table:
+                self.table[kind].update(data.get(kind, {}))
+
+
+    def _read(self):
+        """
+        read the table file, or an empty table if it does not exist yet
+        """
+        if not os.path.exists(self.file_path):
+            return {}
+        with file_lock(self.file_path):
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                try:
+                    return json.load(f)
+                except json.JSONDecodeError: # handle empty json file
+                    return {}
+
+
+    @staticmethod
+    def make_key(task, context=""):
+        prefix, argument = split_command(task)
+        if prefix is None:
+            return None
+        return f"{prefix}|{argument}|{context}"
+
+
+    def lookup(self, kind, task, context=""):
+        """
+        return stored condition for the task, or None if LLM should be called
+        """
+        key = self.make_key(task, context)
+        if key is None:
+            return None
+        seed = self._seeds[kind].get(key)
+        if seed is not None:
+            return seed
+        return self.table[kind].get(key)
+
+
+    def seed(self, kind, examples, context_fn=None):
+        """
+        add few-shot examples with format 'Q: Task name: <task>.\\nA: <condition>' as in-memory table entries
+        """
+        pairs = re.findall(r"Q: Task name: (.*?)\.?\s*\nA: (.*)", examples)
+        with self._lock:
+            for task, condition in pairs:
+                context = context_fn(task) if context_fn is not None else ""
+                key = self.make_key(task, context)
+                if key is not None and condition.strip():
+                    self._seeds[kind][key] = condition.strip()
+
+
+    def record(self, kind, task, condition, context=""):
+        """
+        save LLM generated condition and persist the table
+        """
+        key = self.make_key(task, context)
+        if key is None or not condition:
+            return
+        with self._lock:
+            if key in self._seeds[kind] or self.table[kind].get(key) == condition:
+                return
+            self.table[kind][key] = condition
+            self._recorded[kind][key] = condition
+            self.save()
+
+
+    def save(self):
+        """
+        merge the table file with the entries recorded by this process under the file lock,
+        write it to a temporary file first, then replace the original one. called with self._lock held
+        """
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        with file_lock(self.file_path):
+            data = {}
+            if os.path.exists(self.file_path):
+                with open(self.file_path, "r", encoding="utf-8") as f:
+                    try:
+                        data = json.load(f)
+                    except json.JSONDecodeError: # handle empty json file
+                        data = {}
+            for kind in self.table:
+                # adopt entries written by other processes, entries recorded by this process win
+                merged = dict(data.get(kind, {}))
+                merged.update(self._recorded[kind])
+                self.table[kind] = merged
+
+            tmp_path = f"{self.file_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.table, f, indent=4, ensure_ascii=False)
+            os.replace(tmp_path, self.file_path)
+
+
+CONDITION_TABLE = ConditionTable(os.path.join(BASE_PATH, "memory", "condition_table.json"))
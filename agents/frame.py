@@ -0,0 +1,93 @@
+import os
+import io
+import base64
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+
+class EncodedFrame:
+    """
+    rendered frame encoded as JPEG once, the same encoding is shared by VLM requests, response cache and disk sink
+    """
+    def __init__(self, data, name=None):
+        self.data = data # jpeg bytes
+        self.name = name
+        self.base64 = base64.b64encode(data).decode("utf-8")
+        self.digest = hashlib.sha256(data).hexdigest()
+
+
+    @classmethod
+    def from_array(cls, frame, name=None):
+        """
+        encode rgb array returned by env.render
+        """
+        buffer = io.BytesIO()
+        Image.fromarray(frame).save(buffer, format="JPEG")
+        return cls(buffer.getvalue(), name=name)
+
+
+    @classmethod
+    def from_path(cls, image_path):
+        with open(image_path, "rb") as image_file:
+            return cls(image_file.read(), name=image_path)
+
+
+def as_frame(image):
+    """
+    convert image path, encoded bytes or rgb array to EncodedFrame
+    """
+    if isinstance(image, EncodedFrame):
+        return image
+    if isinstance(image, str):
+        return EncodedFrame.from_path(image)
+    if isinstance(image, (bytes, bytearray)):
+        return EncodedFrame(bytes(image))
+    return EncodedFrame.from_array(image)
+
+
+def as_frames(image_path):
+    """
+    convert None, a single image or a list of images to a list of EncodedFrame
+    """
+    if image_path is None:
+        return []
+    if isinstance(image_path, (list, tuple)):
+        return [as_frame(image) for image in image_path]
+    return [as_frame(image_path)]
+
+
+class FrameSink:
+    """
+    write encoded frames to disk in a background thread, so that saving frames is off the critical path
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self._futures = []
+
+
+    def write(self, frame, file_path):
+        if not self.enabled:
+            return
+        self._futures.append(self.executor.submit(self._write, frame.data, file_path))
+
+
+    @staticmethod
+    def _write(data, file_path):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as f:
+            f.write(data)
+
+
+    def flush(self):
+        """
+        wait until all pending frames are written, raise the first write error if any
+        """
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+
+FRAME_SINK = FrameSink()
@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import time
+import glob
+import sqlite3
+import hashlib
+import threading
+
+import robocasa
+
+BASE_PATH = os.path.abspath(robocasa.__file__ + '/../../../')
+
+# record kinds, saved in memory/<task>.json and memory/<task>_twoagent.json before the store was introduced
+KIND_SUFFIXES = {
+    "oneagent": "",
+    "twoagent": "_twoagent",
+}
+
+
+def env_fingerprint(env_info):
+    """
+    hash of env_info ignoring whitespaces, interactions in the same environment share the fingerprint
+    """
+    env_info = re.sub(r"\s+", " ", (env_info or "").strip())
+    return hashlib.sha1(env_info.encode("utf-8")).hexdigest()
+
+
+class MemoryStore:
+    """
+    append-only sqlite store of agent interactions, indexed by task, kind, result, episode and env_info fingerprint
+    sqlite WAL journal keeps appends crash-safe with several rollout processes writing at once
+    legacy memory/<task>.json files are migrated on first access of the task
+    """
+    def __init__(self, db_path, legacy_folder_path=None):
+        self.db_path = db_path
+        self.legacy_folder_path = legacy_folder_path if legacy_folder_path is not None else os.path.dirname(db_path)
+        self._local = threading.local() # one connection per thread
+        self._migrated = set()
+
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS interactions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    result TEXT,
+                    env_fingerprint TEXT,
+                    episode TEXT,
+                    created REAL NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_interactions_task ON interactions (task, kind, result);
+                CREATE INDEX IF NOT EXISTS idx_interactions_env ON interactions (env_fingerprint);
+                CREATE TABLE IF NOT EXISTS migrations (
+                    file_name TEXT PRIMARY KEY,
+                    records INTEGER NOT NULL,
+                    migrated REAL NOT NULL
+                );
+            """)
+            # stores created before records were keyed by episode
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(interactions)")]
+            if "episode" not in columns:
+                conn.execute("ALTER TABLE interactions ADD COLUMN episode TEXT")
+                conn.execute("UPDATE interactions SET episode = json_extract(data, '$.episode')")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_interactions_episode ON interactions (task, kind, episode)")
+
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+    def append(self, task, record, kind="oneagent"):
+        """
+        append one interaction record, return its id
+        """
+        self.migrate(task, kind)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO interactions (task, kind, result, env_fingerprint, episode, created, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (task, kind, record.get("result"), env_fingerprint(record.get("env_info")), record.get("episode"), time.time(), json.dumps(record, ensure_ascii=False)),
+            )
+            return cursor.lastrowid
+
+
+    def replace(self, task, record, kind="oneagent"):
+        """
+        replace the interaction record of the same episode (record["episode"]), append if there is none
+        records of other episodes of the task, e.g. written by other workers in the meantime, are left untouched
+        """
+        self.migrate(task, kind)
+        episode = record.get("episode")
+        if episode is None:
+            return self.append(task, record, kind)
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM interactions WHERE task = ? AND kind = ? AND episode = ? ORDER BY id DESC LIMIT 1",
+                (task, kind, episode),
+            ).fetchone()
+            if row is None:
+                cursor = conn.execute(
+                    "INSERT INTO interactions (task, kind, result, env_fingerprint, episode, created, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (task, kind, record.get("result"), env_fingerprint(record.get("env_info")), episode, time.time(), json.dumps(record, ensure_ascii=False)),
+                )
+                return cursor.lastrowid
+            conn.execute(
+                "UPDATE interactions SET result = ?, env_fingerprint = ?, data = ? WHERE id = ?",
+                (record.get("result"), env_fingerprint(record.get("env_info")), json.dumps(record, ensure_ascii=False), row[0]),
+            )
+            return row[0]
+
+
+    def query(self, task, kind="oneagent", result=None, env_info=None, limit=None, latest_first=False):
+        """
+        return interaction records of the task in insertion order, optionally filtered by result and env_info
+        """
+        self.migrate(task, kind)
+        sql = "SELECT data FROM interactions WHERE task = ? AND kind = ?"
+        params = [task, kind]
+        if result is not None:
+            sql += " AND result = ?"
+            params.append(result)
+        if env_info is not None:
+            sql += " AND env_fingerprint = ?"
+            params.append(env_fingerprint(env_info))
+        sql += " ORDER BY id DESC" if latest_first else " ORDER BY id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._connect().execute(sql, params).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+    def count(self, task, kind="oneagent", result=None):
+        self.migrate(task, kind)
+        sql = "SELECT COUNT(*) FROM interactions WHERE task = ? AND kind = ?"
+        params = [task, kind]
+        if result is not None:
+            sql += " AND result = ?"
+            params.append(result)
+        return self._connect().execute(sql, params).fetchone()[0]
+
+
+    def migrate(self, task, kind="oneagent"):
+        """
+        import legacy memory/<task>.json (or <task>_twoagent.json) once, the json file is left untouched
+        """
+        file_name = f"{task}{KIND_SUFFIXES[kind]}.json"
+        if file_name in self._migrated:
+            return
+        file_path = os.path.join(self.legacy_folder_path, file_name)
+        if os.path.exists(file_path):
+            with open(file_path, "r", encoding="utf-8") as f:
+                try:
+                    data = json.load(f)
+                except json.JSONDecodeError: # handle empty json file
+                    data = []
+            if not isinstance(data, list):
+                data = [data]
+
+            # check and insert in one transaction, so concurrent processes migrate a file only once
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                done = conn.execute("SELECT 1 FROM migrations WHERE file_name = ?", (file_name,)).fetchone()
+                if done is None:
+                    now = time.time()
+                    conn.executemany(
+                        "INSERT INTO interactions (task, kind, result, env_fingerprint, episode, created, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        [(task, kind, item.get("result"), env_fingerprint(item.get("env_info")), item.get("episode"), now, json.dumps(item, ensure_ascii=False)) for item in data],
+                    )
+                    conn.execute("INSERT INTO migrations (file_name, records, migrated) VALUES (?, ?, ?)", (file_name, len(data), now))
+        self._migrated.add(file_name)
+
+
+    def migrate_all(self):
+        """
+        import all legacy memory files in the legacy folder
+        """
+        for file_path in sorted(glob.glob(os.path.join(self.legacy_folder_path, "*.json"))):
+            name = os.path.basename(file_path)[:-len(".json")]
+            if name == "condition_table":
+                continue
+            if name.endswith(KIND_SUFFIXES["twoagent"]):
+                self.migrate(name[:-len(KIND_SUFFIXES["twoagent"])], "twoagent")
+            else:
+                self.migrate(name, "oneagent")
+
+
+MEMORY_STORE = MemoryStore(os.path.join(BASE_PATH, "memory", "memory.db"))
+
+
+if __name__ == "__main__":
+    MEMORY_STORE.migrate_all()
+    rows = MEMORY_STORE._connect().execute(
+        "SELECT task, kind, COUNT(*) FROM interactions GROUP BY task, kind ORDER BY task"
+    ).fetchall()
+    for task, kind, num in rows:
+        print(f"{task} ({kind}): {num} interactions")
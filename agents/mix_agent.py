@@ -2,6 +2,7 @@ import os
 import sys
 import openai
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pprint import pprint
 from termcolor import colored
 
@@ -13,6 +14,7 @@ import base64
 
 import robocasa
 import robocasa.utils.checker as checker
+import robocasa.utils.controller_dict as CD
 from robocasa.utils.checker import * # import all checkers
 
 BASE_PATH = os.path.abspath(robocasa.__file__ + '/../../../')
@@ -20,8 +22,20 @@ sys.path.append(BASE_PATH)
 os.chdir(BASE_PATH)
 
 from agents.client import OPENAI_CLIENT as CLIENT
+from agents.client import TRUE_FALSE_PATTERN
+from agents.frame import as_frame
+from agents.condition_resolver import CONDITION_RESOLVER
+from agents.condition_table import CONDITION_TABLE, get_condition_context
+from agents.memory_store import MEMORY_STORE
+from agents.plan_cache import PLAN_CACHE
 
 import utils
+from utils.trace_utils import traced
+
+# shared by all agents of the process, vlm checks and condition judgements are sent concurrently,
+# speculation prepares the next subtask while the current one executes
+CHECK_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+SPECULATION_EXECUTOR = ThreadPoolExecutor(max_workers=2)
 
 class MixAgent:
     """
@@ -43,6 +57,11 @@ class MixAgent:
         self.view = view
         self.task_name = task_name
         self.client = CLIENT
+        self.condition_resolver = CONDITION_RESOLVER
+        self.condition_table = CONDITION_TABLE
+        self.memory_store = MEMORY_STORE
+        self.plan_cache = PLAN_CACHE
+        self.plan_replay = None # None, "replayed" or "rejected"
         
         # initialize some histories
         self.history_plan = []
@@ -62,8 +81,17 @@ class MixAgent:
             "the microwave is turned",
         ]
         self.vlm_checks = []
+        
+        # send all vlm clauses of one condition in a single request, so that the images are uploaded once
+        self.batch_vlm_checks = True
+        
+        # prepare conditions and controller of the next subtask while the current one executes
+        self.speculative_planning = True
+        self.speculation = None
+        self.rejected_plan = None # deleted invalid plan, never committed again
     
     
+    @traced("llm_planning")
     def get_initial_plan(self, verbose=False):
         """
         call the self.client to output initial plan based on self.goal and self.env_info
@@ -150,7 +178,8 @@ Q:
 A: Plan: [<(new) command0>, <command1>, ...]
 """.strip()
         
-        content = self.client.get_response(message=message)
+        # planning is re-queried after invalid commands, so never reuse cached plans
+        content = self.client.get_response(message=message, use_cache=False)
         
         plan_str = utils.extract_content(content, filter="A:")
         if verbose:
@@ -163,11 +192,94 @@ A: Plan: [<(new) command0>, <command1>, ...]
         return plan
     
     
+    def replay_plan(self, kind="oneagent"):
+        """
+        return known-good initial plan for the same goal and environment from plan cache, or None to call the planner
+        the cached plan is replayed only once, a second call means it could not be executed
+        """
+        if self.plan_replay == "replayed":
+            self.plan_cache.record(kind, self.task_name, self.goal, self.env_info, success=False)
+            self.plan_replay = "rejected"
+        if self.plan_replay is not None:
+            return None
+        plan = self.plan_cache.lookup(kind, self.task_name, self.goal, self.env_info)
+        if plan is not None:
+            self.plan_replay = "replayed"
+            print(colored("Replay cached plan: {}".format(plan), "yellow"))
+        return plan
+    
+    
+    def record_plan_outcome(self, success, plan=None, kind="oneagent"):
+        """
+        track confidence of a replayed plan, and remember the plan of a successful interaction
+        """
+        if success or self.plan_replay == "replayed":
+            self.plan_cache.record(kind, self.task_name, self.goal, self.env_info, success, plan)
+    
+    
+    def speculate(self):
+        """
+        while the current subtask executes, generate its post-condition and the pre-condition of the next subtask,
+        and read the checkpoint of the next subtask, they are reused from the condition table and caches once it ends
+        """
+        if not self.speculative_planning or len(self.history_plan) == 0:
+            return
+        self.join_speculation()
+        plan = list(self.history_plan[-1])
+        self.speculation = SPECULATION_EXECUTOR.submit(self._speculate, plan)
+    
+    
+    def _speculate(self, plan):
+        next_task = plan[1] if len(plan) > 1 else 'wait'
+        CD.warmup_controller(next_task, CD.controller_dict)
+        self.get_post_condition(plan[0])
+        self.get_pre_condition(next_task)
+    
+    
+    def join_speculation(self):
+        """
+        wait for the running speculation, a failed one only means that conditions are generated again when checked
+        """
+        speculation = self.speculation
+        if speculation is None:
+            return
+        try:
+            speculation.result()
+        except Exception as e:
+            print(colored("Speculation failed ({}: {})".format(type(e).__name__, e), "yellow"))
+        self.speculation = None
+    
+    
+    def speculative_plan(self):
+        """
+        return plan[1:] of the previous plan if both check results are satisfied, as the planner is asked to output exactly this,
+        otherwise None, the speculation is discarded and the planner is called
+        """
+        if not self.speculative_planning or len(self.history_plan[-1]) < 2:
+            return None
+        plan = self.history_plan[-1][1:]
+        if plan == self.rejected_plan:
+            return None
+        if "is satisfied" in self.history_post_check_results[-1] and "is satisfied" in self.history_pre_check_results[-1]:
+            return plan
+        return None
+    
+    
+    @traced("llm_planning")
     def get_plan(self, verbose=False):
         """
         call the self.client to output new plan and command based on last step and relevant check results
         """
 
+        # commit speculated plan without calling the planner when both conditions are satisfied
+        plan = self.speculative_plan()
+        if plan is not None:
+            if verbose:
+                print(f"Plan: [{', '.join(plan)}]")
+            self.history_plan.append(plan)
+            self.history_execution.append(plan[0])
+            return plan
+
         # few-shot examples
         examples = f"""
 Q:
@@ -273,7 +385,8 @@ Q:
 A: Plan: [<(new) command0>, <command1>, ...]
 """.strip()
         
-        content = self.client.get_response(message=message)
+        # planning is re-queried after invalid commands, so never reuse cached plans
+        content = self.client.get_response(message=message, use_cache=False)
 
         plan_str = utils.extract_content(content, filter="A:")
         if verbose:
@@ -290,6 +403,7 @@ A: Plan: [<(new) command0>, <command1>, ...]
         """
         delete last plan and execution in case of invalid action generated
         """
+        self.rejected_plan = self.history_plan[-1]
         del self.history_plan[-1]
         del self.history_execution[-1]
     
@@ -298,6 +412,7 @@ A: Plan: [<(new) command0>, <command1>, ...]
         """
         check whether current observation satisfies the pre-condition
         """
+        self.join_speculation()
         # get pre-condition and judgement
         if verbose:
             print()
@@ -308,7 +423,13 @@ A: Plan: [<(new) command0>, <command1>, ...]
         pre_judgement = self.flexible_check(image_path, env, obs, pre_condition, verbose=False)
         if verbose:
             print(f"Pre-condition judgement: {pre_judgement}")
-        
+        return self.judge_pre_condition(task, pre_condition, pre_judgement, verbose)
+    
+    
+    def judge_pre_condition(self, task, pre_condition, pre_judgement, verbose=False):
+        """
+        output the pre-condition checking result from the judgement of each clause
+        """
         # get pre-condition checking result
         examples = f"""
 Q:
@@ -413,6 +534,7 @@ or Pre-condition is satisfied.
         """
         check whether current observation satisfies the post-condition
         """
+        self.join_speculation()
         # get post-condition and judgement
         if verbose:
             print()
@@ -423,7 +545,13 @@ or Pre-condition is satisfied.
         post_judgement = self.flexible_check(image_path, env, obs, post_condition, verbose=False)
         if verbose:
             print(f"Post-condition judgement: {post_judgement}")
-        
+        return self.judge_post_condition(task, post_condition, post_judgement, verbose)
+    
+    
+    def judge_post_condition(self, task, post_condition, post_judgement, verbose=False):
+        """
+        output the post-condition checking result from the judgement of each clause
+        """
         # get post-condition checking result
         examples = f"""
 Q:
@@ -518,44 +646,225 @@ or Post-condition is satisfied.
         return post_check_result
 
     
+    def check_conditions(self, image_path, env, obs, task, next_task, verbose=False):
+        """
+        check post-condition of current task and pre-condition of next task concurrently,
+        both checks use the same observation, and the same image encoding.
+        only the llm/vlm requests run concurrently, ground truth checks read the simulation in the calling thread
+        """
+        checks = self.prepare_condition_checks(image_path, task, next_task)
+        self.collect_condition_checks(checks, env, obs, verbose)
+        return self.judge_conditions(checks, verbose)
+    
+    
+    def prepare_condition_checks(self, image_path, task, next_task):
+        """
+        generate the post-condition of task and the pre-condition of next_task, and send their vlm clauses,
+        does not read the simulation, so that it can run in any thread
+        """
+        self.join_speculation()
+        image_path = self.encode_image(image_path)
+        post_condition_future = CHECK_EXECUTOR.submit(self.get_post_condition, task)
+        pre_condition = self.get_pre_condition(next_task)
+        post_condition = post_condition_future.result()
+        return dict(
+            task=task,
+            next_task=next_task,
+            post_condition=post_condition,
+            pre_condition=pre_condition,
+            post_checks=self.submit_vlm_checks(image_path, post_condition),
+            pre_checks=self.submit_vlm_checks(image_path, pre_condition),
+        )
+    
+    
+    def collect_condition_checks(self, checks, env, obs, verbose=False):
+        """
+        judge each clause of the prepared conditions, ground truth clauses run in the calling thread
+        """
+        checks["post_judgement"] = self.collect_checks(checks["post_checks"], env, obs)
+        checks["pre_judgement"] = self.collect_checks(checks["pre_checks"], env, obs)
+        if verbose:
+            print()
+            print(f"Agent {self.id}'s current task: {checks['task']}")
+            print(f"Post-condition: {checks['post_condition']}")
+            print(f"Post-condition judgement: {checks['post_judgement']}")
+            print(f"Agent {self.id}'s next task: {checks['next_task']}")
+            print(f"Pre-condition: {checks['pre_condition']}")
+            print(f"Pre-condition judgement: {checks['pre_judgement']}")
+    
+    
+    def judge_conditions(self, checks, verbose=False):
+        """
+        output the post-check and pre-check results of the collected checks, both requests are sent concurrently
+        """
+        post_future = CHECK_EXECUTOR.submit(
+            self.judge_post_condition, checks["task"], checks["post_condition"], checks["post_judgement"], verbose
+        )
+        pre_check_result = self.judge_pre_condition(
+            checks["next_task"], checks["pre_condition"], checks["pre_judgement"], verbose
+        )
+        post_check_result = post_future.result()
+        
+        return post_check_result, pre_check_result
+    
+    
     def flexible_check(self, image_path, env, obs, condition, verbose=False):
         """
         Flexible check function that uses VLM or ground truth based on the specified checks.
         
-        :param image_path: Path to the image for VLM check.
+        :param image_path: Path, encoded frame or rgb array of the image(s) for VLM check.
         :param env: Environment object for ground truth check.
         :param obs: Observation object for ground truth check.
         :param condition: The condition to check.
         :return: List of results for each condition.
         """
-        
+        checks = self.submit_vlm_checks(image_path, condition)
+        results = self.collect_checks(checks, env, obs)
+        if verbose:
+            pprint(checks["results"])
+        return results
+    
+    
+    def submit_vlm_checks(self, image_path, condition):
+        """
+        split condition into clauses and send the vlm clauses, return the pending checks for collect_checks
+        """
         no_need_checks = tuple(self.no_need_checks)
         ground_truth_checks = tuple(self.ground_truth_checks)
-        vlm_checks = tuple(self.vlm_checks)
+        image_path = self.encode_image(image_path)
 
         results = {}
+        ground_truth_conds = []
+        vlm_conds = []
         for cond in condition.split('; '):
             if cond.startswith(no_need_checks):
                 results[cond] = "True"
             elif cond.startswith(ground_truth_checks):
-                results[cond] = self.ground_truth_check(env, obs, cond)
-            else:
+                results[cond] = None # placeholder to keep clause order
+                ground_truth_conds.append(cond)
+            elif cond not in results:
                 # Default to VLM if not specified
-                results[cond] = self.vlm_check(image_path, cond)
-            
-        if verbose:
-            pprint(results)
-            
-        results = "; ".join(results.values())
-        return results
+                results[cond] = None
+                vlm_conds.append(cond)
+        
+        # batched request for several vlm clauses, or one request per clause
+        batch_future = None
+        vlm_futures = {}
+        if self.batch_vlm_checks and len(vlm_conds) > 1:
+            batch_future = CHECK_EXECUTOR.submit(self.vlm_check_batch, image_path, vlm_conds)
+        else:
+            vlm_futures = {cond: CHECK_EXECUTOR.submit(self.vlm_check, image_path, cond) for cond in vlm_conds}
+        
+        return dict(
+            image_path=image_path,
+            results=results,
+            ground_truth_conds=ground_truth_conds,
+            vlm_conds=vlm_conds,
+            batch_future=batch_future,
+            vlm_futures=vlm_futures,
+        )
+    
+    
+    def collect_checks(self, checks, env, obs):
+        """
+        run the ground truth clauses of checks from submit_vlm_checks in the calling thread, as they read the simulation,
+        and wait for the vlm clauses
+        """
+        results = checks["results"]
+        vlm_conds = checks["vlm_conds"]
+        for cond in checks["ground_truth_conds"]:
+            results[cond] = self.ground_truth_check(env, obs, cond)
+        vlm_futures = checks["vlm_futures"]
+        if checks["batch_future"] is not None:
+            judgements = checks["batch_future"].result()
+            if judgements is not None:
+                results.update(zip(vlm_conds, judgements))
+            else:
+                # fall back to per-clause checks if the batched answer cannot be parsed
+                vlm_futures = {
+                    cond: CHECK_EXECUTOR.submit(self.vlm_check, checks["image_path"], cond) for cond in vlm_conds
+                }
+        for cond, future in vlm_futures.items():
+            results[cond] = future.result()
+        
+        return "; ".join(results.values())
+    
     
+    def encode_image(self, image_path):
+        """
+        encode image(s) once, so that all vlm checks of the same step reuse the encoding
+        """
+        if image_path is None:
+            return None
+        if isinstance(image_path, list):
+            return [as_frame(image) for image in image_path]
+        return as_frame(image_path)
     
+    
+    @traced("vlm_check")
+    def vlm_check_batch(self, image_path, conditions):
+        """
+        check several conditions with one request, the images are uploaded only once
+        return judgements in the order of conditions, or None if the answer cannot be parsed
+        """
+        if self.view == 1:
+            assert not isinstance(image_path, list), "image_path should be a single image for one view check"
+            image_info = """
+**Image:** 
+- The image is a snapshot of the robot's current **front view** in the kitchen environment.
+- The robot is a semi-transparent arm, and the kitchen object or fixtures are visible in the background.
+- You need to carefully check the existense or state of fixture or objects in the image.
+""".strip()
+        elif self.view == 2:
+            assert isinstance(image_path, list) and len(image_path) == 2, "image_path should be a list for two view check"
+            image_info = """
+**Image 1:** 
+- The image is a snapshot of the robot's current **front view** in the kitchen environment.
+- The robot is a semi-transparent arm, and the kitchen object or fixtures are visible in the background.
+- You need to carefully check the existense or state of fixture or objects in the image.
+
+**Image 2:** 
+- The image is a snapshot of the robot's **gripper view** from camera on the robot gripper
+- The gripper is visible in the image, and the objects on the counter are visible in the image.
+- You need to carefully check the whether gripper is holding something or not.
+- You also need to carefully check the existense of objects in the image.
+""".strip()
+        else:
+            raise ValueError("Invalid view number")
+        
+        condition_list = "\n".join(f"{i}. {condition}" for i, condition in enumerate(conditions))
+        
+        message = f"""
+Imaging you are a image checking agent, and you are able to check whether each of the given conditions is satisfied based on the given image(s).
+
+You are given image(s) and a numbered list of {len(conditions)} conditions, and you need to output whether each condition is satisfied (True or False) based on the image(s).
+
+{image_info}
+
+**Conditions:**
+- Each condition is a sentence that describe the existense or state of the fixtures or objects in the image.
+- Judge each condition independently of the others.
+
+**Output:** a list with one judgement for each condition in the same order, strictly follow the format: [<True or False>, <True or False>, ...]
+
+**Your Task:**
+
+Q: Conditions:
+{condition_list}
+A: [<True or False>, ...]
+""".strip()
+        
+        content = self.client.get_response(message=message, image_path=image_path)
+        return utils.extract_judgements(content, len(conditions))
+    
+    
+    @traced("vlm_check")
     def vlm_check(self, image_path, condition):
         """
         redirect to one view check or two view check based on the view number
         """
         if self.view == 1:
-            assert isinstance(image_path, str), "image_path should be a string for one view check"
+            assert not isinstance(image_path, list), "image_path should be a single image for one view check"
             return self.vlm_check_one_view(image_path, condition)
         elif self.view == 2:
             assert isinstance(image_path, list) and len(image_path) == 2, "image_path should be a list for two view check"
@@ -591,7 +900,7 @@ Q: Condition: {condition}
 A: <True or False>
 """.strip()
         
-        content = self.client.get_response(message=message, image_path=image_path)
+        content = self.client.get_response(message=message, image_path=image_path, early_stop=TRUE_FALSE_PATTERN)
         content = utils.extract_content(content, filter="A:")
         content = utils.extract_content(content, filter="True or False")
         judgement = content.strip()
@@ -632,7 +941,7 @@ Q: Condition: {condition}
 A: <True or False>
 """.strip()
 
-        content = self.client.get_response(message=message, image_path=image_path)
+        content = self.client.get_response(message=message, image_path=image_path, early_stop=TRUE_FALSE_PATTERN)
         content = utils.extract_content(content, filter='A:')
         content = utils.extract_content(content, filter="True or False")
         judgement = content.strip()
@@ -640,11 +949,17 @@ A: <True or False>
         return judgement
     
     
+    @traced("ground_truth_check")
     def ground_truth_check(self, env, obs, condition):
         """
         check whether condition is satisfied using groung truth information
         """
 
+        # resolve condition to checker call directly, only ask LLM to write checker code if unparsable
+        resolved_check = self.condition_resolver.resolve(condition, id=self.id)
+        if resolved_check is not None:
+            return str(resolved_check(env, obs))
+
         examples = f"""
 
 Q: Condition: gripper is holding the vegetable.
@@ -732,6 +1047,7 @@ A: result = <checker_name(env, obs, ...)>
         return results
     
     
+    @traced("llm_planning")
     def get_pre_condition(self, task):
         """
         generate pre-condition for the given task
@@ -818,6 +1134,14 @@ A: No specific pre-condition.
 
 """.strip()
         
+        # look up condition table first, seeded with the few-shot examples above
+        context_fn = lambda t: get_condition_context(t, self.env_info, self.history_execution)
+        context = context_fn(task)
+        self.condition_table.seed("pre", examples, context_fn=context_fn)
+        pre_condition = self.condition_table.lookup("pre", task, context)
+        if pre_condition is not None:
+            return pre_condition
+        
         message = f"""
 Imagine you are a pre-condition generation machine.
 
@@ -858,10 +1182,12 @@ A: <sentences seperated by ;>
         content = self.client.get_response(message=message)
         
         pre_condition = utils.extract_content(content, filter='A:')
+        self.condition_table.record("pre", task, pre_condition, context)
         
         return pre_condition
     
     
+    @traced("llm_planning")
     def get_post_condition(self, task):
         """
         generate post-condition for the given task
@@ -894,7 +1220,7 @@ Q: Task name: place to cabinet.
 A: there is a cabinet in the image; gripper is not holding anything.
 
 Q: Task name: place to sink.
-A: there is a cabinet in the image; gripper is not holding anything.
+A: there is a sink in the image; gripper is not holding anything.
 
 Q: Task name: pick up fish.
 A: gripper is holding the fish.
@@ -910,6 +1236,12 @@ A: No specific post-condition.
 
 """.strip()
         
+        # look up condition table first, seeded with the few-shot examples above
+        self.condition_table.seed("post", examples)
+        post_condition = self.condition_table.lookup("post", task)
+        if post_condition is not None:
+            return post_condition
+        
         message = f"""
 Imagine you are a post-condition generation machine.
 
@@ -950,6 +1282,7 @@ A: <sentences seperated by ;>
         content = self.client.get_response(message=message)
         
         post_condition = utils.extract_content(content, filter='A:')
+        self.condition_table.record("post", task, post_condition)
 
         return post_condition
 
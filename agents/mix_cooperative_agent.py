@@ -24,6 +24,7 @@ from agents.client import REASON_CLIENT
 from agents.mix_agent import MixAgent
 
 import utils
+from utils.trace_utils import traced
 import json
 
 
@@ -38,11 +39,18 @@ class MixCoAgent(MixAgent):
         self.reason_client = REASON_CLIENT # used for get twoagent plan
     
     
+    @traced("llm_planning")
     def get_initial_plan(self, verbose=False):
         """
         get initial plan based on memory or random examples
         """
 
+        # replay known-good two agent plan of the same goal and environment without calling the planner
+        plan_dict = self.replay_plan(kind="twoagent")
+        if plan_dict is not None:
+            self.plan_dict = plan_dict
+            return plan_dict
+
         # get relevant two agent examples if given task name
         task_name = self.task_name
         if task_name is not None:
@@ -115,7 +123,8 @@ agent0: [<action1>, <action2>, ...]
 agent1: [<action1>, <action2>, ...]
 """.strip()
         
-        content = self.client.get_response(message=message)
+        # planning is re-queried after invalid commands, so never reuse cached plans
+        content = self.client.get_response(message=message, use_cache=False)
         
         # get structured plan
         plan_str = content
@@ -134,42 +143,34 @@ agent1: [<action1>, <action2>, ...]
             print("Cooperative plan:")
             pprint(plan_dict)
         
+        self.plan_dict = plan_dict
         return plan_dict
     
 
     def retrieve_examples(self, task_name, verbose=False):
         """
-        retrieve relevant examples from the memory file, prepare for the current two agent task
+        retrieve relevant examples from the memory store, prepare for the current two agent task
         """
 
-        # check relevant file
-        memory_folder_path = os.path.join(BASE_PATH, "memory")
-        twoagent_memory_path = os.path.join(memory_folder_path, task_name + "_twoagent.json")
-
-        # check whether two agent memory file exists
-        if os.path.exists(twoagent_memory_path):
-            with open(twoagent_memory_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-
-            goal = data[-1]['goal']
-            env_info = data[-1]['env_info']
-            twoagent_plan_dict = data[-1]['twoagent_plan'] # should be a Dict[List[str]]
+        # check whether two agent plan exists, only the latest one is used
+        twoagent_data = self.memory_store.query(task_name, kind="twoagent", limit=1, latest_first=True)
+        if len(twoagent_data) > 0:
+            goal = twoagent_data[0]['goal']
+            env_info = twoagent_data[0]['env_info']
+            twoagent_plan_dict = twoagent_data[0]['twoagent_plan'] # should be a Dict[List[str]]
 
         else:
-            memory_path = os.path.join(memory_folder_path, task_name + ".json")
-            if not os.path.exists(memory_path):
-                raise FileNotFoundError(f"Memory file {task_name}.json not found in {memory_folder_path}")
-            
-            with open(memory_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
+            if self.memory_store.count(task_name) == 0:
+                raise FileNotFoundError(f"No memory of task {task_name} found in {self.memory_store.db_path}")
             
-            has_success = any(item["result"] == "success" for item in data)
+            data = self.memory_store.query(task_name, result="success")
+            has_success = len(data) > 0
             assert has_success
 
             # get relevant example data, assume env not change much
-            env_info_list = [item["env_info"] for item in data if item["result"] == "success"]
-            goal_list = [item["goal"] for item in data if item["result"] == "success"]
-            useful_plan_list = [item["useful_plan_str"] for item in data if item["result"] == "success"]
+            env_info_list = [item["env_info"] for item in data]
+            goal_list = [item["goal"] for item in data]
+            useful_plan_list = [item["useful_plan_str"] for item in data]
 
             # only get the best single agent useful plan and relevant memory
             best_useful_plan = min(useful_plan_list, key=len)
@@ -206,6 +207,7 @@ A: {twoagent_plan}
         return example
 
 
+    @traced("llm_planning")
     def get_twoagent_plan(self, goal, oneagent_plan, verbose=False):
         """
         get twoagent plan given best oneagent plan using a reason model
@@ -273,14 +275,11 @@ agent1: [<action1>, <action2>, ...]
             "twoagent_plan": twoagent_plan_dict
         }
 
-        # check relevant file
-        memory_folder_path = os.path.join(BASE_PATH, "memory")
-        twoagent_memory_path = os.path.join(memory_folder_path, task_name + "_twoagent.json")
-        utils.append_to_json(twoagent_memory_path, data)
+        self.memory_store.append(task_name, data, kind="twoagent")
 
         if verbose:
             print()
-            print(f"New twoagent plan data saved to: {twoagent_memory_path}")
+            print(f"New twoagent plan data saved to: {self.memory_store.db_path}")
 
 
 if __name__ == "__main__":
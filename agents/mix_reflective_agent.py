@@ -2,6 +2,7 @@ import os
 import sys
 import openai
 import re
+import uuid
 from pprint import pprint
 from termcolor import colored
 
@@ -22,8 +23,10 @@ os.chdir(BASE_PATH)
 from agents.client import OPENAI_CLIENT as CLIENT
 from agents.client import REASON_CLIENT
 from agents.mix_agent import MixAgent
+from agents.retrieval import MEMORY_RETRIEVER
 
 import utils
+from utils.trace_utils import traced
 import json
 
 
@@ -37,14 +40,24 @@ class MixReAgent(MixAgent):
         self.history_reflection = []
         self.interaction_status = "initialized"
         self.record_folder_path = record_folder_path
+        self.episode_id = uuid.uuid4().hex # identifies the records of this interaction among those of other workers
         self.reason_client = REASON_CLIENT # used for get initial plan and reflection
+        self.memory_retriever = MEMORY_RETRIEVER # ranked and token-budgeted reminders and examples
     
     
+    @traced("llm_planning")
     def get_initial_plan(self, verbose=False):
         """
         call the self.client to output initial plan based on self.goal and self.env_info
         """
         
+        # start executing immediately if the same goal and environment has a known-good plan
+        plan = self.replay_plan()
+        if plan is not None:
+            self.history_plan.append(plan)
+            self.history_execution.append(plan[0])
+            return plan
+        
         reminders = self.retrieve_reminders(task_name=self.task_name)
         examples = self.retrieve_examples(task_name=self.task_name)
         
@@ -89,7 +102,8 @@ Remember to strictly follow the examples' format!!!
 - Output: <follow the format above, return a list of actions in the plan>
 """.strip()
         
-        content = self.reason_client.get_response(message=message, verbose=verbose).strip()
+        # planning is re-queried after invalid commands, so never reuse cached plans
+        content = self.reason_client.get_response(message=message, verbose=verbose, use_cache=False).strip()
         # content = self.client.get_response(message=message).strip()
 
         # extract plan using re
@@ -105,6 +119,7 @@ Remember to strictly follow the examples' format!!!
         return plan
     
     
+    @traced("llm_planning")
     def reflect_pre_check_result(self, verbose=False):
         """
         reflect on the current plan, and check if it is feasible
@@ -211,6 +226,7 @@ Remember to strictly follow the examples' format!!!
         self.get_useful_plan(verbose=verbose)
     
 
+    @traced("llm_planning")
     def get_useful_plan(self, verbose=False):
         """
         get useful plan from execution history
@@ -279,6 +295,7 @@ These actions can be deleted together
         
         # gather useful interaction data as a dict
         interaction_data = dict()
+        interaction_data["episode"] = self.episode_id
         interaction_data["task"] = self.task_name
         interaction_data["goal"] = self.goal
         interaction_data["env_info"] = self.env_info
@@ -293,14 +310,12 @@ These actions can be deleted together
         interaction_data["useful_plan_str"] = self.useful_plan_str
         interaction_data["result"] = self.interaction_status
         
-        # save interaction to memory folder, with the same task saved in the same file
-        memory_folder_path = os.path.join(BASE_PATH, "memory")
-        os.makedirs(memory_folder_path, exist_ok=True)
-        memory_path = os.path.join(memory_folder_path, f"{task_name}.json")
+        # save interaction to memory store, indexed by task name
         if mode == "a":
-            utils.append_to_json(memory_path, interaction_data)
+            self.memory_store.append(task_name, interaction_data)
+            self.record_plan_outcome(self.interaction_status == "success", self.useful_plan)
         elif mode == "w":
-            utils.write_to_json(memory_path, interaction_data)
+            self.memory_store.replace(task_name, interaction_data)
         else:
             raise ValueError(f"Invalid mode {mode}")
         
@@ -312,7 +327,7 @@ These actions can be deleted together
         if mode == "a":
             utils.append_to_json(record_path, interaction_data)
         elif mode == "w":
-            utils.write_to_json(memory_path, interaction_data)
+            utils.write_to_json(record_path, interaction_data)
         else:
             raise ValueError(f"Invalid mode {mode}")
     
@@ -327,17 +342,17 @@ These actions can be deleted together
         if record_folder_path is None:
             record_folder_path = self.record_folder_path
         record_path = os.path.join(record_folder_path, f"{task_name}_agent{self.id}.json")
-        if not os.path.exists(record_path):
+        data = utils.read_json(record_path)
+        if data is None:
             raise FileNotFoundError(f"Record file {record_path} not found")
         
-        with open(record_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
         if isinstance(data, list):
-            assert len(data) == 1
-            data = data[0]
+            # record of this episode if several workers share the folder, otherwise the last one
+            records = [record for record in data if record.get("episode") == self.episode_id]
+            data = records[-1] if records else data[-1]
         
         # load interaction data except for the useful plan
+        self.episode_id = data.get("episode", self.episode_id)
         self.goal = data["goal"]
         self.env_info = data["env_info"]
         self.history_plan = data["plan"]
@@ -363,21 +378,13 @@ These actions can be deleted together
     
     def retrieve_reminders(self, task_name, verbose=False):
         """
-        retrieve relevant reminders from the memory file, prepare for the current task
+        retrieve relevant reminders from the memory store, prepare for the current task
         """
         
-        # check relevant file
-        memory_folder_path = os.path.join(BASE_PATH, "memory")
-        memory_path = os.path.join(memory_folder_path, task_name + ".json")
-        if not os.path.exists(memory_path):
+        # retrieve most relevant reminders, deduplicated and ranked by similarity to current goal and env_info
+        reminder_list = self.memory_retriever.reminders(task_name, self.goal, self.env_info)
+        if len(reminder_list) == 0:
             return ""
-        
-        with open(memory_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
-        # retrieve most relevant reminders
-        reflection_list = [item["reflection"] for item in data]
-        reminder_list = [item for sublist in reflection_list for item in sublist]
         reminders = "\n".join(f"- {reminder}" for reminder in reminder_list) # markdown format
         
         if verbose:
@@ -389,31 +396,17 @@ These actions can be deleted together
     
     def retrieve_examples(self, task_name, verbose=False):
         """
-        retrieve relevant examples from the memory file, prepare for the current task
+        retrieve relevant examples from the memory store, prepare for the current task
         """
         
-        # check relevant file
-        memory_folder_path = os.path.join(BASE_PATH, "memory")
-        memory_path = os.path.join(memory_folder_path, task_name + ".json")
-        if not os.path.exists(memory_path):
+        # successful interactions first, ranked by similarity to current goal and env_info within token budget
+        has_success, example_list = self.memory_retriever.examples(task_name, self.goal, self.env_info)
+        if len(example_list) == 0:
             return ""
         
-        with open(memory_path, "r", encoding="utf-8") as file:
-            data = json.load(file)
-        
-        has_success = any(item["result"] == "success" for item in data)
-        if has_success:
-            env_info_list = [item["env_info"] for item in data if item["result"] == "success"]
-            goal_list = [item["goal"] for item in data if item["result"] == "success"]
-            useful_plan_list = [item["useful_plan_str"] for item in data if item["result"] == "success"]
-        else:
-            env_info_list = [item["env_info"] for item in data]
-            goal_list = [item["goal"] for item in data]
-            useful_plan_list = [item["useful_plan_str"] for item in data]
-        
         # prepare examples for few-shot prompting in get_initial_plan
         examples = "Task relevent successful examples: \n" if has_success else "Task relevent **unsuccessful** examples: \n"
-        for i, (env_info, goal, useful_plan) in enumerate(zip(env_info_list, goal_list, useful_plan_list)):
+        for i, (env_info, goal, useful_plan) in enumerate(example_list):
             example = f"""
 Example {i+1}:
 - Environment information: 
@@ -0,0 +1,147 @@
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+
+from agents.memory_store import MEMORY_STORE
+
+
+def canonicalize_env_info(env_info):
+    """
+    parse 'Available fixtures / objects / commands ...: a, b' lines into sorted sets, so that the order of items does not matter
+    """
+    canonical = {}
+    for line in (env_info or "").splitlines():
+        match = re.match(r"\s*Available (fixtures|objects|commands)[^:]*:\s*(.*)", line)
+        if match:
+            items = [item.strip().lower() for item in match.group(2).split(",") if item.strip()]
+            canonical[match.group(1)] = sorted(set(items))
+    return canonical
+
+
+def plan_fingerprint(goal, env_info):
+    """
+    fingerprint of canonicalized (goal, fixtures, objects, commands)
+    """
+    content = {
+        "goal": re.sub(r"\s+", " ", (goal or "").strip().lower()).rstrip("."),
+        **canonicalize_env_info(env_info),
+    }
+    content_str = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(content_str.encode("utf-8")).hexdigest()
+
+
+class PlanCache:
+    """
+    known-good plans keyed by (kind, plan fingerprint), replayed without calling the planner
+    confidence is tracked from replay outcomes, and an entry is invalidated after a failed replay
+    entries are seeded lazily from successful interactions in the memory store
+    """
+    def __init__(self, memory_store, min_confidence=0.6):
+        self.memory_store = memory_store
+        self.min_confidence = min_confidence
+        self._local = threading.local() # one connection per thread
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS plans (
+                    fingerprint TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    task TEXT,
+                    plan TEXT NOT NULL,
+                    successes INTEGER NOT NULL,
+                    failures INTEGER NOT NULL,
+                    valid INTEGER NOT NULL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (fingerprint, kind)
+                )
+            """)
+
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.memory_store.db_path, timeout=60)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+
+    @staticmethod
+    def confidence(successes, failures):
+        """
+        laplace smoothed replay success rate
+        """
+        return (successes + 1) / (successes + failures + 2)
+
+
+    def lookup(self, kind, task_name, goal, env_info):
+        """
+        return cached plan (list for one agent, dict for two agents) if it is valid and confident enough, otherwise None
+        """
+        fingerprint = plan_fingerprint(goal, env_info)
+        row = self._connect().execute(
+            "SELECT plan, successes, failures, valid FROM plans WHERE fingerprint = ? AND kind = ?", (fingerprint, kind)
+        ).fetchone()
+        if row is None:
+            row = self._seed(kind, task_name, fingerprint)
+        if row is None:
+            return None
+        plan, successes, failures, valid = row
+        if not valid or self.confidence(successes, failures) < self.min_confidence:
+            return None
+        return json.loads(plan)
+
+
+    def record(self, kind, task_name, goal, env_info, success, plan=None):
+        """
+        update confidence after an interaction, a failure invalidates the entry until a new successful plan is recorded
+        """
+        fingerprint = plan_fingerprint(goal, env_info)
+        now = time.time()
+        with self._connect() as conn:
+            if success and plan:
+                conn.execute("""
+                    INSERT INTO plans (fingerprint, kind, task, plan, successes, failures, valid, updated) VALUES (?, ?, ?, ?, 1, 0, 1, ?)
+                    ON CONFLICT (fingerprint, kind) DO UPDATE SET plan = excluded.plan, successes = successes + 1, valid = 1, updated = excluded.updated
+                """, (fingerprint, kind, task_name, json.dumps(plan, ensure_ascii=False), now))
+            elif success:
+                conn.execute(
+                    "UPDATE plans SET successes = successes + 1, updated = ? WHERE fingerprint = ? AND kind = ?",
+                    (now, fingerprint, kind),
+                )
+            else:
+                conn.execute(
+                    "UPDATE plans SET failures = failures + 1, valid = 0, updated = ? WHERE fingerprint = ? AND kind = ?",
+                    (now, fingerprint, kind),
+                )
+
+
+    def _seed(self, kind, task_name, fingerprint):
+        """
+        build entry from the most frequent useful plan of successful interactions with the same fingerprint
+        """
+        if kind != "oneagent" or task_name is None:
+            return None
+        plans = Counter(
+            tuple(item["useful_plan"])
+            for item in self.memory_store.query(task_name, result="success")
+            if item.get("useful_plan") and plan_fingerprint(item["goal"], item["env_info"]) == fingerprint
+        )
+        if len(plans) == 0:
+            return None
+        # most frequent plan, shorter plan first for ties
+        plan, successes = min(plans.items(), key=lambda x: (-x[1], len(x[0])))
+        row = (json.dumps(list(plan), ensure_ascii=False), successes, 0, 1)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO plans (fingerprint, kind, task, plan, successes, failures, valid, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (fingerprint, kind, task_name, *row, time.time()),
+            )
+        return row
+
+
+PLAN_CACHE = PlanCache(MEMORY_STORE)
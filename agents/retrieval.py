@@ -0,0 +1,163 @@
+import re
+import math
+import threading
+from collections import Counter
+
+from agents.memory_store import MEMORY_STORE, env_fingerprint
+
+
+# words carrying no meaning for matching reminders and goals
+STOP_WORDS = {"a", "an", "the", "to", "of", "is", "are", "be", "it", "and", "that", "this", "should", "must"}
+
+
+def stem(word):
+    """
+    crude suffix stripping, e.g. placing, placed and place -> plac
+    """
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text):
+    """
+    lower case stemmed word tokens without stop words, underscores split words so that vegetable_container matches vegetable
+    """
+    return [stem(token) for token in re.findall(r"[a-z0-9]+", (text or "").lower()) if token not in STOP_WORDS]
+
+
+def estimate_tokens(text):
+    """
+    rough LLM token count, about 4 characters per token for english prompts
+    """
+    return len(text) // 4 + 1
+
+
+class TfidfIndex:
+    """
+    small in-memory tf-idf index with cosine similarity
+    """
+    def __init__(self, documents):
+        self.doc_tokens = [Counter(tokenize(doc)) for doc in documents]
+        doc_freq = Counter(token for tokens in self.doc_tokens for token in tokens)
+        num_docs = len(documents)
+        self.idf = {token: math.log((1 + num_docs) / (1 + freq)) + 1 for token, freq in doc_freq.items()}
+        self.vectors = [self._vectorize(tokens) for tokens in self.doc_tokens]
+
+
+    def _vectorize(self, tokens):
+        vector = {token: count * self.idf.get(token, 0.0) for token, count in tokens.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if norm == 0:
+            return {}
+        return {token: value / norm for token, value in vector.items()}
+
+
+    def scores(self, query):
+        """
+        cosine similarity between query and every document
+        """
+        query_vector = self._vectorize(Counter(tokenize(query)))
+        return [sum(value * vector.get(token, 0.0) for token, value in query_vector.items()) for vector in self.vectors]
+
+
+def fill_budget(items, budget, text_fn=str):
+    """
+    take ranked items while their estimated tokens fit in the budget, the first item is always kept
+    """
+    selected = []
+    used = 0
+    for item in items:
+        tokens = estimate_tokens(text_fn(item))
+        if len(selected) > 0 and used + tokens > budget:
+            break
+        selected.append(item)
+        used += tokens
+    return selected
+
+
+class MemoryRetriever:
+    """
+    rank reminders and examples of a task by similarity to the current goal and env_info,
+    deduplicate near-identical ones, and keep them within a token budget so that prompt size stays flat
+    ranked results are cached per (task, env fingerprint, goal) until new interactions are stored
+    """
+    def __init__(self, memory_store, reminder_budget=300, example_budget=1200, duplicate_threshold=0.8):
+        self.memory_store = memory_store
+        self.reminder_budget = reminder_budget
+        self.example_budget = example_budget
+        self.duplicate_threshold = duplicate_threshold
+        self._cache = {}
+        self._lock = threading.Lock()
+
+
+    def _cached(self, kind, task_name, goal, env_info, build_fn):
+        key = (kind, task_name, env_fingerprint(env_info), goal, self.memory_store.count(task_name))
+        with self._lock:
+            if key in self._cache:
+                return self._cache[key]
+        value = build_fn()
+        with self._lock:
+            self._cache[key] = value
+        return value
+
+
+    def _deduplicate(self, texts):
+        """
+        group near-identical texts by jaccard similarity of their token sets,
+        return (text, count) pairs keeping the first text of each group
+        """
+        groups = [] # [token set, representative text, count]
+        for text in texts:
+            tokens = set(tokenize(text))
+            for group in groups:
+                union = tokens | group[0]
+                if len(union) == 0 or len(tokens & group[0]) / len(union) >= self.duplicate_threshold:
+                    group[2] += 1
+                    break
+            else:
+                groups.append([tokens, text, 1])
+        return [(text, count) for _, text, count in groups]
+
+
+    def reminders(self, task_name, goal, env_info):
+        """
+        return reminder sentences ranked by similarity, then by how often they were reflected
+        """
+        def build():
+            data = self.memory_store.query(task_name)
+            reminder_list = [reminder for item in data for reminder in item.get("reflection", []) if reminder.strip()]
+            if len(reminder_list) == 0:
+                return []
+            unique = self._deduplicate(reminder_list)
+            scores = TfidfIndex([text for text, _ in unique]).scores(f"{goal}\n{env_info}")
+            ranked = sorted(zip(unique, scores), key=lambda x: (-x[1], -x[0][1]))
+            return fill_budget([text for (text, _), _ in ranked], self.reminder_budget)
+        return self._cached("reminders", task_name, goal, env_info, build)
+
+
+    def examples(self, task_name, goal, env_info):
+        """
+        return (has_success, examples), examples are (env_info, goal, useful_plan) tuples ranked by similarity
+        successful interactions are used if there is any
+        """
+        def build():
+            data = self.memory_store.query(task_name, result="success")
+            has_success = len(data) > 0
+            if not has_success:
+                data = self.memory_store.query(task_name)
+
+            # drop repeated interactions with the same environment, goal and plan
+            examples = list(dict.fromkeys(
+                (item["env_info"], item["goal"], item["useful_plan_str"]) for item in data
+            ))
+            if len(examples) == 0:
+                return has_success, []
+            scores = TfidfIndex([f"{example[1]}\n{example[0]}" for example in examples]).scores(f"{goal}\n{env_info}")
+            ranked = [example for example, _ in sorted(zip(examples, scores), key=lambda x: -x[1])]
+            return has_success, fill_budget(ranked, self.example_budget, text_fn=lambda example: "\n".join(str(part) for part in example))
+        return self._cached("examples", task_name, goal, env_info, build)
+
+
+MEMORY_RETRIEVER = MemoryRetriever(MEMORY_STORE)
@@ -0,0 +1,97 @@
+import time
+import random
+import threading
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RetryableError(Exception):
+    """
+    transient failure of a request, e.g. empty content, rate limit or 5xx status
+    """
+    pass
+
+
+# http status codes that are worth retrying
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+
+class Transport:
+    """
+    shared transport of all clients, with keep-alive connection pools, bounded concurrency,
+    exponential backoff with full jitter and per-request deadlines
+    """
+    def __init__(
+            self,
+            max_concurrency=16,
+            max_retries=6,
+            base_delay=1.0,
+            max_delay=30.0,
+            connect_timeout=10.0,
+            read_timeout=120.0,
+            deadline=600.0,
+        ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline # total seconds of one call over all retries
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+
+        # at most max_concurrency requests in flight in this process
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+        # keep-alive pools, http_client for openai style clients, session for plain http clients
+        self.http_client = httpx.Client(
+            timeout=self.timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.requests_timeout = (connect_timeout, read_timeout)
+
+
+    def backoff(self, attempt):
+        """
+        full jitter, so that workers failing together do not retry together
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+    def call(self, request_fn, retryable=(RetryableError,), span_args=None):
+        """
+        run request_fn with bounded concurrency, retry on retryable exceptions until max_retries or deadline is reached
+        """
+        start = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._semaphore:
+                    return request_fn()
+            except retryable as e:
+                delay = self.backoff(attempt)
+                if attempt == self.max_retries or time.monotonic() - start + delay > self.deadline:
+                    raise
+                if span_args is not None:
+                    span_args["retries"] = attempt + 1
+                print(f"Request failed ({type(e).__name__}: {e}), retry in {delay:.1f}s...")
+                time.sleep(delay)
+
+
+    def post(self, url, json=None, stream=False):
+        """
+        post through the pooled session, raise RetryableError on transient http status
+        """
+        response = self.session.post(url, json=json, stream=stream, timeout=self.requests_timeout)
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            response.close()
+            raise RetryableError(f"status {response.status_code}")
+        response.raise_for_status()
+        return response
+
+
+TRANSPORT = Transport()
+
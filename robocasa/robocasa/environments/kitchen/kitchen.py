@@ -19,6 +19,7 @@ from robocasa.utils.placement_samplers import SequentialCompositeSampler, Unifor
 from robocasa.models.objects.objects import MJCFObject
 import robocasa.utils.kitchen_utils as KU
 import robocasa.utils.object_utils as OU
+from robocasa.utils.layout_geometry import LayoutGeometry, get_layout_geometry
 # from robocasa.models.objects.fixtures import (
 #     FixtureType, Fixture, fixture_is_type, Counter, Stove, Stovetop, HousingCabinet, Fridge, Dishwasher
 # )
@@ -26,10 +27,7 @@ from robocasa.models.objects.fixtures import *
 # from robocasa.models.arenas.layout_utils import *
 from robocasa.utils.texture_swap import (
     get_random_textures,
-    replace_cab_textures,
-    replace_counter_top_texture,
-    replace_wall_texture,
-    replace_floor_texture,
+    swap_textures,
 )
 import robocasa.macros as macros
 
@@ -182,7 +180,10 @@ class Kitchen(ManipulationEnv):
         if macros.VERBOSE:
             print("layout: {}, style: {}".format(self.layout_id, self.style_id))
         
-        # to be set later inside edit_model_xml function
+        # set once fixtures are placed
+        self._layout_geometry = None
+
+        # to be set later inside edit_model_tree function
         self._curr_gen_fixtures = None
 
         # setup scene
@@ -240,6 +241,9 @@ class Kitchen(ManipulationEnv):
         # setup internal references related to fixtures
         self._setup_kitchen_references()
 
+        # fixtures are placed, reset regions and base poses can be looked up from now on
+        self._layout_geometry = LayoutGeometry(self)
+
         # set robot position
         if self.init_robot_base_pos is not None:
             ref_fixture = self.get_fixture(self.init_robot_base_pos)
@@ -349,7 +353,7 @@ class Kitchen(ManipulationEnv):
         self.placement_initializer = self._get_placement_initializer(self.object_cfgs)
 
         object_placements = None
-        for i in range(1):
+        for i in range(10): # placements are cheap to resample, unlike a full _load_model
             try:
                 object_placements = self.placement_initializer.sample(placed_objects=self.fxtr_placements)
             except RandomizationError as e:
@@ -364,6 +368,7 @@ class Kitchen(ManipulationEnv):
             self._load_model()
             return
         self.object_placements = object_placements
+        self._layout_geometry.save()
 
     def _setup_kitchen_references(self):
         """
@@ -379,16 +384,19 @@ class Kitchen(ManipulationEnv):
     
     def compute_robot_base_placement_pose(self, ref_fixture, offset=None):
         """
-        steps:
-        1. find the nearest counter to this fixture
-        2. compute offset relative to this counter
-        3. transform offset to global coordinates
+        robot base placement pose in front of ref_fixture, looked up in the layout geometry
+        cache once fixtures are placed (see _compute_robot_base_placement_pose)
         """
-        # step 1: find vase fixture closest to robot
-        base_fixture = None
+        geometry = get_layout_geometry(self)
+        if geometry is None:
+            return self._compute_robot_base_placement_pose(ref_fixture, offset=offset)
+        return geometry.robot_base_pose(ref_fixture, offset=offset, base_fixtures=self._get_base_fixtures())
 
-        # get all base fixtures in the environment
-        base_fixtures = [
+    def _get_base_fixtures(self):
+        """
+        fixtures in front of which the robot base can be placed
+        """
+        return [
             fxtr for fxtr in self.fixtures.values()
             if isinstance(fxtr, Counter)
             or isinstance(fxtr, Stove)
@@ -396,6 +404,19 @@ class Kitchen(ManipulationEnv):
             or isinstance(fxtr, HousingCabinet)
             or isinstance(fxtr, Fridge)
         ]
+
+    def _compute_robot_base_placement_pose(self, ref_fixture, offset=None):
+        """
+        steps:
+        1. find the nearest counter to this fixture
+        2. compute offset relative to this counter
+        3. transform offset to global coordinates
+        """
+        # step 1: find vase fixture closest to robot
+        base_fixture = None
+
+        # get all base fixtures in the environment
+        base_fixtures = self._get_base_fixtures()
         
         for fxtr in base_fixtures:
             # get bounds of fixture
@@ -432,6 +453,25 @@ class Kitchen(ManipulationEnv):
 
         return robot_base_pos, robot_base_ori
 
+    def _get_reset_regions(self, fixture, **kwargs):
+        """
+        reset regions of a fixture, looked up in the layout geometry cache once fixtures are placed
+        """
+        geometry = get_layout_geometry(self)
+        if geometry is None:
+            return fixture.get_reset_regions(self, **kwargs)
+        return geometry.reset_regions(fixture, **kwargs)
+
+    def _sample_reset_region(self, fixture, **kwargs):
+        regions = self._get_reset_regions(fixture, **kwargs)
+        return random.sample(list(regions.values()), 1)[0]
+
+    def _get_rel_transform(self, fixture_A, fixture_B):
+        geometry = get_layout_geometry(self)
+        if geometry is None:
+            return OU.get_rel_transform(fixture_A, fixture_B)
+        return geometry.rel_transform(fixture_A, fixture_B)
+
     def _get_placement_initializer(self, cfg_list, z_offset=0.01):
         placement_initializer = SequentialCompositeSampler(name="SceneSampler", rng=self.rng)
         
@@ -457,7 +497,7 @@ class Kitchen(ManipulationEnv):
 
                 # calculate the total available space where object could be placed
                 sample_region_kwargs = placement.get("sample_region_kwargs", {})
-                reset_region = fixture.sample_reset_region(env=self, **sample_region_kwargs)
+                reset_region = self._sample_reset_region(fixture, **sample_region_kwargs)
                 outer_size = reset_region["size"]
                 margin = placement.get("margin", 0.04)
                 outer_size = (outer_size[0] - margin, outer_size[1] - margin)
@@ -489,7 +529,7 @@ class Kitchen(ManipulationEnv):
                     else:
                         ref_fixture = self.get_fixture(placement["sample_region_kwargs"]["ref"])
                         ref_pos = ref_fixture.pos
-                        fixture_to_ref = OU.get_rel_transform(fixture, ref_fixture)[0]
+                        fixture_to_ref = self._get_rel_transform(fixture, ref_fixture)[0]
                         outer_to_ref = fixture_to_ref - reset_region["offset"]
                         inner_xpos = outer_to_ref[0] / x_halfsize
                         inner_xpos = np.clip(inner_xpos, a_min=-1.0, a_max=1.0)
@@ -680,19 +720,15 @@ class Kitchen(ManipulationEnv):
             new_quat = Rotation.from_euler("xyz", new_euler, degrees=True).as_quat()
             self._cam_configs[camera]["quat"] = list(new_quat)
 
-    def edit_model_xml(self, xml_str):
+    def edit_model_tree(self, root):
         """
         This function postprocesses the model.xml collected from a MuJoCo demonstration
-        for retrospective model changes.
+        for retrospective model changes, in place on the parsed model.
         Args:
-            xml_str (str): Mujoco sim demonstration XML file as string
-        Returns:
-            str: Post-processed xml file as string
+            root (ET.Element): root element of the Mujoco sim demonstration XML
         """
-        xml_str = super().edit_model_xml(xml_str)
+        super().edit_model_tree(root)
 
-        tree = ET.fromstring(xml_str)
-        root = tree
         worldbody = root.find("worldbody")
         asset = root.find("asset")
         meshes = asset.findall("mesh")
@@ -746,26 +782,12 @@ class Kitchen(ManipulationEnv):
             for (k, v) in cam_config.get("camera_attribs", {}).items():
                  cam.set(k, v)
 
-        # result = ET.tostring(root, encoding="utf8").decode("utf8")
-        result = ET.tostring(root).decode("utf8")
-
         # replace with generative textures
         if (self.generative_textures is not None) and (self.generative_textures is not False):
             # sample textures
             assert self.generative_textures == "100p"
             self._curr_gen_fixtures = get_random_textures()
-            
-            cab_tex = self._curr_gen_fixtures["cab_tex"]
-            counter_tex = self._curr_gen_fixtures["counter_tex"]
-            wall_tex = self._curr_gen_fixtures["wall_tex"]
-            floor_tex = self._curr_gen_fixtures["floor_tex"]
-
-            result = replace_cab_textures(result, new_cab_texture_file=cab_tex)
-            result = replace_counter_top_texture(result, new_counter_top_texture_file=counter_tex)
-            result = replace_wall_texture(result, new_wall_texture_file=wall_tex)
-            result = replace_floor_texture(result, new_floor_texture_file=floor_tex)
-
-        return result
+            swap_textures(root, self._curr_gen_fixtures)
 
     def _setup_references(self):
         """
@@ -965,7 +987,7 @@ class Kitchen(ManipulationEnv):
         )
     
     def _is_fxtr_valid(self, fxtr, size):
-        for region in fxtr.get_reset_regions(self).values():
+        for region in self._get_reset_regions(fxtr).values():
             if region["size"][0] >= size[0] and region["size"][1] >= size[1]:
                 return True
         return False
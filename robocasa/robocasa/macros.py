@@ -18,6 +18,14 @@ SPACEMOUSE_PRODUCT_ID = 50741
 
 DATASET_BASE_PATH = None
 
+# manifest of object model paths and sizes, see robocasa/models/objects/asset_manifest.py
+# if None, it is stored as manifest.json in the object asset folder
+OBJECT_MANIFEST_PATH = None
+
+# cache of fixture reset regions and robot base poses per layout and style, see robocasa/utils/layout_geometry.py
+# if None, it is stored in kitchen_layouts/geometry_cache next to the layout yamls
+LAYOUT_GEOMETRY_CACHE_DIR = None
+
 try:
     from robocasa.macros_private import *
 except ImportError:
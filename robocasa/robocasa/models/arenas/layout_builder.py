@@ -4,7 +4,6 @@ from robocasa.models.arenas.layout_utils import *
 from robosuite.utils.mjcf_utils import array_to_string as a2s, string_to_array as s2a
 import robosuite
 
-import yaml
 import numpy as np
 import random
 
@@ -124,12 +123,10 @@ def create_fixtures(yaml_path, style="playground"):
     
     style_yaml_path = os.path.join("kitchen_layouts", "styles", style + ".yaml")
     style_yaml_path = xml_path_completion(style_yaml_path, root=robocasa.models.assets_root)
-    with open(style_yaml_path, 'r') as f:
-        style = yaml.safe_load(f)
+    style = load_yaml(style_yaml_path)
 
     # load arena
-    with open(yaml_path, 'r') as f:
-        arena_config = yaml.safe_load(f)
+    arena_config = load_yaml(yaml_path)
     arena = list()
     
     for group_name, group_config in arena_config.items():
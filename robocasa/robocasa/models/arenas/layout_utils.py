@@ -2,10 +2,25 @@ from robosuite.utils.mjcf_utils import xml_path_completion
 import robocasa
 
 from copy import deepcopy
+from functools import lru_cache
 import yaml
 import os
 
 
+@lru_cache(maxsize=None)
+def _load_yaml_cached(yaml_path):
+    with open(yaml_path, 'r') as f:
+        return yaml.safe_load(f)
+
+
+def load_yaml(yaml_path):
+    """
+    Loads a layout, style or fixture default yaml file. Files are parsed once per process,
+    callers get a copy that they are free to modify
+    """
+    return deepcopy(_load_yaml_cached(yaml_path))
+
+
 # second keyword corresponds to positive end of axis
 AXES_KEYWORDS = {
     0: ["left", "right"],
@@ -82,8 +97,7 @@ def load_default_config(style, fixture_config):
     
     yaml_path = os.path.join("kitchen_layouts", "fixture_defaults", fixture_type + "_default.yaml")
     yaml_path = xml_path_completion(yaml_path, root=robocasa.models.assets_root)
-    with open(yaml_path, 'r') as f:
-        default_configs = yaml.safe_load(f)
+    default_configs = load_yaml(yaml_path)
 
     # find which configuration to use
     if type(fixture_style) == dict and "config_name" not in fixture_config:
@@ -0,0 +1,160 @@
+"""
+Manifest of the object asset zoo. It records the model.xml files found under each model folder and their unscaled
+sizes, so that object categories and object sampling neither walk the asset tree nor parse model files. The manifest
+is a versioned json file with one entry per model folder. Entries are loaded on first use, and a folder is only walked
+again when its modification time changes (i.e. when models are added or removed) or when it is not in the manifest yet.
+"""
+import os
+import json
+import hashlib
+import threading
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from robosuite.utils.mjcf_utils import find_elements, string_to_array
+
+# bump whenever the manifest content changes
+MANIFEST_VERSION = 2
+
+
+def read_model_size(mjcf_path):
+    """
+    Reads the unscaled size of an object model from its bottom, top and horizontal radius sites.
+
+    Args:
+        mjcf_path (str): path to the model.xml file
+
+    Returns:
+        np.array: (x, y, z) size of the object
+    """
+    root = ET.parse(mjcf_path).getroot()
+    bottom = string_to_array(find_elements(root=root, tags="site", attribs={"name": "bottom_site"}).get("pos"))
+    top = string_to_array(find_elements(root=root, tags="site", attribs={"name": "top_site"}).get("pos"))
+    horizontal_radius = string_to_array(find_elements(root=root, tags="site", attribs={"name": "horizontal_radius_site"}).get("pos"))
+    return np.array([horizontal_radius[0] * 2, horizontal_radius[1] * 2, top[2] - bottom[2]])
+
+
+class AssetManifest:
+    """
+    Lazily loaded manifest of the model folders registered with @register_folders.
+
+    Args:
+        base_path (str): root of the object asset zoo, model folders and paths in the manifest are relative to it
+
+        manifest_path (str): where the manifest is stored. If it can not be written (e.g. read-only assets),
+            the manifest is only kept in memory
+    """
+    def __init__(self, base_path, manifest_path):
+        self.base_path = base_path
+        self.manifest_path = manifest_path
+        self._folders = set()
+        self._entries = {}  # Maps loaded model folders to their manifest entries
+        self._sizes = {}  # Maps model paths of the loaded folders to their sizes
+        self._lock = threading.RLock()
+
+    def register_folders(self, folders):
+        """
+        Adds model folders (relative to the asset zoo) to the manifest, they are loaded on the next lookup.
+        """
+        with self._lock:
+            self._folders.update(folders)
+
+    def model_paths(self, folder):
+        """
+        Returns:
+            list: absolute paths of the model.xml files under @folder, in directory walk order
+        """
+        self.register_folders([folder])
+        self._load()
+        return [os.path.join(self.base_path, path) for path in self._entries[folder]["paths"]]
+
+    def model_size(self, mjcf_path):
+        """
+        Returns:
+            np.array: unscaled (x, y, z) size of the model at @mjcf_path, read from the model file if it is not
+                part of the manifest
+        """
+        self._load()
+        size = self._sizes.get(os.path.relpath(mjcf_path, self.base_path))
+        if size is None:
+            return read_model_size(mjcf_path)
+        return np.array(size)
+
+    def _fingerprint(self, folder):
+        """
+        Hash of a model folder and its modification time.
+        """
+        try:
+            mtime = os.stat(os.path.join(self.base_path, folder)).st_mtime_ns
+        except OSError:
+            mtime = None
+        content = json.dumps([MANIFEST_VERSION, folder, mtime])
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        """
+        Loads the entries of registered folders that are not loaded yet, from the manifest file if they are up to
+        date there, otherwise by walking the folder. Rebuilt entries are merged into the manifest file.
+        """
+        with self._lock:
+            folders = sorted(folder for folder in self._folders if folder not in self._entries)
+            if len(folders) == 0:
+                return
+            stored = self._read()
+            built = {}
+            for folder in folders:
+                fingerprint = self._fingerprint(folder)
+                entry = stored.get(folder)
+                if entry is None or entry.get("fingerprint") != fingerprint:
+                    entry = self._build(folder, fingerprint)
+                    built[folder] = entry
+                self._entries[folder] = entry
+                self._sizes.update(entry["sizes"])
+            if len(built) > 0:
+                self._write(built)
+
+    def _read(self):
+        """
+        Returns the folder entries of the manifest file, or an empty dict if it is missing or outdated.
+        """
+        try:
+            with open(self.manifest_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != MANIFEST_VERSION:
+            return {}
+        return data.get("folders", {})
+
+    def _build(self, folder, fingerprint):
+        """
+        Walks a model folder and reads the size of every model.
+        """
+        entry = dict(fingerprint=fingerprint, paths=[], sizes={})
+        for root, _, files in os.walk(os.path.join(self.base_path, folder)):
+            if "model.xml" in files:
+                entry["paths"].append(os.path.relpath(os.path.join(root, "model.xml"), self.base_path))
+        for path in entry["paths"]:
+            try:
+                entry["sizes"][path] = read_model_size(os.path.join(self.base_path, path)).tolist()
+            except Exception:
+                # models without size sites are rejected when sampled, as before
+                entry["sizes"][path] = None
+        return entry
+
+    def _write(self, built):
+        """
+        Merges rebuilt folder entries into the manifest file, keeping the entries written by other processes for
+        other folders. The file is replaced atomically, so that concurrent workers never read a partial file.
+        """
+        folders = self._read()
+        folders.update(built)
+        tmp_path = "{}.{}.tmp".format(self.manifest_path, os.getpid())
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(dict(version=MANIFEST_VERSION, folders=folders), f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError:
+            # e.g. read-only asset folder, keep the entries in memory only
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
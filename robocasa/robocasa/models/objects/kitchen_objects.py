@@ -4,13 +4,18 @@ import pathlib
 import os
 import math
 import random
-import xml.etree.ElementTree as ET
-
-from robosuite.utils.mjcf_utils import find_elements, string_to_array
 
 import robocasa
+import robocasa.macros as macros
+from robocasa.models.objects.asset_manifest import AssetManifest
 BASE_ASSET_ZOO_PATH = os.path.join(robocasa.models.assets_root, "objects")
 
+# model paths and sizes of the asset zoo, loaded on first use instead of walking the asset folders at import time
+ASSET_MANIFEST = AssetManifest(
+    base_path=BASE_ASSET_ZOO_PATH,
+    manifest_path=macros.OBJECT_MANIFEST_PATH or os.path.join(BASE_ASSET_ZOO_PATH, "manifest.json"),
+)
+
 
 OBJ_CATEGORIES = dict(
     liquor=dict(
@@ -1475,16 +1480,25 @@ class ObjCat:
         if model_folders is None:
             subf = "aigen_objs" if self.aigen_cat else "objaverse"
             model_folders = ["{}/{}".format(subf, name)]
-        cat_mjcf_paths = []
-        for folder in model_folders:
-            cat_path = os.path.join(BASE_ASSET_ZOO_PATH, folder)
-            for root, _, files in os.walk(cat_path):
-                if "model.xml" in files:
-                    model_name = os.path.basename(root)
+        self.model_folders = model_folders
+        ASSET_MANIFEST.register_folders(model_folders)
+        self._mjcf_paths = None
+
+    @property
+    def mjcf_paths(self):
+        """
+        sorted model.xml paths of this category, read from the asset manifest on first access
+        """
+        if self._mjcf_paths is None:
+            cat_mjcf_paths = []
+            for folder in self.model_folders:
+                for mjcf_path in ASSET_MANIFEST.model_paths(folder):
+                    model_name = os.path.basename(os.path.dirname(mjcf_path))
                     if model_name in self.exclude:
                         continue
-                    cat_mjcf_paths.append(os.path.join(root, "model.xml"))
-        self.mjcf_paths = sorted(cat_mjcf_paths)
+                    cat_mjcf_paths.append(mjcf_path)
+            self._mjcf_paths = sorted(cat_mjcf_paths)
+        return self._mjcf_paths
 
     def get_mjcf_kwargs(self):
         return deepcopy(dict(
@@ -1593,15 +1607,10 @@ def sample_kitchen_object(
             object_scale=object_scale,
         )
         
-        # check if object size is within bounds
+        # check if object size is within bounds, unscaled sizes are precomputed in the asset manifest
         mjcf_path = info["mjcf_path"]
-        tree = ET.parse(mjcf_path)
-        root = tree.getroot()
-        bottom = string_to_array(find_elements(root=root, tags="site", attribs={"name": "bottom_site"}).get("pos"))
-        top = string_to_array(find_elements(root=root, tags="site", attribs={"name": "top_site"}).get("pos"))
-        horizontal_radius = string_to_array(find_elements(root=root, tags="site", attribs={"name": "horizontal_radius_site"}).get("pos"))
         scale = mjcf_kwargs["scale"]
-        obj_size = np.array([horizontal_radius[0] * 2, horizontal_radius[1] * 2, top[2] - bottom[2]]) * scale
+        obj_size = ASSET_MANIFEST.model_size(mjcf_path) * scale
         valid_object_sampled = True
         for i in range(3):
             if max_size[i] is not None and obj_size[i] > max_size[i]:
@@ -34,6 +34,21 @@ def search_config(lang_command, controller_dict):
     return controller_config, extra_para
 
 
+def warmup_controller(lang_command, controller_dict):
+    """
+    read checkpoint of a policy command ahead of time, planners are cheap to build and skipped
+    """
+    try:
+        controller_config, _ = search_config(lang_command, controller_dict)
+    except ValueError:
+        return
+    if controller_config["type"] == "policy":
+        # robomimic (and torch) are only needed once a policy checkpoint is read
+        import robomimic.utils.file_utils as FileUtils
+
+        FileUtils.POLICY_POOL.prefetch(controller_config["ckpt_path"])
+
+
 controller_dict = OrderedDict() # order of the key is important
 
 controller_dict['wait'] = {
@@ -0,0 +1,164 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+
+import robocasa
+import robocasa.macros as macros
+import robocasa.utils.object_utils as OU
+
+# bump whenever the cached values or their keys change
+GEOMETRY_CACHE_VERSION = 1
+
+# maximum number of values kept in the cache file of a layout and style
+MAX_CACHED_VALUES = 4096
+
+# cache file path -> values, shared by the scenes of this process
+_VALUES = {}
+
+
+def _fixture_key(fixture):
+    """
+    name and pose of a fixture, cached values that involve the fixture are only reused while its pose is the same
+    (e.g. accessories get a new pose from their placement sampler on every model load)
+    """
+    pos = ",".join("{:.6f}".format(x) for x in fixture.pos)
+    return "{}@{}:{:.6f}".format(fixture.name, pos, fixture.rot)
+
+
+def _to_json(value):
+    if isinstance(value, dict):
+        return {k: _to_json(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_to_json(v) for v in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class LayoutGeometry:
+    """
+    fixture geometry of a kitchen scene that only depends on its layout, style and fixture placements:
+    reset regions of fixtures, transforms between fixtures and robot base placement poses in front of fixtures.
+    values are computed on first use, and persisted per layout and style in macros.LAYOUT_GEOMETRY_CACHE_DIR
+    (kitchen_layouts/geometry_cache next to the layout yamls by default), so that later model loads and other
+    processes only look them up
+    """
+    def __init__(self, env):
+        self.env = env
+        self.fixtures = env.fixtures
+        cache_dir = macros.LAYOUT_GEOMETRY_CACHE_DIR or os.path.join(
+            robocasa.models.assets_root, "kitchen_layouts", "geometry_cache"
+        )
+        self.path = os.path.join(cache_dir, "layout{}_style{}.json".format(env.layout_id, env.style_id))
+        if self.path not in _VALUES:
+            _VALUES[self.path] = self._load()
+        self._data = _VALUES[self.path]
+        self._dirty = False
+
+    def is_valid(self, env):
+        return self.env is env and self.fixtures is env.fixtures
+
+    def _is_scene_fixture(self, fixture):
+        return fixture is not None and self.fixtures.get(getattr(fixture, "name", None)) is fixture
+
+    def _lookup(self, key, compute):
+        value = self._data.get(key)
+        if value is None:
+            value = _to_json(compute())
+            self._data[key] = value
+            self._dirty = True
+        return value
+
+    def reset_regions(self, fixture, **kwargs):
+        """
+        fixture.get_reset_regions(env, **kwargs) for a fixture of this scene. results are only cached if the ref
+        argument is None, a fixture or an exact fixture name, refs by fixture type are resolved randomly
+        """
+        ref = kwargs.get("ref", None)
+        if isinstance(ref, str) and ref in self.fixtures:
+            ref = self.fixtures[ref]
+        if not self._is_scene_fixture(fixture) or (ref is not None and not self._is_scene_fixture(ref)):
+            return fixture.get_reset_regions(self.env, **kwargs)
+
+        key = "regions|{}|{}|{}".format(
+            _fixture_key(fixture),
+            _fixture_key(ref) if ref is not None else None,
+            json.dumps(_to_json({k: v for k, v in kwargs.items() if k != "ref"}), sort_keys=True),
+        )
+        regions = self._lookup(key, lambda: fixture.get_reset_regions(self.env, **kwargs))
+        return {
+            name: dict(offset=tuple(region["offset"]), size=tuple(region["size"]))
+            for name, region in regions.items()
+        }
+
+    def rel_transform(self, fixture_A, fixture_B):
+        """
+        OU.get_rel_transform for two fixtures of this scene
+        """
+        if not (self._is_scene_fixture(fixture_A) and self._is_scene_fixture(fixture_B)):
+            return OU.get_rel_transform(fixture_A, fixture_B)
+        key = "transform|{}|{}".format(_fixture_key(fixture_A), _fixture_key(fixture_B))
+        pos, mat = self._lookup(key, lambda: OU.get_rel_transform(fixture_A, fixture_B))
+        return np.array(pos), np.array(mat)
+
+    def robot_base_pose(self, ref_fixture, offset=None, base_fixtures=()):
+        """
+        env._compute_robot_base_placement_pose for a fixture of this scene. other references (e.g. objects,
+        which move) are computed every time. base_fixtures are the fixtures the pose depends on besides ref_fixture
+        """
+        if not self._is_scene_fixture(ref_fixture):
+            return self.env._compute_robot_base_placement_pose(ref_fixture, offset=offset)
+        key = "base_pose|{}|{}|{}".format(
+            _fixture_key(ref_fixture),
+            hashlib.sha1("|".join(_fixture_key(fxtr) for fxtr in base_fixtures).encode("utf-8")).hexdigest(),
+            json.dumps(_to_json(offset)),
+        )
+        pos, ori = self._lookup(key, lambda: self.env._compute_robot_base_placement_pose(ref_fixture, offset=offset))
+        return np.array(pos), np.array(ori)
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != GEOMETRY_CACHE_VERSION:
+            return {}
+        return data.get("values", {})
+
+    def save(self):
+        """
+        write new values to the cache file, merged with values written by other processes in the meantime
+        """
+        if not self._dirty:
+            return
+        values = self._load()
+        values.update(self._data)
+        if len(values) > MAX_CACHED_VALUES:
+            # drop the oldest values, e.g. of accessory poses that are not sampled again
+            values = dict(list(values.items())[-MAX_CACHED_VALUES:])
+        self._data.clear()
+        self._data.update(values)
+        tmp_path = "{}.{}.tmp".format(self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(dict(version=GEOMETRY_CACHE_VERSION, values=values), f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # e.g. read-only assets, values are still cached for this scene
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._dirty = False
+
+
+def get_layout_geometry(env):
+    """
+    return the geometry cache of the scene currently loaded in env, or None while its fixtures are being placed
+    """
+    geometry = getattr(env, "_layout_geometry", None)
+    if geometry is None or not geometry.is_valid(env):
+        return None
+    return geometry
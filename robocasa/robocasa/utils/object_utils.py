@@ -248,6 +248,107 @@ def objs_intersect(
     return intersect
 
 
+def get_bbox_offsets(obj):
+    """
+    bounding box points of an MJCFObject or Fixture relative to its position, before rotation.
+    returns None for other objects, which are checked with their horizontal radius
+    """
+    from robocasa.models.objects.fixtures import Fixture
+    if isinstance(obj, MJCFObject):
+        return np.array(obj.get_bbox_points())
+    if isinstance(obj, Fixture):
+        return np.array(obj.get_ext_sites(all_points=True, relative=True))
+    return None
+
+
+def quat2mat_batch(quats):
+    """
+    rotation matrices of (N, 4) quaternions in (x,y,z,w) form, vectorized version of T.quat2mat
+    """
+    q = np.asarray(quats, dtype=np.float64)[:, [3, 0, 1, 2]]
+    n = np.sum(q * q, axis=1)
+    valid = n >= T.EPS
+    q = q * np.sqrt(2.0 / np.where(valid, n, 1.0))[:, None]
+    q2 = q[:, :, None] * q[:, None, :]
+    mats = np.stack([
+        1.0 - q2[:, 2, 2] - q2[:, 3, 3], q2[:, 1, 2] - q2[:, 3, 0], q2[:, 1, 3] + q2[:, 2, 0],
+        q2[:, 1, 2] + q2[:, 3, 0], 1.0 - q2[:, 1, 1] - q2[:, 3, 3], q2[:, 2, 3] - q2[:, 1, 0],
+        q2[:, 1, 3] - q2[:, 2, 0], q2[:, 2, 3] + q2[:, 1, 0], 1.0 - q2[:, 1, 1] - q2[:, 2, 2],
+    ], axis=1).reshape(-1, 3, 3)
+    mats[~valid] = np.eye(3)
+    return mats
+
+
+def get_obj_points_batch(obj, obj_pos, obj_mat, bbox_offsets=None):
+    """
+    world points of an object at (N, 3) positions and (N, 3, 3) rotations, as used by obj_in_region and objs_intersect:
+    the 8 bounding box points of MJCFObjects and Fixtures, and 4 horizontal radius points of other objects.
+    bbox_offsets can be passed if they are already known (see get_bbox_offsets)
+    """
+    if bbox_offsets is None:
+        bbox_offsets = get_bbox_offsets(obj)
+    if bbox_offsets is not None:
+        return np.einsum("nij,kj->nki", obj_mat, bbox_offsets) + obj_pos[:, None, :]
+    radius = obj.horizontal_radius
+    return obj_pos[:, None, :] + np.array([
+        [radius, 0, 0],
+        [-radius, 0, 0],
+        [0, radius, 0],
+        [0, -radius, 0],
+    ])
+
+
+def points_in_region_batch(obj_points, p0, px, py):
+    """
+    vectorized version of obj_in_region (without pz) for (N, K, 3) object points, returns (N,) bool array
+    """
+    u = px - p0
+    v = py - p0
+    proj_u = obj_points @ u
+    proj_v = obj_points @ v
+    in_region = (np.dot(u, p0) <= proj_u) & (proj_u <= np.dot(u, px)) & \
+        (np.dot(v, p0) <= proj_v) & (proj_v <= np.dot(v, py))
+    return np.all(in_region, axis=1)
+
+
+def objs_intersect_batch(
+    obj,
+    obj_pos,
+    obj_points,
+    other_obj,
+    other_obj_pos,
+    other_obj_points,
+):
+    """
+    vectorized version of objs_intersect, for N candidate poses of obj against one placed other_obj.
+    obj_pos and obj_points are (N, 3) and (N, K, 3), other_obj_pos and other_obj_points are (3,) and (K, 3),
+    as returned by get_obj_points_batch. returns (N,) bool array
+    """
+    from robocasa.models.objects.fixtures import Fixture
+    bbox_check = (isinstance(obj, MJCFObject) or isinstance(obj, Fixture)) and \
+        (isinstance(other_obj, MJCFObject) or isinstance(other_obj, Fixture))
+    if bbox_check:
+        # separating axis test along the face normals of both boxes. normals are not normalized,
+        # scaling an axis does not change whether there is a gap along it
+        normals = np.concatenate([
+            obj_points[:, 1:4] - obj_points[:, :1],
+            np.broadcast_to(other_obj_points[1:4] - other_obj_points[:1], (len(obj_points), 3, 3)),
+        ], axis=1)
+        obj_projs = np.einsum("nkd,nad->nak", obj_points, normals)
+        other_obj_projs = np.einsum("kd,nad->nak", other_obj_points, normals)
+        gap = (other_obj_projs.min(axis=2) > obj_projs.max(axis=2)) | (obj_projs.min(axis=2) > other_obj_projs.max(axis=2))
+        return ~np.any(gap, axis=1)
+
+    xy_collision = np.linalg.norm(obj_pos[:, :2] - other_obj_pos[:2], axis=1) <= other_obj.horizontal_radius + obj.horizontal_radius
+    dz = obj_pos[:, 2] - other_obj_pos[2]
+    z_collision = np.where(
+        dz > 0,
+        dz <= other_obj.top_offset[-1] - obj.bottom_offset[-1],
+        -dz <= obj.top_offset[-1] - other_obj.bottom_offset[-1],
+    )
+    return xy_collision & z_collision
+
+
 def normalize_joint_value(raw, joint_min, joint_max):
     return (raw - joint_min) / (joint_max - joint_min)
 
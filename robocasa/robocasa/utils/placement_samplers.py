@@ -7,7 +7,13 @@ import random
 from robosuite.models.objects import MujocoObject
 from robosuite.utils import RandomizationError
 from robosuite.utils.transform_utils import quat_multiply, euler2mat, mat2quat, convert_quat, rotate_2d_point
-from robocasa.utils.object_utils import objs_intersect, obj_in_region
+from robocasa.utils.object_utils import (
+    get_bbox_offsets,
+    quat2mat_batch,
+    get_obj_points_batch,
+    points_in_region_batch,
+    objs_intersect_batch,
+)
 
 
 class ObjectPositionSampler:
@@ -147,8 +153,18 @@ class UniformRandomSampler(ObjectPositionSampler):
 
         z_offset (float): Add a small z-offset to placements. This is useful for fixed objects
             that do not move (i.e. no free joint) to place them above the table.
+
+    Candidate placements are drawn and checked in batches, with region and intersection tests vectorized over the
+    batch. Placed objects that are too far from the sampling region to collide with any candidate are skipped.
     """
 
+    # maximum number of candidate placements tried per object
+    max_tries = 5000
+
+    # candidates drawn in the first batch, later batches are larger
+    min_batch_size = 32
+    max_batch_size = 1024
+
     def __init__(
         self,
         name,
@@ -170,6 +186,9 @@ class UniformRandomSampler(ObjectPositionSampler):
         self.rotation = rotation
         self.rotation_axis = rotation_axis
 
+        # geometry of placed objects, reused across sample() calls while they keep their pose
+        self._placed_geometry = {}
+
         if side not in self.valid_sides:
             raise ValueError("Invalid value for side, must be one of:", self.valid_sides)
 
@@ -238,6 +257,65 @@ class UniformRandomSampler(ObjectPositionSampler):
                 "Invalid rotation axis specified. Must be 'x', 'y', or 'z'. Got: {}".format(self.rotation_axis)
             )
 
+    def _sample_angles(self, n):
+        """
+        Samples @n rotation angles, batched version of the angle sampling in _sample_quat
+
+        Returns:
+            np.array: (n,) sampled angles
+        """
+        if self.rotation is None:
+            return self.rng.uniform(high=2 * np.pi, low=0, size=n)
+        elif isinstance(self.rotation, collections.abc.Iterable):
+            if isinstance(self.rotation[0], collections.abc.Iterable):
+                rotations = [random.choice(self.rotation) for _ in range(n)]
+            else:
+                rotations = [self.rotation] * n
+            return self.rng.uniform(high=[max(r) for r in rotations], low=[min(r) for r in rotations])
+        else:
+            return np.full(n, self.rotation, dtype=float)
+
+    def _angles_to_quats(self, angles):
+        """
+        Converts rotation angles about this sampler's rotation axis to quaternions
+
+        Returns:
+            np.array: (n, 4) quaternions in (w,x,y,z) form
+
+        Raises:
+            ValueError: [Invalid rotation axis]
+        """
+        axes = {"x": 1, "y": 2, "z": 3}
+        if self.rotation_axis not in axes:
+            # Invalid axis specified, raise error
+            raise ValueError(
+                "Invalid rotation axis specified. Must be 'x', 'y', or 'z'. Got: {}".format(self.rotation_axis)
+            )
+        quats = np.zeros((len(angles), 4))
+        quats[:, 0] = np.cos(angles / 2)
+        quats[:, axes[self.rotation_axis]] = np.sin(angles / 2)
+        return quats
+
+    def _get_placed_geometry(self, name, pos, quat, obj):
+        """
+        Returns the world points and bounding circle radius of a placed object, computed once per pose
+
+        Returns:
+            3-tuple: (points, radius, is_bbox) where points is a (K, 3) array
+        """
+        key = (tuple(np.asarray(pos, dtype=float)), tuple(np.asarray(quat, dtype=float)))
+        cached = self._placed_geometry.get(name)
+        if cached is not None and cached[0] == key and cached[1] is obj:
+            return cached[2]
+        pos = np.array(pos, dtype=float)
+        bbox_offsets = get_bbox_offsets(obj)
+        mat = quat2mat_batch(convert_quat(np.array(quat), to="xyzw")[None])
+        points = get_obj_points_batch(obj, pos[None], mat, bbox_offsets=bbox_offsets)[0]
+        radius = np.max(np.linalg.norm(points[:, :2] - pos[:2], axis=1))
+        geometry = (points, radius, bbox_offsets is not None)
+        self._placed_geometry[name] = (key, obj, geometry)
+        return geometry
+
     def sample(self, placed_objects=None, reference=None, on_top=True):
         """
         Uniformly sample relative to this sampler's reference_pos or @reference (if specified).
@@ -284,30 +362,58 @@ class UniformRandomSampler(ObjectPositionSampler):
                 base_offset.shape[0] == 3
             ), "Invalid reference received. Should be (x,y,z) 3-tuple, but got: {}".format(base_offset)
 
+        # get reference rotation
+        ref_quat = convert_quat(mat2quat(euler2mat([0, 0, self.reference_rot])), to="wxyz")
+
+        ### get boundary points ###
+        region_points = np.array([
+            [self.x_range[0], self.y_range[0], 0],
+            [self.x_range[1], self.y_range[0], 0],
+            [self.x_range[0], self.y_range[1], 0],
+        ])
+        for i in range(len(region_points)):
+            region_points[i][0:2] = rotate_2d_point(region_points[i][0:2], rot=self.reference_rot)
+        region_points += base_offset
+
+        # all sampled object positions lie in the region, bound it by a circle for pruning placed objects
+        region_corners = np.array([
+            region_points[0], region_points[1], region_points[2], region_points[1] + region_points[2] - region_points[0]
+        ])
+        region_center = np.mean(region_corners[:, :2], axis=0)
+        region_radius = np.max(np.linalg.norm(region_corners[:, :2] - region_center, axis=1))
+
         # Sample pos and quat for all objects assigned to this sampler
         for obj in self.mujoco_objects:
             # First make sure the currently sampled object hasn't already been sampled
             assert obj.name not in placed_objects, "Object '{}' has already been sampled!".format(obj.name)
 
+            bbox_offsets = get_bbox_offsets(obj)
+            is_bbox = bbox_offsets is not None
+            obj_radius = np.max(np.linalg.norm(bbox_offsets, axis=1)) if is_bbox else obj.horizontal_radius
+
+            # placed objects that may collide with a candidate. bounding circles are only valid for pairs
+            # of bbox objects, other pairs are checked with their horizontal radius by objs_intersect_batch
+            obstacles = []
+            if self.ensure_valid_placement:
+                for name, (pos, other_quat, other_obj) in placed_objects.items():
+                    points, radius, other_is_bbox = self._get_placed_geometry(name, pos, other_quat, other_obj)
+                    prune = is_bbox and other_is_bbox
+                    if prune and np.linalg.norm(np.array(pos[:2], dtype=float) - region_center) > \
+                            region_radius + obj_radius + radius:
+                        continue
+                    obstacles.append((np.array(pos, dtype=float), points, radius, other_obj, prune))
+
             success = False
+            num_tries = 0
+            batch_size = self.min_batch_size
+            while num_tries < self.max_tries:
+                n = min(batch_size, self.max_tries - num_tries)
+                num_tries += n
+                batch_size = min(batch_size * 4, self.max_batch_size)
 
-            # get reference rotation
-            ref_quat = convert_quat(mat2quat(euler2mat([0, 0, self.reference_rot])), to="wxyz")
-
-            ### get boundary points ###
-            region_points = np.array([
-                [self.x_range[0], self.y_range[0], 0],
-                [self.x_range[1], self.y_range[0], 0],
-                [self.x_range[0], self.y_range[1], 0],
-            ])
-            for i in range(len(region_points)):
-                region_points[i][0:2] = rotate_2d_point(region_points[i][0:2], rot=self.reference_rot)
-            region_points += base_offset
-            
-            for i in range(5000):  # 5000 retries
                 # sample object coordinates
-                relative_x = self._sample_x()
-                relative_y = self._sample_y()
+                relative_x = self.rng.uniform(high=self.x_range[1], low=self.x_range[0], size=n)
+                relative_y = self.rng.uniform(high=self.y_range[1], low=self.y_range[0], size=n)
 
                 # apply rotation
                 object_x, object_y = rotate_2d_point([relative_x, relative_y], rot=self.reference_rot)
@@ -317,47 +423,51 @@ class UniformRandomSampler(ObjectPositionSampler):
                 object_z = self.z_offset + base_offset[2]
                 if on_top:
                     object_z -= obj.bottom_offset[-1]
+                obj_pos = np.stack([object_x, object_y, np.full(n, object_z)], axis=1)
 
                 # random rotation
-                quat = self._sample_quat()
+                quats = self._angles_to_quats(self._sample_angles(n))
                 # multiply this quat by the object's initial rotation if it has the attribute specified
                 if hasattr(obj, "init_quat"):
-                    quat = quat_multiply(obj.init_quat, quat)
-                quat = convert_quat(quat_multiply(
+                    quats = quat_multiply(obj.init_quat, quats.T).T
+                quats = quat_multiply(
                     convert_quat(ref_quat, to="xyzw"),
-                    convert_quat(quat, to="xyzw"),
-                ), to="wxyz")
+                    quats[:, [1, 2, 3, 0]].T,
+                ).T[:, [3, 0, 1, 2]]
+
+                obj_points = get_obj_points_batch(
+                    obj, obj_pos, quat2mat_batch(quats[:, [1, 2, 3, 0]]), bbox_offsets=bbox_offsets,
+                )
 
-                location_valid = True
-                
                 # ensure object placed fully in region
-                if self.ensure_object_boundary_in_range and not obj_in_region(
-                    obj,
-                    obj_pos=[object_x, object_y, object_z],
-                    obj_quat=convert_quat(quat, to="xyzw"),
-                    p0=region_points[0], px=region_points[1], py=region_points[2],
-                ):
-                    location_valid = False
-                    continue
-
-                # objects cannot overlap
-                if self.ensure_valid_placement:
-                    for (x, y, z), other_quat, other_obj in placed_objects.values():
-                        if objs_intersect(
-                            obj=obj,
-                            obj_pos=[object_x, object_y, object_z],
-                            obj_quat=convert_quat(quat, to="xyzw"),
-                            other_obj=other_obj,
-                            other_obj_pos=[x, y, z],
-                            other_obj_quat=convert_quat(other_quat, to="xyzw"),
-                        ):
-                            location_valid = False
-                            break
-
-                if location_valid:
+                valid = np.ones(n, dtype=bool)
+                if self.ensure_object_boundary_in_range:
+                    valid &= points_in_region_batch(
+                        obj_points, p0=region_points[0], px=region_points[1], py=region_points[2],
+                    )
+
+                # objects cannot overlap, only test candidates that are still valid and close enough
+                for other_pos, other_points, other_radius, other_obj, prune in obstacles:
+                    check = valid.copy()
+                    if prune:
+                        check &= np.linalg.norm(obj_pos[:, :2] - other_pos[:2], axis=1) <= obj_radius + other_radius
+                    if not np.any(check):
+                        continue
+                    inds = np.flatnonzero(check)
+                    valid[inds] &= ~objs_intersect_batch(
+                        obj=obj,
+                        obj_pos=obj_pos[inds],
+                        obj_points=obj_points[inds],
+                        other_obj=other_obj,
+                        other_obj_pos=other_pos,
+                        other_obj_points=other_points,
+                    )
+
+                if np.any(valid):
                     # location is valid, put the object down
-                    pos = (object_x, object_y, object_z)
-                    placed_objects[obj.name] = (pos, quat, obj)
+                    i = np.argmax(valid)
+                    pos = (object_x[i], object_y[i], object_z)
+                    placed_objects[obj.name] = (pos, quats[i], obj)
                     success = True
                     break
 
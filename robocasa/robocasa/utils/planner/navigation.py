@@ -1,5 +1,6 @@
 from robocasa.environments.kitchen.kitchen import *
 import robocasa.utils.control_utils as CU
+from robocasa.utils.scene_registry import get_scene_registry
 
 from robomimic.envs.wrappers import EnvWrapper
 from robomimic.envs.env_robosuite import EnvRobosuite
@@ -60,22 +61,16 @@ class NavigationPlanner:
         # get target fixture randomly
         if extra_para == None:
             
+            registry = get_scene_registry(env)
             fixtures = list(env.fixtures.values())
-            fxtr_classes = [type(fxtr).__name__ for fxtr in fixtures]
-            valid_target_fxtr_classes = [
-                cls for cls in fxtr_classes if fxtr_classes.count(cls) == 1 and cls in [
-                    "CoffeeMachine", "Toaster", "Stove", "Stovetop", "OpenCabinet",
-                    "Microwave", "Sink", "Hood", "Oven", "Fridge", "Dishwasher",
-                ]
-            ]
             while True:
                 self.target_fixture = env.rng.choice(fixtures)
-                fxtr_class = type(self.target_fixture).__name__
-                if fxtr_class not in valid_target_fxtr_classes:
+                fixture_str = type(self.target_fixture).__name__.lower()
+                if fixture_str not in registry.fixture_by_key:
                     continue
                 break
                 
-            self.target_pos, self.target_ori = env.compute_robot_base_placement_pose(self.target_fixture)
+            self.target_pos, self.target_ori = registry.base_pose(fixture_str)
         
         # navigate back to the second to last position
         elif extra_para == 'back':
@@ -154,61 +149,17 @@ class NavigationPlanner:
         # navigate to the given fixture or object
         else:
             
-            # handle special object or fixture cases
-
-            # "navigate to counter"
-            if extra_para == 'counter':
-                # find the object on the counter
-                for obj_cfg in env.object_cfgs:
-                    if 'fixture' in obj_cfg['placement'] and type(obj_cfg['placement']['fixture']).__name__.lower() == "counter":
-                        extra_para = obj_cfg['name']
-                        break
-            
-            # "navigate to cabinet"
-            elif extra_para == 'cabinet':
-                # find the object in the cabinet
-                for obj_cfg in env.object_cfgs:
-                    if 'fixture' in obj_cfg['placement'] and 'cabinet' in type(obj_cfg['placement']['fixture']).__name__.lower():
-                        extra_para = obj_cfg['name']
-                        break
-            
-            # get valid object and fixture keys
-            object_keys = env.objects.keys()
-            fixtures = list(env.fixtures.values())
-            fxtr_classes = [type(fxtr).__name__ for fxtr in fixtures]
-            valid_target_fxtr_classes = [
-                cls for cls in fxtr_classes if fxtr_classes.count(cls) == 1 and cls in [
-                    "CoffeeMachine", "Toaster", "Stove", "Stovetop", "OpenCabinet",
-                    "Microwave", "Sink", "Hood", "Oven", "Fridge", "Dishwasher",
-                ]
-            ]
-            fixture_keys = [fxtr.lower() for fxtr in valid_target_fxtr_classes]
-            
-            # navigate to the given object
-            if extra_para in object_keys: # navigate to the given object
-                obj_str = extra_para # obj_str should be one of the names in env._get_obj_cfgs()
-                obj = env.objects[obj_str] # rot
-                obj.pos = obs[obj_str + '_pos'] # pos
-                self.target_pos, self.target_ori = env.compute_robot_base_placement_pose(obj)
-                if self.id == 0:
-                    robot0_history.append((self.target_pos, self.target_ori))
-                elif self.id == 1:
-                    robot1_history.append((self.target_pos, self.target_ori))
+            # handle special object or fixture cases, "navigate to counter" and "navigate to cabinet"
+            # go to the object on the counter or in the cabinet
+            registry = get_scene_registry(env)
+            extra_para = registry.resolve(extra_para)
             
-            # navigate to the given fixture
-            elif extra_para in fixture_keys: # navigate to the given fixture
-                fixture_str = extra_para
-                for fxtr in fixtures:
-                    if type(fxtr).__name__.lower() == fixture_str:
-                        fixture = fxtr
-                self.target_pos, self.target_ori = env.compute_robot_base_placement_pose(fixture)
-                if self.id == 0:
-                    robot0_history.append((self.target_pos, self.target_ori))
-                elif self.id == 1:
-                    robot1_history.append((self.target_pos, self.target_ori))
-            
-            else:
-                raise ValueError(f'there is no fixture or object {extra_para} in the environment!')
+            # navigate to the given object or fixture
+            self.target_pos, self.target_ori = registry.base_pose(extra_para, obs)
+            if self.id == 0:
+                robot0_history.append((self.target_pos, self.target_ori))
+            elif self.id == 1:
+                robot1_history.append((self.target_pos, self.target_ori))
         
         # get base position and orientation
         base_pos = obs[f'robot{self.id}_base_pos'][:2]
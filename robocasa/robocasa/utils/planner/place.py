@@ -1,5 +1,6 @@
 from robocasa.environments.kitchen.kitchen import *
 import robocasa.utils.control_utils as CU
+from robocasa.utils.scene_registry import get_scene_registry
 
 from robomimic.envs.wrappers import EnvWrapper
 from robomimic.envs.env_robosuite import EnvRobosuite
@@ -31,16 +32,7 @@ class PlaceToPlanner:
         self.init_base_height = obs[f'robot{self.id}_base_pos'][2]
         
         # get valid object and fixture keys
-        object_keys = env.objects.keys()
-        fixtures = list(env.fixtures.values())
-        fxtr_classes = [type(fxtr).__name__ for fxtr in fixtures]
-        valid_target_fxtr_classes = [
-            cls for cls in fxtr_classes if fxtr_classes.count(cls) == 1 and cls in [
-                "CoffeeMachine", "Toaster", "Stove", "Stovetop", "OpenCabinet",
-                "Microwave", "Sink", "Hood", "Oven", "Fridge", "Dishwasher",
-            ]
-        ]
-        fixture_keys = [fxtr.lower() for fxtr in valid_target_fxtr_classes]
+        registry = get_scene_registry(env)
 
         # guess what object the gripper is holding
         self.obj_hold = None
@@ -49,34 +41,16 @@ class PlaceToPlanner:
                 self.obj_hold = name
                 break
         
-        # handle special cases
-
-        # "place to counter"
-        if extra_para == 'counter':
-            # find the object on the counter
-            for obj_cfg in env.object_cfgs:
-                if 'fixture' in obj_cfg['placement'] and type(obj_cfg['placement']['fixture']).__name__.lower() == "counter":
-                    extra_para = obj_cfg['name']
-                    break
-        
-        # "place to cabinet"
-        elif extra_para == 'cabinet':
-            # find the object in the cabinet
-            for obj_cfg in env.object_cfgs:
-                if 'fixture' in obj_cfg['placement'] and 'cabinet' in type(obj_cfg['placement']['fixture']).__name__.lower():
-                    extra_para = obj_cfg['name']
-                    break
+        # handle special cases, "place to counter" and "place to cabinet" place to the object on the counter or in the cabinet
+        extra_para = registry.resolve(extra_para)
         
         # handle different extra_para types
         
         # if extra_para is object keys, place to object surface
-        if extra_para in object_keys:
+        if extra_para in registry.objects:
             self.obj_str = extra_para # obj_str should be one of the names in env._get_obj_cfgs()
-            for obj_cfg in env.object_cfgs:
-                if obj_cfg['name'] == self.obj_str:
-                    self.fxtr_str = type(obj_cfg['placement']['fixture']).__name__.lower()
-                    self.fixture = obj_cfg['placement']['fixture']
-                    break
+            self.fxtr_str = registry.object_fixture_class[self.obj_str]
+            self.fixture = registry.object_fixture[self.obj_str]
             
             # calculate placement position
             
@@ -133,13 +107,10 @@ class PlaceToPlanner:
                 self.above_placement_pos = self.placement_pos + np.array([0, 0, 0.10]) # move above the object first
         
         # if extra_para is fixture keys, place to fixture surface
-        elif extra_para in fixture_keys:
+        elif extra_para in registry.fixture_by_key:
             self.obj_str = None
             self.fxtr_str = extra_para
-            for fxtr in fixtures:
-                if type(fxtr).__name__.lower() == self.fxtr_str:
-                    self.fixture = fxtr
-                    break
+            self.fixture = registry.fixture_by_key[self.fxtr_str]
             
             # calculate placement position
             
@@ -147,10 +118,7 @@ class PlaceToPlanner:
             if self.fxtr_str == 'microwave':
                 
                 # find the object in the microwave
-                for obj_cfg in env.object_cfgs:
-                    if 'fixture' in obj_cfg['placement'] and type(obj_cfg['placement']['fixture']).__name__.lower() == "microwave":
-                        self.obj_str = obj_cfg['name']
-                        break
+                self.obj_str = registry.object_on("microwave")
                 self.placement_pos = obs[self.obj_str + '_pos'] + np.array([0, 0, 0.12])
                 
                 # calculate placement rotation matrix
@@ -0,0 +1,114 @@
+import numpy as np
+
+# fixture classes that planners and checkers can target, when there is exactly one of them in the scene
+TARGET_FIXTURE_CLASSES = [
+    "CoffeeMachine", "Toaster", "Stove", "Stovetop", "OpenCabinet",
+    "Microwave", "Sink", "Hood", "Oven", "Fridge", "Dishwasher",
+]
+
+
+class SceneRegistry:
+    """
+    name resolution of one kitchen scene, shared by planners, checkers and rollout scripts.
+    maps command arguments ("microwave", "counter", object names, ...) to fixtures and objects,
+    and caches the robot base placement pose of each target. built on first use after a model is loaded,
+    and replaced once the env loads a new layout (fixtures and objects are rebuilt in _load_model)
+    """
+    def __init__(self, env):
+        self.env = env
+        self.fixtures = env.fixtures
+        self.objects = env.objects
+
+        # unique target fixtures by lower case class name, in fixture order
+        class_counts = {}
+        for fxtr in self.fixtures.values():
+            cls = type(fxtr).__name__
+            class_counts[cls] = class_counts.get(cls, 0) + 1
+        self.fixture_by_key = {
+            type(fxtr).__name__.lower(): fxtr for fxtr in self.fixtures.values()
+            if class_counts[type(fxtr).__name__] == 1 and type(fxtr).__name__ in TARGET_FIXTURE_CLASSES
+        }
+        self.fixture_keys = list(self.fixture_by_key.keys())
+        self.object_keys = list(self.objects.keys())
+
+        # fixture each object was placed on or in, and its lower case class name
+        self.object_fixture = {}
+        for obj_cfg in env.object_cfgs:
+            fixture = obj_cfg.get("placement", {}).get("fixture")
+            if fixture is not None and obj_cfg["name"] not in self.object_fixture:
+                self.object_fixture[obj_cfg["name"]] = fixture
+        self.object_fixture_class = {
+            name: type(fixture).__name__.lower() for name, fixture in self.object_fixture.items()
+        }
+
+        self._fixture_poses = {}
+        self._object_poses = {}
+
+    def is_valid(self, env):
+        return self.env is env and self.fixtures is env.fixtures and self.objects is env.objects
+
+    def command_keys(self):
+        """
+        fixture and object names offered to the language model, e.g. OpenCabinet is called cabinet
+        and container objects are only reached through the fixture they are in
+        """
+        object_keys = [x for x in self.object_keys if not x.endswith('_container')]
+        fixture_keys = ['cabinet' if x == 'opencabinet' else x for x in self.fixture_keys]
+        fixture_keys.append('counter')
+        return fixture_keys, object_keys
+
+    def object_on(self, fixture_str, exact=True):
+        """
+        first object placed on a fixture whose class name equals (or contains, if not exact) fixture_str, None if there is none
+        """
+        for name, cls in self.object_fixture_class.items():
+            if cls == fixture_str or (not exact and fixture_str in cls):
+                return name
+        return None
+
+    def resolve(self, extra_para):
+        """
+        resolve "counter" and "cabinet" to the object placed on the counter or in the cabinet, other arguments are unchanged
+        """
+        if extra_para == 'counter':
+            return self.object_on("counter") or extra_para
+        if extra_para == 'cabinet':
+            return self.object_on("cabinet", exact=False) or extra_para
+        return extra_para
+
+    def base_pose(self, target, obs=None):
+        """
+        robot base placement pose in front of a fixture key or object name, objects are located with obs
+        the pose of an object is cached for its last position rounded to millimeters
+        """
+        if target in self.objects:
+            obj = self.objects[target]
+            obj.pos = obs[target + '_pos']
+            key = tuple(np.round(np.asarray(obj.pos, dtype=float), 3))
+            cached = self._object_poses.get(target)
+            if cached is None or cached[0] != key:
+                cached = (key, self.env.compute_robot_base_placement_pose(obj))
+                self._object_poses[target] = cached
+            pose = cached[1]
+
+        elif target in self.fixture_by_key:
+            if target not in self._fixture_poses:
+                self._fixture_poses[target] = self.env.compute_robot_base_placement_pose(self.fixture_by_key[target])
+            pose = self._fixture_poses[target]
+
+        else:
+            raise ValueError(f'there is no fixture or object {target} in the environment!')
+
+        # copies, callers keep and modify target poses
+        return np.copy(pose[0]), np.copy(pose[1])
+
+
+def get_scene_registry(env):
+    """
+    return the registry of the scene currently loaded in env, building it if the layout changed
+    """
+    registry = getattr(env, "_scene_registry", None)
+    if registry is None or not registry.is_valid(env):
+        registry = SceneRegistry(env)
+        env._scene_registry = registry
+    return registry
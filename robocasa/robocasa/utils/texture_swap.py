@@ -4,7 +4,6 @@ from pathlib import Path
 from lxml import etree as ET
 from copy import deepcopy
 import os
-from robosuite.utils.mjcf_utils import find_elements
 import numpy as np
 import robocasa
 
@@ -436,90 +435,94 @@ def get_random_textures(frac=1.0):
 
     return textures
 
-def replace_counter_top_texture(
-    initial_state: str, 
-    new_counter_top_texture_file: str=None
-):
+class AssetIndex:
     """
-    This function replaces the counter top textures during playback.
+    Materials and textures of the asset element of a parsed model, indexed by name once, so that
+    several texture swaps can be applied to the same tree without searching it again.
+    Works on xml.etree and lxml trees alike.
 
     Args:
-        initial_state (str): Initial env XML string
-        new_counter_top_texture_file (str): New texture file for counter top: i.e "marble/dark_marble.png"
-            If None (default), will replace with a random texture from marble directory
+        root (Element): root of the parsed model xml
     """
+    def __init__(self, root):
+        self.asset = root.find("asset")
+        self.materials = self.asset.findall("material")
+        self.textures = {}
+        for tex in self.asset.findall("texture"):
+            self.textures.setdefault(tex.get("name"), []).append(tex)
+
+    def find_texture(self, name):
+        textures = self.textures.get(name)
+        return textures[0] if textures else None
+
+    def add_texture(self, **attribs):
+        tex = self.asset.makeelement("texture", attribs)
+        self.asset.append(tex)
+        self.textures.setdefault(tex.get("name"), []).append(tex)
+        return tex
+
+    def rename_texture(self, name, new_name):
+        """
+        Renames all textures called @name, and returns them
+        """
+        textures = self.textures.pop(name, [])
+        for tex in textures:
+            tex.set("name", new_name)
+        self.textures.setdefault(new_name, []).extend(textures)
+        return textures
+
+
+def swap_counter_top_texture(assets, texture_file):
+    """
+    Replaces the counter top texture of an indexed model in place.
 
-    root = ET.fromstring(initial_state)
-    asset = root.find("asset")
-    
-    if new_counter_top_texture_file is None:
-        new_counter_top_texture_file = get_random_textures()["counter_tex"]
-    else:
-        new_counter_top_texture_file = os.path.join(TEXTURES_DIR, new_counter_top_texture_file)
-
+    Args:
+        assets (AssetIndex): assets of the model
+        texture_file (str): path of the new texture file
+    """
     # step 1: find the name of texture that will be replaced
     counter_tex_name = None
-    for mat in asset.findall("material"):
+    for mat in assets.materials:
         name = mat.get("name")
         if "counter_top" in name:
             counter_tex_name = mat.get("texture")
             break
     assert counter_tex_name is not None
-    
+
     # step 2: find and replace texture element
     CTOP_TEX_NAME = "counter_top_replacement_texture"
-    for tex in asset.findall("texture"):
-        name = tex.get("name")
-        if name == counter_tex_name:
-            tex.set("name", CTOP_TEX_NAME)
-            tex.set("file", str(new_counter_top_texture_file))
+    for tex in assets.rename_texture(counter_tex_name, CTOP_TEX_NAME):
+        tex.set("file", str(texture_file))
 
     # step 3: reference new textures in materials
-    for mat in asset.findall("material"):
+    for mat in assets.materials:
         name = mat.get("name")
         if "counter_top" in name:
             mat.set("texture", CTOP_TEX_NAME)
 
-    return ET.tostring(root).decode("utf-8")
-
-def replace_cab_textures(
-    initial_state: str, 
-    new_cab_texture_file: str=None
-):
+def swap_cab_textures(assets, texture_file):
     """
-    This function replaces the cabinet and counter base textures during playback.
+    Replaces the cabinet and counter base textures of an indexed model in place.
 
     Args:
-        initial_state (str): Initial env XML string
-        new_cab_texture_file (str): New texture file for counter base and cabinets: i.e "cabinet/..."
-            If None (default), will replace with a random texture from flat or wood directories
+        assets (AssetIndex): assets of the model
+        texture_file (str): path of the new texture file
     """
-
-    root = ET.fromstring(initial_state)
-    asset = root.find("asset")
-    
-    if new_cab_texture_file is None:
-        new_cab_texture_file = get_random_textures()["cab_tex"]
-    else:
-        new_cab_texture_file = os.path.join(TEXTURES_DIR, new_cab_texture_file)
-
     CAB_TEX_NAME_2D = "cab_replacement_texture_2d"
-    tex_2d = find_elements(asset, tags="texture", attribs={"name" : CAB_TEX_NAME_2D}, return_first=True)
+    tex_2d = assets.find_texture(CAB_TEX_NAME_2D)
     if tex_2d is not None:
-        tex_2d.set("file", str(new_cab_texture_file))
+        tex_2d.set("file", str(texture_file))
     else:
-        tex_2d = ET.Element("texture", type="2d", name=CAB_TEX_NAME_2D, file=str(new_cab_texture_file))
-        asset.append(tex_2d)
+        assets.add_texture(type="2d", name=CAB_TEX_NAME_2D, file=str(texture_file))
 
     CAB_TEX_NAME_CUBE = "cab_replacement_texture_cube"
-    tex_cube = find_elements(asset, tags="texture", attribs={"name" : CAB_TEX_NAME_CUBE}, return_first=True)
+    tex_cube = assets.find_texture(CAB_TEX_NAME_CUBE)
     if tex_cube is not None:
-        tex_cube.set("file", str(new_cab_texture_file))
+        tex_cube.set("file", str(texture_file))
     else:
-        tex_cube = ET.Element("texture", type="cube", name=CAB_TEX_NAME_CUBE, file=str(new_cab_texture_file))
-        asset.append(tex_cube)
-    
-    for mat in asset.findall("material"):
+        assets.add_texture(type="cube", name=CAB_TEX_NAME_CUBE, file=str(texture_file))
+
+    for mat in assets.materials:
         name = mat.get("name")
         if "counter_base" in name:
             mat.set("texture", CAB_TEX_NAME_CUBE)
@@ -541,6 +544,126 @@ def replace_cab_textures(
             else:
                 mat.set("texture", CAB_TEX_NAME_CUBE)
 
+def swap_floor_texture(assets, texture_file):
+    """
+    Replaces the floor texture of an indexed model in place.
+
+    Args:
+        assets (AssetIndex): assets of the model
+        texture_file (str): path of the new texture file
+    """
+    # step 1: find the name of texture that will be replaced
+    floor_tex_name = None
+    for mat in assets.materials:
+        name = mat.get("name")
+        if "floor" in name and "backing" not in name:
+            floor_tex_name = mat.get("texture")
+            break
+    assert floor_tex_name is not None
+
+    # step 2: find and replace texture element
+    FLOOR_TEX_NAME = "floor_replacement_texture"
+    for tex in assets.rename_texture(floor_tex_name, FLOOR_TEX_NAME):
+        tex.set("file", str(texture_file))
+        tex.set("type", "2d")
+
+    # step 3: reference new textures in materials
+    for mat in assets.materials:
+        name = mat.get("name")
+        if "floor" in name and "backing" not in name:
+            mat.set("texture", FLOOR_TEX_NAME)
+            mat.set("texrepeat", "2 2")
+
+def swap_wall_texture(assets, texture_file):
+    """
+    Replaces the wall texture of an indexed model in place.
+
+    Args:
+        assets (AssetIndex): assets of the model
+        texture_file (str): path of the new texture file
+    """
+    # step 1: find the name of texture that will be replaced
+    wall_tex_name = None
+    for mat in assets.materials:
+        name = mat.get("name")
+        if "wall" in name and "floor" not in name and "backing" not in name:
+            wall_tex_name = mat.get("texture")
+            break
+    assert wall_tex_name is not None
+
+    # step 2: add new texture element
+    WALL_TEX_NAME = "wall_replacement_texture"
+    for tex in assets.rename_texture(wall_tex_name, WALL_TEX_NAME):
+        tex.set("file", str(texture_file))
+        tex.set("type", "2d")
+
+    # step 3: reference new textures in materials
+    for mat in assets.materials:
+        name = mat.get("name")
+        if "wall" in name and "floor" not in name and "backing" not in name:
+            mat.set("texture", WALL_TEX_NAME)
+            mat.set("texrepeat", "3 3")
+
+def swap_textures(root, textures):
+    """
+    Applies all generative texture swaps to a parsed model in place, indexing its assets once.
+
+    Args:
+        root (Element): root of the parsed model xml
+        textures (dict): texture files, as returned by get_random_textures
+    """
+    assets = AssetIndex(root)
+    swap_cab_textures(assets, textures["cab_tex"])
+    swap_counter_top_texture(assets, textures["counter_tex"])
+    swap_wall_texture(assets, textures["wall_tex"])
+    swap_floor_texture(assets, textures["floor_tex"])
+
+def replace_counter_top_texture(
+    initial_state: str, 
+    new_counter_top_texture_file: str=None
+):
+    """
+    This function replaces the counter top textures during playback.
+
+    Args:
+        initial_state (str): Initial env XML string
+        new_counter_top_texture_file (str): New texture file for counter top: i.e "marble/dark_marble.png"
+            If None (default), will replace with a random texture from marble directory
+    """
+
+    root = ET.fromstring(initial_state)
+    
+    if new_counter_top_texture_file is None:
+        new_counter_top_texture_file = get_random_textures()["counter_tex"]
+    else:
+        new_counter_top_texture_file = os.path.join(TEXTURES_DIR, new_counter_top_texture_file)
+
+    swap_counter_top_texture(AssetIndex(root), new_counter_top_texture_file)
+
+    return ET.tostring(root).decode("utf-8")
+
+def replace_cab_textures(
+    initial_state: str, 
+    new_cab_texture_file: str=None
+):
+    """
+    This function replaces the cabinet and counter base textures during playback.
+
+    Args:
+        initial_state (str): Initial env XML string
+        new_cab_texture_file (str): New texture file for counter base and cabinets: i.e "cabinet/..."
+            If None (default), will replace with a random texture from flat or wood directories
+    """
+
+    root = ET.fromstring(initial_state)
+    
+    if new_cab_texture_file is None:
+        new_cab_texture_file = get_random_textures()["cab_tex"]
+    else:
+        new_cab_texture_file = os.path.join(TEXTURES_DIR, new_cab_texture_file)
+
+    swap_cab_textures(AssetIndex(root), new_cab_texture_file)
+
     return ET.tostring(root).decode("utf-8")
 
 def replace_floor_texture(
@@ -557,37 +680,13 @@ def replace_floor_texture(
     """
 
     root = ET.fromstring(initial_state)
-    asset = root.find("asset")
     
     if new_floor_texture_file is None:
         new_floor_texture_file = get_random_textures()["floor_tex"]
     else:
         new_floor_texture_file = os.path.join(TEXTURES_DIR, new_floor_texture_file)
 
-    # step 1: find the name of texture that will be replaced
-    floor_tex_name = None
-    for mat in asset.findall("material"):
-        name = mat.get("name")
-        if "floor" in name and "backing" not in name:
-            floor_tex_name = mat.get("texture")
-            break
-    assert floor_tex_name is not None
-
-    # step 2: find and replace texture element
-    FLOOR_TEX_NAME = "floor_replacement_texture"
-    for tex in asset.findall("texture"):
-        name = tex.get("name")
-        if name == floor_tex_name:
-            tex.set("name", FLOOR_TEX_NAME)
-            tex.set("file", str(new_floor_texture_file))
-            tex.set("type", "2d")
-
-    # step 3: reference new textures in materials
-    for mat in asset.findall("material"):
-        name = mat.get("name")
-        if "floor" in name and "backing" not in name:
-            mat.set("texture", FLOOR_TEX_NAME)
-            mat.set("texrepeat", "2 2")
+    swap_floor_texture(AssetIndex(root), new_floor_texture_file)
 
     return ET.tostring(root).decode("utf-8")
 
@@ -605,36 +704,12 @@ def replace_wall_texture(
     """
 
     root = ET.fromstring(initial_state)
-    asset = root.find("asset")
     
     if new_wall_texture_file is None:
         new_wall_texture_file = get_random_textures()["wall_tex"]
     else:
         new_wall_texture_file = os.path.join(TEXTURES_DIR, new_wall_texture_file)
 
-    # step 1: find the name of texture that will be replaced
-    wall_tex_name = None
-    for mat in asset.findall("material"):
-        name = mat.get("name")
-        if "wall" in name and "floor" not in name and "backing" not in name:
-            wall_tex_name = mat.get("texture")
-            break
-    assert wall_tex_name is not None
-
-    # step 2: add new texture element
-    WALL_TEX_NAME = "wall_replacement_texture"
-    for tex in asset.findall("texture"):
-        name = tex.get("name")
-        if name == wall_tex_name:
-            tex.set("name", WALL_TEX_NAME)
-            tex.set("file", str(new_wall_texture_file))
-            tex.set("type", "2d")
-
-    # step 3: reference new textures in materials
-    for mat in asset.findall("material"):
-        name = mat.get("name")
-        if "wall" in name and "floor" not in name and "backing" not in name:
-            mat.set("texture", WALL_TEX_NAME)
-            mat.set("texrepeat", "3 3")
+    swap_wall_texture(AssetIndex(root), new_wall_texture_file)
 
-    return ET.tostring(root).decode("utf-8")
\ No newline at end of file
+    return ET.tostring(root).decode("utf-8")
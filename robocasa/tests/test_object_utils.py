@@ -0,0 +1,154 @@
+"""
+Test script for the batched placement geometry in object_utils. Random poses of a bounding box object and a primitive
+object are checked with the batched helpers used by UniformRandomSampler (quat2mat_batch, get_obj_points_batch,
+points_in_region_batch, objs_intersect_batch) and compared against the per-pose functions they replaced
+(T.quat2mat, obj_in_region, objs_intersect). Also checks that the bounding circle pruning of the sampler never skips
+an intersecting pair, and that sampled placements are valid according to the per-pose functions.
+"""
+import numpy as np
+import pytest
+
+import robosuite.utils.transform_utils as T
+from robosuite.models.objects import BoxObject
+
+import robocasa.utils.object_utils as OU
+from robocasa.models.objects.objects import MJCFObject
+from robocasa.utils.placement_samplers import UniformRandomSampler
+
+BOX_XML = """
+<mujoco model="{name}">
+  <asset/>
+  <worldbody>
+    <body>
+      <body name="object">
+        <geom pos="0 0 0" size="{sx} {sy} {sz}" type="box" group="0"/>
+      </body>
+      <site rgba="0 0 0 0" size="0.005" pos="0 0 -{sz}" name="bottom_site"/>
+      <site rgba="0 0 0 0" size="0.005" pos="0 0 {sz}" name="top_site"/>
+      <site rgba="0 0 0 0" size="0.005" pos="{sx} {sy} 0" name="horizontal_radius_site"/>
+    </body>
+  </worldbody>
+</mujoco>
+"""
+
+NUM_POSES = 500
+
+
+def _make_bbox_object(tmp_path, name, size):
+    path = tmp_path / "{}.xml".format(name)
+    path.write_text(BOX_XML.format(name=name, sx=size[0], sy=size[1], sz=size[2]))
+    return MJCFObject(name=name, mjcf_path=str(path))
+
+
+@pytest.fixture
+def objects(tmp_path):
+    return [
+        _make_bbox_object(tmp_path, "bbox_a", (0.08, 0.03, 0.05)),
+        _make_bbox_object(tmp_path, "bbox_b", (0.04, 0.06, 0.02)),
+        BoxObject(name="primitive", size=(0.03, 0.03, 0.04)),
+    ]
+
+
+def _random_poses(rng, n):
+    pos = np.concatenate([rng.uniform(-0.25, 0.25, size=(n, 2)), rng.uniform(-0.02, 0.02, size=(n, 1))], axis=1)
+    # mostly rotations about z as in the samplers, with some arbitrary rotations
+    angles = rng.uniform(-np.pi, np.pi, size=n)
+    quats = np.zeros((n, 4))
+    quats[:, 2] = np.sin(angles / 2)
+    quats[:, 3] = np.cos(angles / 2)
+    tilted = rng.uniform(size=n) < 0.2
+    quats[tilted] = rng.normal(size=(np.sum(tilted), 4))
+    quats /= np.linalg.norm(quats, axis=1, keepdims=True)
+    return pos, quats
+
+
+def test_quat2mat_batch():
+    rng = np.random.default_rng(0)
+    quats = rng.normal(size=(NUM_POSES, 4))
+    quats[:NUM_POSES // 2] /= np.linalg.norm(quats[:NUM_POSES // 2], axis=1, keepdims=True)
+    quats[0] = 0.0
+    mats = OU.quat2mat_batch(quats)
+    assert mats.dtype == np.float64
+    for quat, mat in zip(quats, mats):
+        assert np.allclose(mat, T.quat2mat(quat), atol=1e-12)
+
+
+def test_points_in_region_batch(objects):
+    rng = np.random.default_rng(1)
+    for obj in objects:
+        pos, quats = _random_poses(rng, NUM_POSES)
+        points = OU.get_obj_points_batch(obj, pos, OU.quat2mat_batch(quats))
+        for rot in (0.0, 0.7):
+            region_points = np.array([[-0.2, -0.15, 0.0], [0.2, -0.15, 0.0], [-0.2, 0.15, 0.0]])
+            region_points[:, :2] = np.array([T.rotate_2d_point(p, rot=rot) for p in region_points[:, :2]])
+            in_region = OU.points_in_region_batch(points, p0=region_points[0], px=region_points[1], py=region_points[2])
+            expected = [
+                OU.obj_in_region(obj, p, q, p0=region_points[0], px=region_points[1], py=region_points[2])
+                for p, q in zip(pos, quats)
+            ]
+            assert np.any(expected) and not np.all(expected)
+            assert list(in_region) == expected
+
+
+def test_objs_intersect_batch(objects):
+    rng = np.random.default_rng(2)
+    for obj in objects:
+        for other_obj in objects:
+            other_pos, other_quat = _random_poses(rng, 1)
+            other_points = OU.get_obj_points_batch(other_obj, other_pos, OU.quat2mat_batch(other_quat))[0]
+            pos, quats = _random_poses(rng, NUM_POSES)
+            points = OU.get_obj_points_batch(obj, pos, OU.quat2mat_batch(quats))
+            intersect = OU.objs_intersect_batch(
+                obj=obj, obj_pos=pos, obj_points=points,
+                other_obj=other_obj, other_obj_pos=other_pos[0], other_obj_points=other_points,
+            )
+            expected = [
+                OU.objs_intersect(obj, p, q, other_obj, other_pos[0], other_quat[0])
+                for p, q in zip(pos, quats)
+            ]
+            assert np.any(expected) and not np.all(expected)
+            assert list(intersect) == expected
+
+            # bounding circles as computed by the sampler, pairs of bbox objects outside of them never intersect
+            bbox_offsets = OU.get_bbox_offsets(obj)
+            if bbox_offsets is None or OU.get_bbox_offsets(other_obj) is None:
+                continue
+            obj_radius = np.max(np.linalg.norm(bbox_offsets, axis=1))
+            other_radius = np.max(np.linalg.norm(other_points[:, :2] - other_pos[0, :2], axis=1))
+            pruned = np.linalg.norm(pos[:, :2] - other_pos[0, :2], axis=1) > obj_radius + other_radius
+            assert np.any(pruned)
+            assert not np.any(np.array(expected)[pruned])
+
+
+def test_sampled_placements_are_valid(objects):
+    obstacle, obj, primitive = objects
+    for seed in range(10):
+        placed_objects = {
+            obstacle.name: ((0.1, 0.0, 0.0), np.array([np.cos(0.2), 0.0, 0.0, np.sin(0.2)]), obstacle),
+        }
+        sampler = UniformRandomSampler(
+            name="sampler",
+            mujoco_objects=[obj, primitive],
+            x_range=(-0.2, 0.2),
+            y_range=(-0.15, 0.15),
+            reference_rot=0.3,
+            rng=np.random.default_rng(seed),
+        )
+        placed_objects = sampler.sample(placed_objects=placed_objects)
+        region_points = np.array([[-0.2, -0.15, 0.0], [0.2, -0.15, 0.0], [-0.2, 0.15, 0.0]])
+        region_points[:, :2] = np.array([T.rotate_2d_point(p, rot=0.3) for p in region_points[:, :2]])
+
+        names = list(placed_objects.keys())
+        for i, name in enumerate(names):
+            pos, quat, placed_obj = placed_objects[name]
+            if name != obstacle.name:
+                assert OU.obj_in_region(
+                    placed_obj, np.array(pos), T.convert_quat(quat, to="xyzw"),
+                    p0=region_points[0], px=region_points[1], py=region_points[2],
+                )
+            for other_name in names[:i]:
+                other_pos, other_quat, other_obj = placed_objects[other_name]
+                assert not OU.objs_intersect(
+                    placed_obj, np.array(pos), T.convert_quat(quat, to="xyzw"),
+                    other_obj, np.array(other_pos), T.convert_quat(np.array(other_quat), to="xyzw"),
+                )
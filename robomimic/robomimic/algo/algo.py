@@ -354,6 +354,9 @@ class PolicyAlgo(Algo):
     """
     Base class for all algorithms that can be used as policies.
     """
+    # whether @get_batched_action can serve several independent rollouts with one forward pass
+    supports_batched_rollout = False
+
     def get_action(self, obs_dict, goal_dict=None):
         """
         Get policy action outputs.
@@ -367,6 +370,23 @@ class PolicyAlgo(Algo):
         """
         raise NotImplementedError
 
+    def get_batched_action(self, obs_dict, goal_dict=None, states=None):
+        """
+        Get policy action outputs for a batch of independent rollouts, each row of the batch
+        belongs to a different rollout that carries its own rollout state (e.g. rnn hidden state)
+        instead of the state stored in this object.
+
+        Args:
+            obs_dict (dict): current observation, one row per rollout
+            goal_dict (dict): (optional) goal, one row per rollout
+            states (list): rollout state of each row, None for rows of a new rollout
+
+        Returns:
+            action (torch.Tensor): action tensor, one row per rollout
+            states (list): updated rollout state of each row
+        """
+        raise NotImplementedError
+
     def compute_traj_pred_actual_actions(self, traj, return_images=False):
         """
         traj is an R2D2Dataset object representing one trajectory
@@ -630,6 +650,10 @@ class RolloutPolicy(object):
         self._ep_lang_emb = None
         self.lang_encoder = lang_encoder
 
+        # single observations are written into a preallocated arena instead of building new tensors every step
+        self.use_obs_arena = True
+        self._obs_arena = None
+
     def start_episode(self, lang=None):
         """
         Prepare the policy to start a new rollout.
@@ -646,7 +670,7 @@ class RolloutPolicy(object):
         if self.lang_encoder is not None:
             self._ep_lang_emb = TensorUtils.to_numpy(self.lang_encoder.get_lang_emb(lang))
 
-    def _prepare_observation(self, ob, batched=False):
+    def _prepare_observation(self, ob, batched=False, lang_emb=None):
         """
         Prepare raw observation dict from environment for policy.
 
@@ -655,11 +679,21 @@ class RolloutPolicy(object):
                 and np.array values for each key)
 
             batched (bool): whether the input is already batched
+
+            lang_emb (np.array): (optional) language embedding of each row of a batched input,
+                the episode language embedding is used for all rows if not provided
         """
         if self.obs_normalization_stats is not None:
             ob = ObsUtils.normalize_dict(ob, obs_normalization_stats=self.obs_normalization_stats)
-        assert batched is False
-        if self._ep_lang_emb is not None:
+        if batched:
+            if lang_emb is None and self._ep_lang_emb is not None:
+                lang_emb = np.repeat(self._ep_lang_emb[np.newaxis], len(ob["robot0_eef_pos"]), axis=0)
+            if lang_emb is not None:
+                if len(ob["robot0_eef_pos"].shape) == 3:
+                    # frame stacked observations, repeat embedding over the time dimension
+                    lang_emb = np.repeat(lang_emb[:, np.newaxis], ob["robot0_eef_pos"].shape[1], axis=1)
+                ob["lang_emb"] = lang_emb
+        elif self._ep_lang_emb is not None:
             if len(ob["robot0_eef_pos"].shape) == 1:
                 ob["lang_emb"] = self._ep_lang_emb
             else:
@@ -671,6 +705,25 @@ class RolloutPolicy(object):
         ob = TensorUtils.to_float(ob)
         return ob
 
+    def _prepare_observation_arena(self, ob):
+        """
+        Fast path of @_prepare_observation for a single observation dict. Only the keys read by the
+        policy are copied into a preallocated @ObsUtils.ObservationArena, which also fuses normalization
+        and the device transfer. Returned tensors are only valid until the next call.
+        """
+        if self._obs_arena is None:
+            self._obs_arena = ObsUtils.ObservationArena(
+                obs_keys=self.policy.obs_shapes.keys(),
+                device=self.policy.device,
+                normalization_stats=self.obs_normalization_stats,
+            )
+        if self._ep_lang_emb is not None:
+            # broadcast view over the frame stack dimension, written into the arena without a repeated copy
+            lang_shape = ob["robot0_eef_pos"].shape[:-1] + self._ep_lang_emb.shape
+            ob = dict(ob)
+            ob["lang_emb"] = np.broadcast_to(self._ep_lang_emb, lang_shape)
+        return self._obs_arena.write(ob)
+
     def __repr__(self):
         """Pretty print network description"""
         return self.policy.__repr__()
@@ -685,13 +738,24 @@ class RolloutPolicy(object):
             goal (dict): goal observation
             batched (bool): whether the input is already batched
         """
-        ob = self._prepare_observation(ob, batched=batched)
+        if self.use_obs_arena and not batched:
+            ob = self._prepare_observation_arena(ob)
+        else:
+            ob = self._prepare_observation(ob, batched=batched)
         if goal is not None:
             goal = self._prepare_observation(goal, batched=batched)
         ac = self.policy.get_action(obs_dict=ob, goal_dict=goal)
         if not batched:
             ac = ac[0]
         ac = TensorUtils.to_numpy(ac)
+        if batched:
+            return np.stack([self._postprocess_action(row) for row in ac], axis=0)
+        return self._postprocess_action(ac)
+
+    def _postprocess_action(self, ac):
+        """
+        Unnormalize a single action vector and convert its rotations to the format used by the environment.
+        """
         if self.action_normalization_stats is not None:
             action_keys = self.policy.global_config.train.action_keys
             action_shapes = {k: self.action_normalization_stats[k]["offset"].shape[1:] for k in self.action_normalization_stats}
@@ -79,6 +79,8 @@ class BC(PolicyAlgo):
     """
     Normal BC training.
     """
+    supports_batched_rollout = True
+
     def _create_networks(self):
         """
         Creates networks and places them into @self.nets.
@@ -255,6 +257,23 @@ class BC(PolicyAlgo):
         assert not self.nets.training
         return self.nets["policy"](obs_dict, goal_dict=goal_dict)
 
+    def get_batched_action(self, obs_dict, goal_dict=None, states=None):
+        """
+        Get policy action outputs for a batch of independent rollouts. The policy has no
+        rollout state, so the batch is a single forward pass.
+
+        Args:
+            obs_dict (dict): current observation, one row per rollout
+            goal_dict (dict): (optional) goal, one row per rollout
+            states (list): rollout state of each row, unused
+
+        Returns:
+            action (torch.Tensor): action tensor, one row per rollout
+            states (list): rollout state of each row, all None
+        """
+        batch_size = list(obs_dict.values())[0].shape[0]
+        return self.get_action(obs_dict, goal_dict=goal_dict), [None] * batch_size
+
 
 class BC_Gaussian(BC):
     """
@@ -572,6 +591,64 @@ class BC_RNN(BC):
             obs_to_use, goal_dict=goal_dict, rnn_state=self._rnn_hidden_state)
         return action
 
+    def get_batched_action(self, obs_dict, goal_dict=None, states=None):
+        """
+        Get policy action outputs for a batch of independent rollouts. Each row carries its own
+        (rnn hidden state, rnn counter, open loop observation) rollout state, the hidden states
+        are stacked along the batch dimension for one forward step and split back afterwards.
+
+        Args:
+            obs_dict (dict): current observation, one row per rollout
+            goal_dict (dict): (optional) goal, one row per rollout
+            states (list): rollout state of each row, None for rows of a new rollout
+
+        Returns:
+            action (torch.Tensor): action tensor, one row per rollout
+            states (list): updated rollout state of each row
+        """
+        assert not self.nets.training
+
+        batch_size = list(obs_dict.values())[0].shape[0]
+        if states is None:
+            states = [None] * batch_size
+
+        hidden_states = []
+        counters = []
+        open_loop_obs = []
+        for i, state in enumerate(states):
+            counter = 0 if state is None else state[1]
+            if state is None or counter % self._rnn_horizon == 0:
+                hidden_state = self.nets["policy"].get_rnn_init_state(batch_size=1, device=self.device)
+                row_obs = None
+                if self._rnn_is_open_loop:
+                    row_obs = TensorUtils.clone(TensorUtils.detach(TensorUtils.map_tensor(obs_dict, lambda x: x[i:i + 1])))
+            else:
+                hidden_state, _, row_obs = state
+            hidden_states.append(hidden_state)
+            counters.append(counter)
+            open_loop_obs.append(row_obs)
+
+        # stack hidden states of all rows along the batch dimension, which is dim 1 for torch rnns
+        if isinstance(hidden_states[0], tuple):
+            rnn_state = tuple(torch.cat([h[k] for h in hidden_states], dim=1) for k in range(len(hidden_states[0])))
+        else:
+            rnn_state = torch.cat(hidden_states, dim=1)
+
+        obs_to_use = obs_dict
+        if self._rnn_is_open_loop:
+            obs_to_use = {k: torch.cat([row_obs[k] for row_obs in open_loop_obs], dim=0) for k in obs_dict}
+
+        action, rnn_state = self.nets["policy"].forward_step(obs_to_use, goal_dict=goal_dict, rnn_state=rnn_state)
+
+        new_states = []
+        for i in range(batch_size):
+            if isinstance(rnn_state, tuple):
+                hidden_state = tuple(h[:, i:i + 1] for h in rnn_state)
+            else:
+                hidden_state = rnn_state[:, i:i + 1]
+            new_states.append((hidden_state, counters[i] + 1, open_loop_obs[i]))
+        return action, new_states
+
     def reset(self):
         """
         Reset algo state to prepare for environment rollouts.
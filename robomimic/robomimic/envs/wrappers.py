@@ -100,23 +100,29 @@ class FrameStackWrapper(EnvWrapper):
     receives a sequence of past observations instead of a single observation
     when it calls @env.reset, @env.reset_to, or @env.step in the rollout loop.
     """
-    def __init__(self, env, num_frames):
+    def __init__(self, env, num_frames, zero_copy=False):
         """
         Args:
             env (EnvBase instance): The environment to wrap.
             num_frames (int): number of past observations (including current observation)
                 to stack together. Must be greater than 1 (otherwise this wrapper would
                 be a no-op).
+            zero_copy (bool): if True, keep the history of each key in a preallocated ring
+                buffer and return views into it instead of concatenating all frames every
+                step. Returned arrays are then only valid until the next step, callers that
+                keep observations around must copy them.
         """
         assert num_frames > 1, "error: FrameStackWrapper must have num_frames > 1 but got num_frames of {}".format(num_frames)
 
         super(FrameStackWrapper, self).__init__(env=env)
         self.num_frames = num_frames
+        self.zero_copy = zero_copy
 
         ### TODO: add action padding option + adding action to obs to include action history in obs ###
 
         # keep track of last @num_frames observations for each obs key
         self.obs_history = None
+        self.history_head = 0 # position of the oldest frame in the ring buffers when @zero_copy is set
 
     def _get_initial_obs_history(self, init_obs):
         """
@@ -128,6 +134,14 @@ class FrameStackWrapper(EnvWrapper):
                 leading dimension of 1 for each key (for easy concatenation later)
         """
         obs_history = {}
+        if self.zero_copy:
+            # every frame is written twice, so the last @num_frames frames are always contiguous
+            self.history_head = 0
+            for k in init_obs:
+                frame = np.asarray(init_obs[k])
+                obs_history[k] = np.empty((2 * self.num_frames,) + frame.shape, dtype=frame.dtype)
+                obs_history[k][:] = frame
+            return obs_history
         for k in init_obs:
             obs_history[k] = deque(
                 [init_obs[k][None] for _ in range(self.num_frames)], 
@@ -141,14 +155,32 @@ class FrameStackWrapper(EnvWrapper):
         stacked observation where each key is a numpy array with leading dimension
         @self.num_frames.
         """
+        if self.zero_copy:
+            head = self.history_head
+            return { k : self.obs_history[k][head:head + self.num_frames] for k in self.obs_history }
         # concatenate all frames per key so we return a numpy array per key
         return { k : np.concatenate(self.obs_history[k], axis=0) for k in self.obs_history }
 
+    def _append_obs_history(self, obs):
+        """
+        Helper method to add the newest observation to @self.obs_history.
+        """
+        if self.zero_copy:
+            head = self.history_head
+            for k in obs:
+                self.obs_history[k][head] = obs[k]
+                self.obs_history[k][head + self.num_frames] = obs[k]
+            self.history_head = (head + 1) % self.num_frames
+            return
+        for k in obs:
+            # make sure to have leading dim of 1 for easy concatenation
+            self.obs_history[k].append(obs[k][None])
+
     def cache_obs_history(self):
-        self.obs_history_cache = deepcopy(self.obs_history)
+        self.obs_history_cache = deepcopy((self.obs_history, self.history_head))
 
     def uncache_obs_history(self):
-        self.obs_history = self.obs_history_cache
+        self.obs_history, self.history_head = self.obs_history_cache
         self.obs_history_cache = None
 
     def reset(self):
@@ -202,9 +234,7 @@ class FrameStackWrapper(EnvWrapper):
         obs, r, done, info = self.env.step(action)
         self.update_obs(obs, action=action, reset=False)
         # update frame history
-        for k in obs:
-            # make sure to have leading dim of 1 for easy concatenation
-            self.obs_history[k].append(obs[k][None])
+        self._append_obs_history(obs)
         obs_ret = self._get_stacked_obs_from_history()
         return obs_ret, r, done, info
 
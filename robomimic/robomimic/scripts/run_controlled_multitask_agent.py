@@ -37,6 +37,7 @@ from robosuite import load_controller_config
 import robocasa
 import robocasa.utils.control_utils as CU
 import robocasa.utils.controller_dict as CD
+from robocasa.utils.scene_registry import get_scene_registry
 
 BASE_PATH = os.path.abspath(robocasa.__file__ + '/../../../')
 sys.path.append(BASE_PATH)
@@ -92,16 +93,9 @@ def run_controlled_rollout_multitask_agent(
         ob_dict, r, done, info = env.step(ac)
     
     # get all valid keys
-    object_keys = env.env.env.objects.keys()
-    fixtures = list(env.env.env.fixtures.values())
-    fxtr_classes = [type(fxtr).__name__ for fxtr in fixtures]
-    valid_target_fxtr_classes = [
-        cls for cls in fxtr_classes if fxtr_classes.count(cls) == 1 and cls in [
-            "CoffeeMachine", "Toaster", "Stove", "Stovetop", "OpenCabinet",
-            "Microwave", "Sink", "Hood", "Oven", "Fridge", "Dishwasher",
-        ]
-    ]
-    fixture_keys = [fxtr.lower() for fxtr in valid_target_fxtr_classes]
+    registry = get_scene_registry(env.env.env)
+    object_keys = registry.object_keys
+    fixture_keys = registry.fixture_keys
     
     # print available fixtures, objects, and commands
     print(colored("\nAvailable fixtures in env {}:".format(type(env.env.env).__name__), "yellow"))
@@ -135,9 +129,8 @@ def run_controlled_rollout_multitask_agent(
             torch.cuda.empty_cache()
             env_lang = controller_config["env_lang"]
             ckpt_path = controller_config["ckpt_path"]
-            policy, ckpt_dict = FileUtils.policy_from_checkpoint(ckpt_path=ckpt_path, device=device, verbose=False)
+            policy = FileUtils.POLICY_POOL.acquire(ckpt_path=ckpt_path, device=device, lang=env_lang)
             assert isinstance(policy, RolloutPolicy)
-            policy.start_episode(lang=env_lang)
             checker = controller_config["checker"]
             
         elif controller_config["type"] == "planner":
@@ -201,7 +194,8 @@ def run_controlled_rollout_multitask_agent(
                 
                 # delete policy or planner objects
                 if controller_config["type"] == "policy":
-                    del policy # to avoid huge gpu memory usage
+                    FileUtils.POLICY_POOL.release(policy) # keep checkpoint warm for later subtasks, pool bounds gpu memory usage
+                    del policy
                     del checker
                 elif controller_config["type"] == "planner":
                     del planner
@@ -226,7 +220,8 @@ def run_controlled_rollout_multitask_agent(
                 
                 # delete policy or planner objects
                 if controller_config["type"] == "policy":
-                    del policy # to avoid huge gpu memory usage
+                    FileUtils.POLICY_POOL.release(policy) # keep checkpoint warm for later subtasks, pool bounds gpu memory usage
+                    del policy
                     del checker
                 elif controller_config["type"] == "planner":
                     del planner
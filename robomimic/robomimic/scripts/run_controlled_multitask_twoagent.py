@@ -37,6 +37,7 @@ from robosuite import load_controller_config
 import robocasa
 import robocasa.utils.control_utils as CU
 import robocasa.utils.controller_dict as CD
+from robocasa.utils.scene_registry import get_scene_registry
 
 BASE_PATH = os.path.abspath(robocasa.__file__ + '/../../../')
 sys.path.append(BASE_PATH)
@@ -95,16 +96,9 @@ def run_controlled_rollout_multitask_twoagent(
         ob_dict, r, done, info = env.step(ac)
     
     # get all valid keys
-    object_keys = env.env.env.objects.keys()
-    fixtures = list(env.env.env.fixtures.values())
-    fxtr_classes = [type(fxtr).__name__ for fxtr in fixtures]
-    valid_target_fxtr_classes = [
-        cls for cls in fxtr_classes if fxtr_classes.count(cls) == 1 and cls in [
-            "CoffeeMachine", "Toaster", "Stove", "Stovetop", "OpenCabinet",
-            "Microwave", "Sink", "Hood", "Oven", "Fridge", "Dishwasher",
-        ]
-    ]
-    fixture_keys = [fxtr.lower() for fxtr in valid_target_fxtr_classes]
+    registry = get_scene_registry(env.env.env)
+    object_keys = registry.object_keys
+    fixture_keys = registry.fixture_keys
     
     # print available fixtures, objects, and commands
     print(colored("\nAvailable fixtures in env {}:".format(type(env.env.env).__name__), "yellow"))
@@ -146,10 +140,9 @@ def run_controlled_rollout_multitask_twoagent(
         if controller_config0["type"] == "policy":
             env_lang0 = controller_config0["env_lang"]
             ckpt_path0 = controller_config0["ckpt_path"]
-            policy0, ckpt_dict0 = FileUtils.policy_from_checkpoint(ckpt_path=ckpt_path0, device=device, verbose=False)
+            policy0 = FileUtils.POLICY_POOL.acquire(ckpt_path=ckpt_path0, device=device, lang=env_lang0)
             ObsUtils.initialize_obs_utils_with_config(multiagent_config, verbose=False) # maintain obs_utils for all policies
             assert isinstance(policy0, RolloutPolicy)
-            policy0.start_episode(lang=env_lang0)
             checker0 = controller_config0["checker"]
             
         elif controller_config0["type"] == "planner":
@@ -164,10 +157,9 @@ def run_controlled_rollout_multitask_twoagent(
         if controller_config1["type"] == "policy":
             env_lang1 = controller_config1["env_lang"]
             ckpt_path1 = controller_config1["ckpt_path"]
-            policy1, ckpt_dict1 = FileUtils.policy_from_checkpoint(ckpt_path=ckpt_path1, device=device, verbose=False)
+            policy1 = FileUtils.POLICY_POOL.acquire(ckpt_path=ckpt_path1, device=device, lang=env_lang1)
             ObsUtils.initialize_obs_utils_with_config(multiagent_config, verbose=False) # maintain obs_utils for all policies
             assert isinstance(policy1, RolloutPolicy)
-            policy1.start_episode(lang=env_lang1)
             checker1 = controller_config1["checker"]
             
         elif controller_config1["type"] == "planner":
@@ -256,12 +248,14 @@ def run_controlled_rollout_multitask_twoagent(
                 
                 # delete policy or planner objects
                 if controller_config0["type"] == "policy":
-                    del policy0 # to avoid huge gpu memory usage
+                    FileUtils.POLICY_POOL.release(policy0) # keep checkpoint warm for later subtasks, pool bounds gpu memory usage
+                    del policy0
                     del checker0
                 elif controller_config0["type"] == "planner":
                     del planner0
                 if controller_config1["type"] == "policy":
-                    del policy1 # to avoid huge gpu memory usage
+                    FileUtils.POLICY_POOL.release(policy1) # keep checkpoint warm for later subtasks, pool bounds gpu memory usage
+                    del policy1
                     del checker1
                 elif controller_config1["type"] == "planner":
                     del planner1
@@ -303,12 +297,14 @@ def run_controlled_rollout_multitask_twoagent(
                 
                 # delete policy or planner objects
                 if controller_config0["type"] == "policy":
-                    del policy0 # to avoid huge gpu memory usage
+                    FileUtils.POLICY_POOL.release(policy0) # keep checkpoint warm for later subtasks, pool bounds gpu memory usage
+                    del policy0
                     del checker0
                 elif controller_config0["type"] == "planner":
                     del planner0
                 if controller_config1["type"] == "policy":
-                    del policy1 # to avoid huge gpu memory usage
+                    FileUtils.POLICY_POOL.release(policy1) # keep checkpoint warm for later subtasks, pool bounds gpu memory usage
+                    del policy1
                     del checker1
                 elif controller_config1["type"] == "planner":
                     del planner1
@@ -37,12 +37,15 @@ from robosuite import load_controller_config
 import robocasa
 import robocasa.utils.control_utils as CU
 import robocasa.utils.controller_dict as CD
+from robocasa.utils.scene_registry import get_scene_registry
 
 BASE_PATH = os.path.abspath(robocasa.__file__ + '/../../../')
 sys.path.append(BASE_PATH)
 os.chdir(BASE_PATH)
 
 from agents import MixAgent
+from agents.client import RESPONSE_CACHE
+from agents.frame import EncodedFrame, FRAME_SINK
 
 from PIL import Image
 
@@ -102,22 +105,8 @@ def run_mix_rollout_multitask_agent(
         ac = CU.create_action(grasp=False)
         ob_dict, r, done, info = env.step(ac)
     
-    # get all valid keys
-    object_keys = env.env.env.objects.keys()
-    fixtures = list(env.env.env.fixtures.values())
-    fxtr_classes = [type(fxtr).__name__ for fxtr in fixtures]
-    valid_target_fxtr_classes = [
-        cls for cls in fxtr_classes if fxtr_classes.count(cls) == 1 and cls in [
-            "CoffeeMachine", "Toaster", "Stove", "Stovetop", "OpenCabinet",
-            "Microwave", "Sink", "Hood", "Oven", "Fridge", "Dishwasher",
-        ]
-    ]
-    fixture_keys = [fxtr.lower() for fxtr in valid_target_fxtr_classes]
-
-    # handle special cases
-    object_keys = [x for x in object_keys if not x.endswith('_container')]
-    fixture_keys = ['cabinet' if x == 'opencabinet' else x for x in fixture_keys]
-    fixture_keys.append('counter')
+    # get all valid keys, special cases (e.g. cabinet, counter) are handled by the scene registry
+    fixture_keys, object_keys = get_scene_registry(env.env.env).command_keys()
     
     # print available fixtures, objects, and commands
     print(colored("\nAvailable fixtures in env {}:".format(type(env.env.env).__name__), "yellow"))
@@ -181,9 +170,8 @@ Available commands: {CD.available_commands}
         if controller_config["type"] == "policy":
             env_lang = controller_config["env_lang"]
             ckpt_path = controller_config["ckpt_path"]
-            policy, ckpt_dict = FileUtils.policy_from_checkpoint(ckpt_path=ckpt_path, device=device, verbose=False)
+            policy = FileUtils.POLICY_POOL.acquire(ckpt_path=ckpt_path, device=device, lang=env_lang)
             assert isinstance(policy, RolloutPolicy)
-            policy.start_episode(lang=env_lang)
             checker = controller_config["checker"]
             
         elif controller_config["type"] == "planner":
@@ -198,6 +186,9 @@ Available commands: {CD.available_commands}
                     agent.delete_last_plan()
                 continue
         
+        # generate conditions and read checkpoint of the next subtask in background while this one executes
+        agent.speculate()
+        
         # start control loop
         for step_i in range(horizon): #LogUtils.tqdm(range(horizon)):
             
@@ -272,44 +263,34 @@ Available commands: {CD.available_commands}
                 
                 if view == 1:
 
-                    frame = env.render(mode="rgb_array", height=512, width=512)
-                    image = Image.fromarray(frame)
-                    image_path = os.path.join(log_path, f"task{task_i}_agent_frame.jpg")
-                    image.save(image_path, format="JPEG")
-                    
-                    # for current task_i
-                    agent.check_post_condition(image_path, env, obs, task, verbose=True)
+                    image = EncodedFrame.from_array(env.render(mode="rgb_array", height=512, width=512))
+                    FRAME_SINK.write(image, os.path.join(log_path, f"task{task_i}_agent_frame.jpg"))
                     
-                    # for next task_{i+1}
-                    agent.check_pre_condition(image_path, env, obs, agent.history_plan[-1][1], verbose=True)
+                    # post-condition for current task_i and pre-condition for next task_{i+1}, checked concurrently
+                    agent.check_conditions(image, env, obs, task, agent.history_plan[-1][1], verbose=True)
                     
                 elif view == 2:
                     
-                    frame0 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_vlmview")
-                    image0 = Image.fromarray(frame0)
-                    image0_path = os.path.join(log_path, f"task{task_i}_agent_frame0.jpg")
-                    image0.save(image0_path, format="JPEG")
+                    image0 = EncodedFrame.from_array(env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_vlmview"))
+                    FRAME_SINK.write(image0, os.path.join(log_path, f"task{task_i}_agent_frame0.jpg"))
                     
-                    frame1 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_eye_in_hand")
-                    image1 = Image.fromarray(frame1)
-                    image1_path = os.path.join(log_path, f"task{task_i}_agent_frame1.jpg")
-                    image1.save(image1_path, format="JPEG")
+                    image1 = EncodedFrame.from_array(env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_eye_in_hand"))
+                    FRAME_SINK.write(image1, os.path.join(log_path, f"task{task_i}_agent_frame1.jpg"))
                     
-                    # for current task_i
-                    agent.check_post_condition([image0_path, image1_path], env, obs, task, verbose=True)
-                    
-                    # for next task_{i+1}
+                    # post-condition for current task_i and pre-condition for next task_{i+1}, checked concurrently
                     if len(agent.history_plan[-1]) == 1:
-                        agent.check_pre_condition([image0_path, image1_path], env, obs, 'wait', verbose=True)
+                        next_task = 'wait'
                     else:
-                        agent.check_pre_condition([image0_path, image1_path], env, obs, agent.history_plan[-1][1], verbose=True)
+                        next_task = agent.history_plan[-1][1]
+                    agent.check_conditions([image0, image1], env, obs, task, next_task, verbose=True)
                     
                 else:
                     raise ValueError("Invalid view number")
 
                 # delete policy or planner objects
                 if controller_config["type"] == "policy":
-                    del policy # to avoid huge gpu memory usage
+                    FileUtils.POLICY_POOL.release(policy) # keep checkpoint warm for later subtasks, pool bounds gpu memory usage
+                    del policy
                     del checker
                 elif controller_config["type"] == "planner":
                     del planner
@@ -340,6 +321,9 @@ Available commands: {CD.available_commands}
         if k != "task":
             results["{}_Success_Rate".format(k)] = float(success[k])
 
+    # frames of this episode are written in background, make sure they are on disk before returning
+    FRAME_SINK.flush()
+
     return results
 
 
@@ -347,6 +331,7 @@ def run_mix_multitask_agent(args):
     # some arg checking
     write_video = (args.video_path is not None)
     assert not (args.render and write_video) # either on-screen or video but not both
+    FRAME_SINK.enabled = not args.no_frames
     if args.render:
         # on-screen rendering can only support one camera
         assert len(args.camera_names) == 1
@@ -394,7 +379,7 @@ def run_mix_multitask_agent(args):
     # handle environment wrappers
     from robomimic.envs.wrappers import FrameStackWrapper
     frame_stack = 10 # from auto gen config file
-    env = FrameStackWrapper(env, num_frames=frame_stack)
+    env = FrameStackWrapper(env, num_frames=frame_stack, zero_copy=True) # observations are consumed before the next step
 
     # maybe set seed
     if args.seed is not None:
@@ -526,6 +511,8 @@ def run_mix_multitask_agent(args):
     
     print('\nAll rollout logs:')
     print(all_rollout_logs)
+    print('\nResponse cache stats:')
+    print(RESPONSE_CACHE.stats())
 
 
 if __name__ == "__main__":
@@ -649,6 +636,13 @@ if __name__ == "__main__":
         help="(optional) set renderer type",
     )
 
+    # frames sent to the VLM are kept in memory, and saved to the log folder by default
+    parser.add_argument(
+        "--no_frames",
+        action='store_true',
+        help="(optional) do not save agent frames to the log folder",
+    )
+
     args = parser.parse_args()
     args.render == False
     run_mix_multitask_agent(args)
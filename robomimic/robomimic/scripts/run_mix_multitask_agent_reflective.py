@@ -9,6 +9,7 @@ import h5py
 import imageio
 import numpy as np
 import traceback
+import multiprocessing
 from copy import deepcopy
 from collections import OrderedDict
 from termcolor import colored
@@ -37,13 +38,17 @@ from robosuite import load_controller_config
 import robocasa
 import robocasa.utils.control_utils as CU
 import robocasa.utils.controller_dict as CD
+from robocasa.utils.scene_registry import get_scene_registry
 
 BASE_PATH = os.path.abspath(robocasa.__file__ + '/../../../')
 sys.path.append(BASE_PATH)
 os.chdir(BASE_PATH)
 
 from agents import MixReAgent
+from agents.client import RESPONSE_CACHE
+from agents.frame import EncodedFrame, FRAME_SINK
 import utils
+from utils.trace_utils import TRACER, phase_results, format_summary, format_phase_times
 
 from PIL import Image
 
@@ -66,6 +71,9 @@ def run_mix_rollout_multitask_agent_reflective(
     
     assert isinstance(env, EnvBase) or isinstance(env, EnvWrapper)
 
+    # spans of this episode, saved as chrome trace to log_path
+    TRACER.reset()
+
     ob_dict = env.reset()
     if render:
         env.render(mode="human")
@@ -100,22 +108,8 @@ def run_mix_rollout_multitask_agent_reflective(
         ac = CU.create_action(grasp=False)
         ob_dict, r, done, info = env.step(ac)
     
-    # get all valid keys
-    object_keys = env.env.env.objects.keys()
-    fixtures = list(env.env.env.fixtures.values())
-    fxtr_classes = [type(fxtr).__name__ for fxtr in fixtures]
-    valid_target_fxtr_classes = [
-        cls for cls in fxtr_classes if fxtr_classes.count(cls) == 1 and cls in [
-            "CoffeeMachine", "Toaster", "Stove", "Stovetop", "OpenCabinet",
-            "Microwave", "Sink", "Hood", "Oven", "Fridge", "Dishwasher",
-        ]
-    ]
-    fixture_keys = [fxtr.lower() for fxtr in valid_target_fxtr_classes]
-
-    # handle special cases
-    object_keys = [x for x in object_keys if not x.endswith('_container')]
-    fixture_keys = ['cabinet' if x == 'opencabinet' else x for x in fixture_keys]
-    fixture_keys.append('counter')
+    # get all valid keys, special cases (e.g. cabinet, counter) are handled by the scene registry
+    fixture_keys, object_keys = get_scene_registry(env.env.env).command_keys()
     
     # print available fixtures, objects, and commands
     print(colored("\nAvailable fixtures in env {}:".format(type(env.env.env).__name__), "yellow"))
@@ -180,9 +174,8 @@ Available commands: {CD.available_commands}
         if controller_config["type"] == "policy":
             env_lang = controller_config["env_lang"]
             ckpt_path = controller_config["ckpt_path"]
-            policy, ckpt_dict = FileUtils.policy_from_checkpoint(ckpt_path=ckpt_path, device=device, verbose=False)
+            policy = FileUtils.POLICY_POOL.acquire(ckpt_path=ckpt_path, device=device, lang=env_lang)
             assert isinstance(policy, RolloutPolicy)
-            policy.start_episode(lang=env_lang)
             checker = controller_config["checker"]
             
         elif controller_config["type"] == "planner":
@@ -197,27 +190,35 @@ Available commands: {CD.available_commands}
                     agent.delete_last_plan()
                 continue
         
+        # generate conditions and read checkpoint of the next subtask in background while this one executes
+        agent.speculate()
+        
         # start control loop
         for step_i in range(horizon): #LogUtils.tqdm(range(horizon)):
             
             # use policy or planner to get action
             if controller_config["type"] == "policy":
                 policy_ob = ob_dict
-                ac = policy(ob=policy_ob, goal=goal_dict) #, return_ob=True)
-                end_control = checker(env)
+                with TRACER.span("policy", "policy_inference"):
+                    ac = policy(ob=policy_ob, goal=goal_dict) #, return_ob=True)
+                with TRACER.span("policy_checker", "ground_truth_check"):
+                    end_control = checker(env)
                 arm_need_reset = True
             elif controller_config["type"] == "planner":
-                obs = env.env.env.observation_spec()
-                ac, control_info = planner.get_control(env=env, obs=obs)
+                with TRACER.span(type(planner).__name__, "planner_control"):
+                    obs = env.env.env.observation_spec()
+                    ac, control_info = planner.get_control(env=env, obs=obs)
                 end_control = control_info["end_control"]
                 arm_need_reset = control_info["arm_need_reset"]
                 
             # play action
-            ob_dict, r, done, info = env.step(ac)
+            with TRACER.span("env.step", "physics"):
+                ob_dict, r, done, info = env.step(ac)
 
             # render to screen
             if render:
-                env.render(mode="human") # can change camera here, or by default the first camera in camera list
+                with TRACER.span("human", "render"):
+                    env.render(mode="human") # can change camera here, or by default the first camera in camera list
 
             # compute reward
             rews.append(r)
@@ -234,7 +235,8 @@ Available commands: {CD.available_commands}
             # visualization
             if video_writer is not None:
                 if video_count % video_skip == 0:
-                    frame = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_frontview")
+                    with TRACER.span("robot0_frontview", "render"):
+                        frame = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_frontview")
                     video_writer.append_data(frame)
                 video_count += 1
 
@@ -261,7 +263,8 @@ Available commands: {CD.available_commands}
                     initial_qpos=(-0.01612974, -1.03446714, -0.02397936, -2.27550888, 0.03932365, 1.51639493, 0.69615947)
                     env.env.env.robots[0].set_robot_joint_positions(initial_qpos)
                     ac = CU.create_action(grasp=False)
-                    ob_dict, r, done, info = env.step(ac)
+                    with TRACER.span("env.step", "physics"):
+                        ob_dict, r, done, info = env.step(ac)
                 
                 # directly break if whole task success
                 if terminate_on_success and success["task"]:
@@ -271,37 +274,35 @@ Available commands: {CD.available_commands}
                 
                 if view == 1:
 
-                    frame = env.render(mode="rgb_array", height=512, width=512)
-                    image = Image.fromarray(frame)
-                    image_path = os.path.join(log_path, f"task{task_i}_agent_frame.jpg")
-                    image.save(image_path, format="JPEG")
+                    with TRACER.span("agentview", "render"):
+                        frame = env.render(mode="rgb_array", height=512, width=512)
+                    with TRACER.span("agentview", "jpeg_encode"):
+                        image = EncodedFrame.from_array(frame)
+                    FRAME_SINK.write(image, os.path.join(log_path, f"task{task_i}_agent_frame.jpg"))
                     
-                    # for current task_i
-                    agent.check_post_condition(image_path, env, obs, task, verbose=True)
-                    
-                    # for next task_{i+1}
-                    agent.check_pre_condition(image_path, env, obs, agent.history_plan[-1][1], verbose=True)
+                    # post-condition for current task_i and pre-condition for next task_{i+1}, checked concurrently
+                    agent.check_conditions(image, env, obs, task, agent.history_plan[-1][1], verbose=True)
                 
                 elif view == 2:
 
-                    frame0 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_vlmview")
-                    image0 = Image.fromarray(frame0)
-                    image0_path = os.path.join(log_path, f"task{task_i}_agent_frame0.jpg")
-                    image0.save(image0_path, format="JPEG")
-                    
-                    frame1 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_eye_in_hand")
-                    image1 = Image.fromarray(frame1)
-                    image1_path = os.path.join(log_path, f"task{task_i}_agent_frame1.jpg")
-                    image1.save(image1_path, format="JPEG")
+                    with TRACER.span("robot0_vlmview", "render"):
+                        frame0 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_vlmview")
+                    with TRACER.span("robot0_vlmview", "jpeg_encode"):
+                        image0 = EncodedFrame.from_array(frame0)
+                    FRAME_SINK.write(image0, os.path.join(log_path, f"task{task_i}_agent_frame0.jpg"))
                     
-                    # for current task_i
-                    agent.check_post_condition([image0_path, image1_path], env, obs, task, verbose=True)
+                    with TRACER.span("robot0_eye_in_hand", "render"):
+                        frame1 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_eye_in_hand")
+                    with TRACER.span("robot0_eye_in_hand", "jpeg_encode"):
+                        image1 = EncodedFrame.from_array(frame1)
+                    FRAME_SINK.write(image1, os.path.join(log_path, f"task{task_i}_agent_frame1.jpg"))
                     
-                    # for next task_{i+1}
+                    # post-condition for current task_i and pre-condition for next task_{i+1}, checked concurrently
                     if len(agent.history_plan[-1]) == 1:
-                        agent.check_pre_condition([image0_path, image1_path], env, obs, 'wait', verbose=True)
+                        next_task = 'wait'
                     else:
-                        agent.check_pre_condition([image0_path, image1_path], env, obs, agent.history_plan[-1][1], verbose=True)
+                        next_task = agent.history_plan[-1][1]
+                    agent.check_conditions([image0, image1], env, obs, task, next_task, verbose=True)
                 
                 else:
                     raise ValueError("Invalid view number")
@@ -310,7 +311,8 @@ Available commands: {CD.available_commands}
                 
                 # delete policy or planner objects
                 if controller_config["type"] == "policy":
-                    del policy # to avoid huge gpu memory usage
+                    FileUtils.POLICY_POOL.release(policy) # keep checkpoint warm for later subtasks, pool bounds gpu memory usage
+                    del policy
                     del checker
                 elif controller_config["type"] == "planner":
                     del planner
@@ -360,17 +362,27 @@ Available commands: {CD.available_commands}
         if k != "task":
             results["{}_Success_Rate".format(k)] = float(success[k])
 
+    # frames of this episode are written in background, make sure they are on disk before returning
+    FRAME_SINK.flush()
+
+    # per-phase latency, one trace file per episode
+    summary = TRACER.summary()
+    results.update(phase_results(summary))
+    trace_path = os.path.join(log_path, "trace-{}.json".format(datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")))
+    TRACER.save(trace_path)
+    if verbose:
+        print(colored("\nPhase summary (trace saved to {}):".format(trace_path), "yellow"))
+        print(format_summary(summary))
+
     return results
 
 
-def run_mix_multitask_agent_reflective(args):
-    # some arg checking
+def create_rollout_env(args):
+    """
+    create wrapped robosuite environment from args, also initialize obs utils with the checkpoint config
+    """
     write_video = (args.video_path is not None)
-    assert not (args.render and write_video) # either on-screen or video but not both
-    if args.render:
-        # on-screen rendering can only support one camera
-        assert len(args.camera_names) == 1
-
+    
     # relative path to agent, only to extract standard config
     ckpt_path = args.agent
     
@@ -414,7 +426,97 @@ def run_mix_multitask_agent_reflective(args):
     # handle environment wrappers
     from robomimic.envs.wrappers import FrameStackWrapper
     frame_stack = 10 # from auto gen config file
-    env = FrameStackWrapper(env, num_frames=frame_stack)
+    env = FrameStackWrapper(env, num_frames=frame_stack, zero_copy=True) # observations are consumed before the next step
+    
+    return env
+
+
+# per-process state of parallel rollout workers
+_worker_env = None
+_worker_args = None
+_worker_folder_path = None
+
+
+def init_rollout_worker(args, folder_path):
+    """
+    create one environment per worker process, reused for all episodes run by this worker
+    """
+    global _worker_env, _worker_args, _worker_folder_path
+    _worker_args = args
+    _worker_folder_path = folder_path
+    FRAME_SINK.enabled = not args.no_frames
+    _worker_env = create_rollout_env(args)
+
+
+def run_rollout_worker_episode(ep_i):
+    """
+    run one episode in a worker process, logs, frames, interaction records and video are saved in its own folder
+    """
+    args = _worker_args
+    if args.seed is not None:
+        np.random.seed(args.seed + ep_i)
+        torch.manual_seed(args.seed + ep_i)
+    
+    log_path = os.path.join(_worker_folder_path, "episode{}".format(ep_i))
+    os.makedirs(log_path, exist_ok=True)
+    video_writer = None
+    if args.video_path is not None:
+        video_writer = imageio.get_writer(os.path.join(log_path, "{}.mp4".format(_worker_env.name)), fps=20)
+    
+    rollout_timestamp = time.time()
+    try:
+        rollout_info = run_mix_rollout_multitask_agent_reflective(
+            env=_worker_env,
+            horizon=args.horizon,
+            render=False,
+            use_goals=False,
+            video_writer=video_writer,
+            video_skip=args.video_skip,
+            terminate_on_success=True,
+            verbose=args.verbose,
+            log_path=log_path
+        )
+        rollout_info["time"] = time.time() - rollout_timestamp
+    except Exception as e:
+        print("Rollout exception at episode number {}!".format(ep_i))
+        print(traceback.format_exc())
+        rollout_info = None
+    finally:
+        if video_writer is not None:
+            video_writer.close()
+    
+    return ep_i, rollout_info
+
+
+def run_parallel_rollouts(args, num_episodes, folder_path):
+    """
+    run episodes over a pool of worker processes, each with its own environment and agent,
+    so that simulation in one worker overlaps with LLM / VLM requests in the others
+    """
+    ctx = multiprocessing.get_context("spawn") # mujoco and cuda are not fork-safe
+    rollout_logs = []
+    with ctx.Pool(processes=args.num_workers, initializer=init_rollout_worker, initargs=(args, folder_path)) as pool:
+        for ep_i, rollout_info in pool.imap_unordered(run_rollout_worker_episode, range(num_episodes)):
+            if rollout_info is None:
+                continue
+            rollout_logs.append(rollout_info)
+            print("Episode {} finished, success={}, time={:.1f}s".format(ep_i + 1, rollout_info["Success_Rate"], rollout_info["time"]))
+    
+    return rollout_logs
+
+
+def run_mix_multitask_agent_reflective(args):
+    # some arg checking
+    write_video = (args.video_path is not None)
+    assert not (args.render and write_video) # either on-screen or video but not both
+    if args.render:
+        # on-screen rendering can only support one camera
+        assert len(args.camera_names) == 1
+    assert not (args.render and args.num_workers > 1) # parallel workers render off-screen only
+    FRAME_SINK.enabled = not args.no_frames
+
+    # parallel workers create their own environments, only the serial path needs one here
+    env = create_rollout_env(args) if args.num_workers <= 1 else None
 
     # maybe set seed
     if args.seed is not None:
@@ -425,7 +527,7 @@ def run_mix_multitask_agent_reflective(args):
     data_logger = None
     
     # log pictures and video
-    task_name = env.env.env.__class__.__name__
+    task_name = env.env.env.__class__.__name__ if env is not None else args.env
     time_str = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
     folder_path = os.path.join(BASE_PATH, "record", task_name, "agent-reflect-" + time_str)
     os.makedirs(folder_path, exist_ok=True)
@@ -455,7 +557,7 @@ def run_mix_multitask_agent_reflective(args):
 
     for env, horizon in zip(envs, horizon_list):
 
-        env_name = env.name
+        env_name = env.name if env is not None else args.env
 
         if video_dir is not None:
             # video is written per env
@@ -471,42 +573,45 @@ def run_mix_multitask_agent_reflective(args):
         print("rollout: env={}, horizon={}, use_goals={}, num_episodes={}".format(
             env_name, horizon, use_goals, num_episodes,
         ))
-        rollout_logs = []
+        if args.num_workers > 1:
+            rollout_logs = run_parallel_rollouts(args, num_episodes, folder_path)
+        else:
+            rollout_logs = []
         
-        iterator = range(num_episodes)
-        if not verbose:
-            iterator = LogUtils.custom_tqdm(iterator, total=num_episodes)
-
-        num_success = 0
-        for ep_i in iterator:
-            rollout_timestamp = time.time()
-            if verbose:
-                print("\nStarting episode {}...".format(ep_i + 1))
-            try:
-                rollout_info = run_mix_rollout_multitask_agent_reflective(
-                    env=env,
-                    horizon=horizon,
-                    render=render,
-                    use_goals=use_goals,
-                    video_writer=env_video_writer,
-                    video_skip=video_skip,
-                    terminate_on_success=terminate_on_success,
-                    verbose=verbose,
-                    log_path=folder_path
-                )
-            except Exception as e:
-                print("Rollout exception at episode number {}!".format(ep_i))
-                print(traceback.format_exc())
-                break
+            iterator = range(num_episodes)
+            if not verbose:
+                iterator = LogUtils.custom_tqdm(iterator, total=num_episodes)
+
+            num_success = 0
+            for ep_i in iterator:
+                rollout_timestamp = time.time()
+                if verbose:
+                    print("\nStarting episode {}...".format(ep_i + 1))
+                try:
+                    rollout_info = run_mix_rollout_multitask_agent_reflective(
+                        env=env,
+                        horizon=horizon,
+                        render=render,
+                        use_goals=use_goals,
+                        video_writer=env_video_writer,
+                        video_skip=video_skip,
+                        terminate_on_success=terminate_on_success,
+                        verbose=verbose,
+                        log_path=folder_path
+                    )
+                except Exception as e:
+                    print("Rollout exception at episode number {}!".format(ep_i))
+                    print(traceback.format_exc())
+                    break
             
-            rollout_info["time"] = time.time() - rollout_timestamp
+                rollout_info["time"] = time.time() - rollout_timestamp
 
-            rollout_logs.append(rollout_info)
-            num_success += rollout_info["Success_Rate"]
+                rollout_logs.append(rollout_info)
+                num_success += rollout_info["Success_Rate"]
             
-            if verbose:
-                print("Episode {}, horizon={}, num_success={}".format(ep_i + 1, horizon, num_success))
-                # print(json.dumps(rollout_info, sort_keys=True, indent=4))
+                if verbose:
+                    print("Episode {}, horizon={}, num_success={}".format(ep_i + 1, horizon, num_success))
+                    # print(json.dumps(rollout_info, sort_keys=True, indent=4))
 
         if video_dir is not None:
             # close this env's video writer (next env has it's own)
@@ -518,6 +623,8 @@ def run_mix_multitask_agent_reflective(args):
             rollout_logs_mean = dict((k, np.mean(v)) for k, v in rollout_logs.items())
             rollout_logs_mean["Time_Episode"] = np.sum(rollout_logs["time"]) / 60. # total time taken for rollouts in minutes
             all_rollout_logs[env_name] = rollout_logs_mean
+            print('\nPhase time of env {} (mean per episode):'.format(env_name))
+            print(format_phase_times(rollout_logs_mean))
         else:
             all_rollout_logs[env_name] = {"Time_Episode": -1, "Return": -1, "Success_Rate": -1, "time": -1}
 
@@ -546,6 +653,8 @@ def run_mix_multitask_agent_reflective(args):
     
     print('\nAll rollout logs:')
     print(all_rollout_logs)
+    print('\nResponse cache stats:')
+    print(RESPONSE_CACHE.stats())
 
 
 if __name__ == "__main__":
@@ -669,6 +778,21 @@ if __name__ == "__main__":
         help="(optional) set renderer type",
     )
 
+    # number of worker processes, each runs episodes in its own environment
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=1,
+        help="(optional) run episodes in parallel over this many processes",
+    )
+
+    # frames sent to the VLM are kept in memory, and saved to the log folder by default
+    parser.add_argument(
+        "--no_frames",
+        action='store_true',
+        help="(optional) do not save agent frames to the log folder",
+    )
+
     args = parser.parse_args()
     args.render == False
     run_mix_multitask_agent_reflective(args)
@@ -11,6 +11,7 @@ import numpy as np
 import traceback
 from copy import deepcopy
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from termcolor import colored
 
 import torch
@@ -24,6 +25,7 @@ import robomimic.utils.lang_utils as LangUtils # added
 import robomimic.utils.env_utils as EnvUtils # added
 import robomimic.utils.train_utils as TrainUtils # added
 import robomimic.utils.log_utils as LogUtils # added
+import robomimic.utils.inference_utils as InferenceUtils
 
 from robomimic.utils.dataset import SequenceDataset, R2D2Dataset, MetaDataset
 from robomimic.envs.env_base import EnvBase, EnvType
@@ -37,12 +39,15 @@ from robosuite import load_controller_config
 import robocasa
 import robocasa.utils.control_utils as CU
 import robocasa.utils.controller_dict as CD
+from robocasa.utils.scene_registry import get_scene_registry
 
 BASE_PATH = os.path.abspath(robocasa.__file__ + '/../../../')
 sys.path.append(BASE_PATH)
 os.chdir(BASE_PATH)
 
 from agents import MixCoAgent
+from agents.client import RESPONSE_CACHE
+from agents.frame import EncodedFrame, FRAME_SINK
 
 from PIL import Image
 
@@ -54,6 +59,158 @@ os.environ['all_proxy'] = ""
 os.environ['ALL_PROXY'] = ""
 
 
+class AgentSlot:
+    """
+    scheduling state of one agent in the two agent rollout, each agent runs its own subtask,
+    and is checked and re-planned as soon as its subtask ends while the other agent keeps moving
+    """
+    def __init__(self, agent, id):
+        self.agent = agent
+        self.id = id
+        self.finished = 0 # number of ended subtasks, i.e. position of current subtask in the aligned two agent plan
+        self.idle_steps = 0
+        self.arm_need_reset = False
+        self.clear()
+
+
+    def clear(self):
+        self.task = None
+        self.controller_config = None
+        self.policy = None
+        self.checker = None
+        self.planner = None
+        self.step_i = 0
+        self.end_control = False
+        self.pending = None # queued policy request of this step
+
+
+    @property
+    def waiting(self):
+        return self.task is not None and self.task.startswith("wait")
+
+
+    def start(self, command, env, device, multiagent_config):
+        """
+        get policy or planner of the command, raise ValueError if the command cannot be executed
+        """
+        controller_config, extra_para = CD.search_config(command, CD.controller_dict)
+        if controller_config["type"] == "policy":
+            # agents running the same checkpoint share one policy, their requests are batched by the inference server
+            policy = InferenceUtils.INFERENCE_SERVER.acquire(ckpt_path=controller_config["ckpt_path"], device=device, lang=controller_config["env_lang"])
+            ObsUtils.initialize_obs_utils_with_config(multiagent_config, verbose=False) # maintain obs_utils for all policies
+            assert isinstance(policy, RolloutPolicy)
+            self.policy = policy
+            self.checker = controller_config["checker"]
+        elif controller_config["type"] == "planner":
+            obs = env.env.env.observation_spec()
+            self.planner = controller_config["planner"](env, obs, extra_para, id=self.id)
+        self.task = command
+        self.controller_config = controller_config
+        self.step_i = 0
+        self.end_control = False
+        
+        # generate conditions and read checkpoint of the next subtask in background while this one executes
+        self.agent.speculate()
+
+
+    def release(self):
+        """
+        delete policy or planner objects of the ended subtask
+        """
+        if self.policy is not None:
+            InferenceUtils.INFERENCE_SERVER.release(self.policy) # keep checkpoint warm for later subtasks, pool bounds gpu memory usage
+        self.clear()
+
+
+    def ready(self, other):
+        """
+        navigation only starts after the other agent has ended all subtasks before the same plan position,
+        so that robots move from the same relative configuration as in the aligned plan and do not crash
+        """
+        if self.task.startswith("navigate"):
+            return other.finished >= self.finished
+        return True
+
+
+    def active(self, other):
+        return self.task is not None and not self.end_control and self.ready(other)
+
+
+    def policy_observation(self, ob_dict):
+        """
+        observations of this agent, renamed to robot0 keys used by the single agent policies
+        """
+        if self.id == 0:
+            return {key: value for key, value in ob_dict.items() if not key.startswith('robot1')}
+        return {key.replace('robot1', 'robot0'): value for key, value in ob_dict.items() if not key.startswith('robot0')}
+
+
+    def submit_policy(self, ob_dict, goal_dict, other):
+        """
+        queue the policy request before any agent acts, so that requests of both agents can share a forward pass
+        """
+        if self.active(other) and not self.waiting and self.controller_config["type"] == "policy" and hasattr(self.policy, "submit"):
+            self.pending = self.policy.submit(self.policy_observation(ob_dict), goal_dict)
+
+
+    def get_action(self, env, ob_dict, goal_dict, other):
+        """
+        action of this agent for the next joint step, idle action keeps the last grasp state
+        """
+        if not self.active(other):
+            self.idle_steps += 1
+            return CU.create_action(id=self.id)
+
+        self.step_i += 1
+        if self.waiting:
+            # wait until the other agent ends the subtask at the same plan position, never wait for each other
+            self.end_control = other.finished > self.finished or other.waiting
+            self.arm_need_reset = False
+            self.idle_steps += 1
+            return CU.create_action(id=self.id)
+
+        if self.controller_config["type"] == "policy":
+            if self.pending is not None:
+                ac = self.pending.result()
+                self.pending = None
+            else:
+                ac = self.policy(self.policy_observation(ob_dict), goal_dict)
+            self.end_control = self.checker(env)
+            self.arm_need_reset = True
+        elif self.controller_config["type"] == "planner":
+            obs = env.env.env.observation_spec()
+            ac, control_info = self.planner.get_control(env=env, obs=obs)
+            self.end_control = control_info["end_control"]
+            self.arm_need_reset = control_info["arm_need_reset"]
+        return ac
+
+
+def render_check_frames(env, id, view, log_path, task_i):
+    """
+    render and save the frames used for condition checking of one agent
+    """
+    if view == 1:
+        image = EncodedFrame.from_array(env.render(mode="rgb_array", height=512, width=512, camera_name=f"robot{id}_vlmview"))
+        FRAME_SINK.write(image, os.path.join(log_path, f"task{task_i}_agent{id}_frame.jpg"))
+        return image
+    elif view == 2:
+        image0 = EncodedFrame.from_array(env.render(mode="rgb_array", height=512, width=512, camera_name=f"robot{id}_vlmview"))
+        FRAME_SINK.write(image0, os.path.join(log_path, f"task{task_i}_agent{id}_frame0.jpg"))
+        image1 = EncodedFrame.from_array(env.render(mode="rgb_array", height=512, width=512, camera_name=f"robot{id}_eye_in_hand"))
+        FRAME_SINK.write(image1, os.path.join(log_path, f"task{task_i}_agent{id}_frame1.jpg"))
+        return [image0, image1]
+    else:
+        raise ValueError("Invalid view number")
+
+
+def judge_and_plan(agent, checks):
+    """
+    output the check results of the ended task and the next one, then get the new plan
+    """
+    agent.judge_conditions(checks, verbose=True)
+    return agent.get_plan()
+
+
 def run_mix_rollout_multitask_twoagent(
         env, 
         horizon,
@@ -84,7 +241,6 @@ def run_mix_rollout_multitask_twoagent(
     rews = []
     success = { k: False for k in env.is_success() } # success metrics
 
-    end_step = None
     
     if log_path == None:
         task_name = env.env.env.__class__.__name__
@@ -95,8 +251,6 @@ def run_mix_rollout_multitask_twoagent(
     
     device = TorchUtils.get_torch_device(try_to_use_cuda=True)
     
-    horizon_reached = False
-    task_i = -1
     
     # to render initial state
     for _ in range(1):
@@ -105,22 +259,8 @@ def run_mix_rollout_multitask_twoagent(
         ac = np.concatenate([ac0, ac1], axis=0)
         ob_dict, r, done, info = env.step(ac)
     
-    # get all valid keys
-    object_keys = env.env.env.objects.keys()
-    fixtures = list(env.env.env.fixtures.values())
-    fxtr_classes = [type(fxtr).__name__ for fxtr in fixtures]
-    valid_target_fxtr_classes = [
-        cls for cls in fxtr_classes if fxtr_classes.count(cls) == 1 and cls in [
-            "CoffeeMachine", "Toaster", "Stove", "Stovetop", "OpenCabinet",
-            "Microwave", "Sink", "Hood", "Oven", "Fridge", "Dishwasher",
-        ]
-    ]
-    fixture_keys = [fxtr.lower() for fxtr in valid_target_fxtr_classes]
-
-    # handle special cases
-    object_keys = [x for x in object_keys if not x.endswith('_container')]
-    fixture_keys = ['cabinet' if x == 'opencabinet' else x for x in fixture_keys]
-    fixture_keys.append('counter')
+    # get all valid keys, special cases (e.g. cabinet, counter) are handled by the scene registry
+    fixture_keys, object_keys = get_scene_registry(env.env.env).command_keys()
     
     # print available fixtures, objects, and commands
     print(colored("\nAvailable fixtures in env {}:".format(type(env.env.env).__name__), "yellow"))
@@ -154,299 +294,101 @@ Available commands: {CD.available_commands}
     task_name = env.env.env.__class__.__name__
     agent0 = MixCoAgent(goal, env_info, view=view, task_name=task_name, id=0)
     agent1 = MixCoAgent(goal, env_info, view=view, task_name=task_name, id=1)
+    slots = [AgentSlot(agent0, 0), AgentSlot(agent1, 1)]
     
-    # start episode
+    # get initial two agent plan, query again until the first commands of both agents can be executed
     while True:
-        torch.cuda.empty_cache()
-        task_i += 1
-        end_control0 = False
-        end_control1 = False
-        
-        # get language command and controller config for each agent
-        print()
-        print(colored("Begin task {}:".format(task_i), "yellow"))
-        
-        if task_i == 0:
-            plan_dict = agent0.get_initial_plan(verbose=verbose)
-            from pprint import pprint
-            pprint(plan_dict)
-            plan0 = plan_dict["agent0"]
-            plan1 = plan_dict["agent1"]
-            agent0.history_plan.append(plan0)
-            agent0.history_execution.append(plan0[0])
-            agent1.history_plan.append(plan1)
-            agent1.history_execution.append(plan1[0])
-        
-        try:
-            if task_i > 0:
-                plan0 = agent0.get_plan()
-            command0 = plan0[0]
-            print()
-            print("Agent 0's plan:", plan0)
-            print("Agent 0's execution:", command0)
-            task0 = command0
-            controller_config0, extra_para0 = CD.search_config(command0, CD.controller_dict)
-        except ValueError as e:
-            task_i -= 1
-            message = 'Error: {}'.format(e)
-            print()
-            print(colored(message, 'red'))
-            if task_i > 0:
-                agent0.delete_last_plan()
-            continue
-        
+        plan_dict = agent0.get_initial_plan(verbose=verbose)
+        from pprint import pprint
+        pprint(plan_dict)
+        for slot, plan in zip(slots, [plan_dict["agent0"], plan_dict["agent1"]]):
+            slot.agent.history_plan.append(plan)
+            slot.agent.history_execution.append(plan[0])
         try:
-            if task_i > 0:
-                plan1 = agent1.get_plan()
-            command1 = plan1[0]
-            print()
-            print("Agent 1's plan:", plan1)
-            print("Agent 1's execution:", command1)
-            task1 = command1
-            controller_config1, extra_para1 = CD.search_config(command1, CD.controller_dict)
+            for slot in slots:
+                print()
+                print("Agent {}'s plan:".format(slot.id), slot.agent.history_plan[-1])
+                print("Agent {}'s execution:".format(slot.id), slot.agent.history_plan[-1][0])
+                slot.start(slot.agent.history_plan[-1][0], env, device, multiagent_config)
+            break
         except ValueError as e:
-            task_i -= 1
-            message = 'Error: {}'.format(e)
             print()
-            print(colored(message, 'red'))
-            if task_i > 0:
-                agent0.delete_last_plan()
-                agent1.delete_last_plan()
-                assert len(agent0.history_plan) == len(agent1.history_plan)
-            continue
-        
-        # get policy or planner for each agent
-        
-        if controller_config0["type"] == "policy":
-            env_lang0 = controller_config0["env_lang"]
-            ckpt_path0 = controller_config0["ckpt_path"]
-            policy0, ckpt_dict0 = FileUtils.policy_from_checkpoint(ckpt_path=ckpt_path0, device=device, verbose=False)
-            ObsUtils.initialize_obs_utils_with_config(multiagent_config, verbose=False) # maintain obs_utils for all policies
-            assert isinstance(policy0, RolloutPolicy)
-            policy0.start_episode(lang=env_lang0)
-            checker0 = controller_config0["checker"]
-            
-        elif controller_config0["type"] == "planner":
-            obs = env.env.env.observation_spec()
-            try:
-                planner0 = controller_config0["planner"](env, obs, extra_para0, id=0)
-            except ValueError as e:
-                task_i -= 1
-                planner0 = None
-                print()
-                print(colored('Error: {}'.format(e), 'red'))
-                if task_i > 0:
-                    agent0.delete_last_plan()
-                    agent1.delete_last_plan()
-                    assert len(agent0.history_plan) == len(agent1.history_plan)
-                continue
+            print(colored('Error: {}'.format(e), 'red'))
+            for slot in slots:
+                slot.release()
+                slot.agent.delete_last_plan()
+    
+    # start episode, one joint action per step, agents whose subtask ended are checked and re-planned on their own
+    step_i = -1
+    executor = ThreadPoolExecutor(max_workers=len(slots))
+    while True:
+        step_i += 1
         
-        if controller_config1["type"] == "policy":
-            env_lang1 = controller_config1["env_lang"]
-            ckpt_path1 = controller_config1["ckpt_path"]
-            policy1, ckpt_dict1 = FileUtils.policy_from_checkpoint(ckpt_path=ckpt_path1, device=device, verbose=False)
-            ObsUtils.initialize_obs_utils_with_config(multiagent_config, verbose=False) # maintain obs_utils for all policies
-            assert isinstance(policy1, RolloutPolicy)
-            policy1.start_episode(lang=env_lang1)
-            checker1 = controller_config1["checker"]
-            
-        elif controller_config1["type"] == "planner":
-            obs = env.env.env.observation_spec()
-            try:
-                planner1 = controller_config1["planner"](env, obs, extra_para1, id=1)
-            except ValueError as e:
-                task_i -= 1
-                planner1 = None
-                print()
-                print(colored('Error: {}'.format(e), 'red'))
-                if task_i > 0:
-                    agent0.delete_last_plan()
-                    agent1.delete_last_plan()
-                    assert len(agent0.history_plan) == len(agent1.history_plan)
-                continue
-
-        # start control loop if no error occurs for both agents
+        # use policy or planner to get action, an agent waiting for the other one holds still
+        slots[0].submit_policy(ob_dict, goal_dict, slots[1])
+        slots[1].submit_policy(ob_dict, goal_dict, slots[0])
+        ac0 = slots[0].get_action(env, ob_dict, goal_dict, slots[1])
+        ac1 = slots[1].get_action(env, ob_dict, goal_dict, slots[0])
         
-        for step_i in range(horizon): #LogUtils.tqdm(range(horizon)):
-            
-            # use policy or planner to get action
-            
-            if end_control0:
-                ac0 = CU.create_action(id=0)
-            else:
-                if controller_config0["type"] == "policy":
-                    # policy_ob = ob_dict
-                    policy_ob0 = {key: value for key, value in ob_dict.items() if not key.startswith('robot1')}
-                    ac0 = policy0(policy_ob0, goal_dict)
-                    end_control0 = checker0(env)
-                    arm_need_reset0 = True
-                elif controller_config0["type"] == "planner":
-                    obs = env.env.env.observation_spec()
-                    ac0, control_info0 = planner0.get_control(env=env, obs=obs)
-                    end_control0 = control_info0["end_control"]
-                    arm_need_reset0 = control_info0["arm_need_reset"]
-            
-            if end_control1:
-                ac1 = CU.create_action(id=1)
-            else:
-                if controller_config1["type"] == "policy":
-                    # policy_ob = ob_dict
-                    policy_ob1 = {key.replace('robot1', 'robot0'): value for key, value in ob_dict.items() if not key.startswith('robot0')}
-                    ac1 = policy1(policy_ob1, goal_dict)
-                    end_control1 = checker1(env)
-                    arm_need_reset1 = True
-                elif controller_config1["type"] == "planner":
-                    obs = env.env.env.observation_spec()
-                    ac1, control_info1 = planner1.get_control(env=env, obs=obs)
-                    end_control1 = control_info1["end_control"]
-                    arm_need_reset1 = control_info1["arm_need_reset"]
-                
-            # play action
-            ac = np.concatenate([ac0, ac1], axis=0)
-            ob_dict, r, done, info = env.step(ac)
+        # play action
+        ac = np.concatenate([ac0, ac1], axis=0)
+        ob_dict, r, done, info = env.step(ac)
 
-            # render to screen
-            if render:
-                env.render(mode="human") # can change camera here, or by default the first camera in camera list
+        # render to screen
+        if render:
+            env.render(mode="human") # can change camera here, or by default the first camera in camera list
 
-            # compute reward
-            rews.append(r)
+        # compute reward
+        rews.append(r)
 
-            # cur_success_metrics = env.is_success()
-            cur_success_metrics = info["is_success"]
+        # cur_success_metrics = env.is_success()
+        cur_success_metrics = info["is_success"]
 
-            if success is None:
-                success = deepcopy(cur_success_metrics)
-            else:
-                for k in success:
-                    success[k] = success[k] | cur_success_metrics[k]
-
-            # visualization
-            if video_writer is not None:
-                if video_count % video_skip == 0:
-                    frame0 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_frontview")
-                    frame1 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot1_frontview")
-                    frame = np.concatenate([frame0, frame1], axis=1)
-                    video_writer.append_data(frame)
-                video_count += 1
-
-            # determine whether task control has ended
-            task0_success = done or (terminate_on_success and success["task"]) or end_control0
-            task0_failure = (step_i == horizon - 1) and not task0_success
-            task1_success = done or (terminate_on_success and success["task"]) or end_control1
-            task1_failure = (step_i == horizon - 1) and not task1_success
-            
-            # break if all success or both end control or horizon reached
-            if (task0_success or task0_failure) and (task1_success or task1_failure):
-                if end_step == None:
-                    end_step = step_i
-                else:
-                    end_step += step_i
-                
-                # print success or failure info
-                if verbose:
-                    print()
-                    if end_control0 and end_control1:
-                        print(colored("Success: agent0's task {} succeeded".format(task_i), 'green'))
-                        print(colored("Success: agent1's task {} succeeded".format(task_i), 'green'))
-                    elif not end_control0 and end_control1:
-                        print(colored("Failure: horizon reached, agent0's task {} failed".format(task_i), 'red'))
-                        print(colored("Success: agent1's task {} succeeded".format(task_i), 'green'))
-                    elif not end_control1 and end_control0:
-                        print(colored("Success: agent0's task {} succeeded".format(task_i), 'green'))
-                        print(colored("Failure: horizon reached, agent1's task {} failed".format(task_i), 'red'))
-                    elif not end_control0 and not end_control1:
-                        print(colored("Failure: horizon reached, agent0's task {} failed".format(task_i), 'red'))
-                        print(colored("Failure: horizon reached, agent1's task {} failed".format(task_i), 'red'))
-            
-                # delete policy or planner objects
-                if controller_config0["type"] == "policy":
-                    del policy0 # to avoid huge gpu memory usage
-                    del checker0
-                elif controller_config0["type"] == "planner":
-                    del planner0
-                if controller_config1["type"] == "policy":
-                    del policy1 # to avoid huge gpu memory usage
-                    del checker1
-                elif controller_config1["type"] == "planner":
-                    del planner1
-                
-                # reset arm to initial position and orientation
-                if arm_need_reset0:
-                    initial_qpos=(-0.01612974, -1.03446714, -0.02397936, -2.27550888, 0.03932365, 1.51639493, 0.69615947)
-                    env.env.env.robots[0].set_robot_joint_positions(initial_qpos)
-                if arm_need_reset1:
-                    initial_qpos=(-0.01612974, -1.03446714, -0.02397936, -2.27550888, 0.03932365, 1.51639493, 0.69615947)
-                    env.env.env.robots[1].set_robot_joint_positions(initial_qpos)
-                if arm_need_reset0 or arm_need_reset1:
-                    grasp0 = not arm_need_reset0
-                    grasp1 = not arm_need_reset1
-                    ac0 = CU.create_action(grasp=grasp0, id=0)
-                    ac1 = CU.create_action(grasp=grasp1, id=1)
-                    ac = np.concatenate([ac0, ac1], axis=0)
-                    ob_dict, r, done, info = env.step(ac)
-                
-                # directly break if whole task success
-                if terminate_on_success and success["task"]:
-                    break
-                
-                # record image and check post conditions
-
-                if view == 1:
-
-                    frame0 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_vlmview")
-                    image0 = Image.fromarray(frame0)
-                    image0_path = os.path.join(log_path, f"task{task_i}_agent0_frame.jpg")
-                    image0.save(image0_path, format="JPEG")
-                    
-                    frame1 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot1_vlmview")
-                    image1 = Image.fromarray(frame1)
-                    image1_path = os.path.join(log_path, f"task{task_i}_agent1_frame.jpg")
-                    image1.save(image1_path, format="JPEG")
-                    
-                    agent0.check_post_condition(image0_path, env, obs, task0, verbose=True)
-                    agent0.check_pre_condition(image0_path, env, obs, agent0.history_plan[-1][1], verbose=True)
-                    agent1.check_post_condition(image1_path, env, obs, task1, verbose=True)
-                    agent1.check_pre_condition(image1_path, env, obs, agent1.history_plan[-1][1], verbose=True)
-                    
-                elif view == 2:
-
-                    frame00 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_vlmview")
-                    image00 = Image.fromarray(frame00)
-                    image00_path = os.path.join(log_path, f"task{task_i}_agent0_frame0.jpg")
-                    image00.save(image00_path, format="JPEG")
-                    
-                    frame01 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_eye_in_hand")
-                    image01 = Image.fromarray(frame01)
-                    image01_path = os.path.join(log_path, f"task{task_i}_agent0_frame1.jpg")
-                    image01.save(image01_path, format="JPEG")
-                    
-                    frame10 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot1_vlmview")
-                    image10 = Image.fromarray(frame10)
-                    image10_path = os.path.join(log_path, f"task{task_i}_agent1_frame0.jpg")
-                    image10.save(image10_path, format="JPEG")
-                    
-                    frame11 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot1_eye_in_hand")
-                    image11 = Image.fromarray(frame11)
-                    image11_path = os.path.join(log_path, f"task{task_i}_agent1_frame1.jpg")
-                    image11.save(image11_path, format="JPEG")
-                    
-                    agent0.check_post_condition([image00_path, image01_path], env, obs, task0, verbose=True)
-                    agent1.check_post_condition([image10_path, image11_path], env, obs, task1, verbose=True)
-                    if len(agent0.history_plan[-1]) == 1:
-                        agent0.check_pre_condition([image0_path, image1_path], env, obs, 'wait', verbose=True)
-                    else:
-                        agent0.check_pre_condition([image0_path, image1_path], env, obs, agent0.history_plan[-1][1], verbose=True)
-                    if len(agent1.history_plan[-1]) == 1:
-                        agent1.check_pre_condition([image0_path, image1_path], env, obs, 'wait', verbose=True)
-                    else:
-                        agent1.check_pre_condition([image0_path, image1_path], env, obs, agent1.history_plan[-1][1], verbose=True)
-                
+        if success is None:
+            success = deepcopy(cur_success_metrics)
+        else:
+            for k in success:
+                success[k] = success[k] | cur_success_metrics[k]
+
+        # visualization
+        if video_writer is not None:
+            if video_count % video_skip == 0:
+                frame0 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot0_frontview")
+                frame1 = env.render(mode="rgb_array", height=512, width=512, camera_name="robot1_frontview")
+                frame = np.concatenate([frame0, frame1], axis=1)
+                video_writer.append_data(frame)
+            video_count += 1
+
+        # directly break if whole task success
+        if done or (terminate_on_success and success["task"]):
+            break
+        
+        # determine whether task control has ended for each agent
+        ended = [slot for slot in slots if slot.end_control or slot.step_i >= horizon]
+        if len(ended) == 0:
+            continue
+        
+        # print success or failure info
+        if verbose:
+            print()
+            for slot in ended:
+                if slot.end_control:
+                    print(colored("Success: agent{}'s task {} succeeded".format(slot.id, slot.finished), 'green'))
                 else:
-                    raise ValueError("Invalid view number")
-
-                break
-                
+                    print(colored("Failure: horizon reached, agent{}'s task {} failed".format(slot.id, slot.finished), 'red'))
+        
+        # reset arm to initial position and orientation
+        for slot in ended:
+            if slot.arm_need_reset:
+                initial_qpos=(-0.01612974, -1.03446714, -0.02397936, -2.27550888, 0.03932365, 1.51639493, 0.69615947)
+                env.env.env.robots[slot.id].set_robot_joint_positions(initial_qpos)
+        if any(slot.arm_need_reset for slot in ended):
+            ac = np.concatenate([
+                CU.create_action(grasp=not slot.arm_need_reset, id=slot.id) if slot in ended else CU.create_action(id=slot.id)
+                for slot in slots
+            ], axis=0)
+            ob_dict, r, done, info = env.step(ac)
+        
         if success["task"] == True:
             if verbose:
                 print()
@@ -456,21 +398,71 @@ Available commands: {CD.available_commands}
             if verbose:
                 print('Done by some reasons')
             break
-        if horizon_reached:
-            continue # try again or change task
+        
+        # record image, check conditions and re-plan of ended agents, the scene is not stepped meanwhile.
+        # llm/vlm requests of the agents run concurrently, ground truth checks read the simulation in this thread
+        obs = env.env.env.observation_spec()
+        prepared = {}
+        for slot in ended:
+            task = slot.task
+            slot.release()
+            image = render_check_frames(env, slot.id, view, log_path, slot.finished)
+            plan = slot.agent.history_plan[-1]
+            next_task = 'wait' if len(plan) == 1 else plan[1]
+            prepared[slot.id] = executor.submit(slot.agent.prepare_condition_checks, image, task, next_task)
+            slot.finished += 1
+        futures = {}
+        for slot in ended:
+            checks = prepared[slot.id].result()
+            slot.agent.collect_condition_checks(checks, env, obs, verbose=True)
+            futures[slot.id] = executor.submit(judge_and_plan, slot.agent, checks)
+        
+        # get policy or planner of each new command, query the planner again if the command cannot be executed
+        for slot in ended:
+            future = futures[slot.id]
+            while True:
+                try:
+                    plan = future.result() if future is not None else slot.agent.get_plan()
+                    future = None
+                    print()
+                    print("Agent {}'s plan:".format(slot.id), plan)
+                    print("Agent {}'s execution:".format(slot.id), plan[0])
+                    slot.start(plan[0], env, device, multiagent_config)
+                    break
+                except ValueError as e:
+                    future = None
+                    print()
+                    print(colored('Error: {}'.format(e), 'red'))
+                    slot.release()
+                    slot.agent.delete_last_plan()
+        torch.cuda.empty_cache()
+    
+    for slot in slots:
+        slot.release()
+    executor.shutdown()
 
-    end_step = end_step or step_i
+    end_step = step_i
     total_reward = np.sum(rews[:end_step + 1])
     
     results["Return"] = total_reward
     results["Horizon"] = end_step + 1
     results["Success_Rate"] = float(success["task"])
+    
+    # steps each agent held still while waiting for the other agent
+    for slot in slots:
+        results["Idle_Steps_Agent{}".format(slot.id)] = slot.idle_steps
 
     # log additional success metrics
     for k in success:
         if k != "task":
             results["{}_Success_Rate".format(k)] = float(success[k])
 
+    # track confidence of a replayed two agent plan, and remember the plan of a successful interaction
+    agent0.record_plan_outcome(success["task"], agent0.plan_dict, kind="twoagent")
+
+    # frames of this episode are written in background, make sure they are on disk before returning
+    FRAME_SINK.flush()
+
     return results
 
 
@@ -478,6 +470,7 @@ def run_mix_multitask_twoagent(args):
     # some arg checking
     write_video = (args.video_path is not None)
     assert not (args.render and write_video) # either on-screen or video but not both
+    FRAME_SINK.enabled = not args.no_frames
     if args.render:
         # on-screen rendering can only support one camera
         assert len(args.camera_names) == 1
@@ -537,7 +530,7 @@ def run_mix_multitask_twoagent(args):
     # handle environment wrappers
     from robomimic.envs.wrappers import FrameStackWrapper
     frame_stack = 10 # from auto gen config file
-    env = FrameStackWrapper(env, num_frames=frame_stack)
+    env = FrameStackWrapper(env, num_frames=frame_stack, zero_copy=True) # observations are consumed before the next step
 
     # maybe set seed
     if args.seed is not None:
@@ -670,6 +663,8 @@ def run_mix_multitask_twoagent(args):
     
     print('\nAll rollout logs:')
     print(all_rollout_logs)
+    print('\nResponse cache stats:')
+    print(RESPONSE_CACHE.stats())
 
 
 if __name__ == "__main__":
@@ -794,6 +789,13 @@ if __name__ == "__main__":
         help="(optional) set renderer type",
     )
 
+    # frames sent to the VLM are kept in memory, and saved to the log folder by default
+    parser.add_argument(
+        "--no_frames",
+        action='store_true',
+        help="(optional) do not save agent frames to the log folder",
+    )
+
     args = parser.parse_args()
     args.render == False
     run_mix_multitask_twoagent(args)
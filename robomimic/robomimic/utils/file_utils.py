@@ -6,6 +6,7 @@ import os
 import h5py
 import json
 import time
+import threading
 import urllib.request
 import numpy as np
 from collections import OrderedDict
@@ -447,9 +448,8 @@ def policy_from_checkpoint(device=None, ckpt_path=None, ckpt_dict=None, verbose=
         # get torch device
         device = TorchUtils.get_torch_device(try_to_use_cuda=config.train.cuda)
 
-    lang_encoder = LangUtils.LangEncoder(
-        device=device,
-    )
+    # language encoder is shared by all policies on the same device
+    lang_encoder = LangUtils.get_lang_encoder(device=device)
 
     # create model and load weights
     model = algo_factory(
@@ -473,6 +473,186 @@ def policy_from_checkpoint(device=None, ckpt_path=None, ckpt_dict=None, verbose=
     return model, ckpt_dict
 
 
+class PolicyPool(object):
+    """
+    Process-wide pool of loaded policies, keyed by checkpoint path and device. Policies
+    are handed out with @acquire and given back with @release, so that switching between
+    subtasks does not reload checkpoints from disk. Idle policies are evicted in
+    least-recently-used order once the CPU or GPU memory budget is exceeded. Policies
+    that are never released are simply garbage collected. Checkpoints of upcoming
+    subtasks can be read ahead of time with @prefetch from a background thread.
+    """
+    def __init__(self, max_cpu_bytes=8 * 1024 ** 3, max_gpu_bytes=4 * 1024 ** 3, max_prefetched=2):
+        """
+        Args:
+            max_cpu_bytes (int): memory budget for idle policies held on CPU
+
+            max_gpu_bytes (int): memory budget for idle policies held on GPU
+
+            max_prefetched (int): number of prefetched checkpoint dictionaries kept until acquired
+        """
+        self.max_bytes = dict(cpu=max_cpu_bytes, cuda=max_gpu_bytes)
+        self.max_prefetched = max_prefetched
+        self._idle = OrderedDict() # (ckpt_path, device) -> list of idle policies, least recently used first
+        self._prefetched = OrderedDict() # ckpt_path -> checkpoint dictionary, oldest first
+        self._default_devices = dict() # ckpt_path -> device chosen by the checkpoint config
+        self._lock = threading.RLock()
+        self.num_loads = 0
+        self.num_reuses = 0
+        self.num_prefetches = 0
+
+    @staticmethod
+    def _device_type(key):
+        return "cuda" if key[1].startswith("cuda") else "cpu"
+
+    @staticmethod
+    def _policy_nbytes(policy):
+        """
+        Size of all parameters and buffers of the wrapped networks in bytes.
+        """
+        nbytes = 0
+        for net in policy.policy.nets.values():
+            for tensor in list(net.parameters()) + list(net.buffers()):
+                nbytes += tensor.numel() * tensor.element_size()
+        return nbytes
+
+    def resolve_device(self, ckpt_path, device=None):
+        """
+        Device that @acquire puts the policy of @ckpt_path on. If @device is None, this is the
+        device @policy_from_checkpoint picks from the training config of the checkpoint, so that
+        policies acquired with and without an explicit device share the same pool entry.
+
+        Args:
+            ckpt_path (str): path to checkpoint file
+
+            device (torch.device): requested device, or None
+
+        Returns:
+            device (torch.device): device to put the model on
+        """
+        if device is not None:
+            return torch.device(device)
+        path = os.path.abspath(ckpt_path)
+        with self._lock:
+            device = self._default_devices.get(path)
+            ckpt_dict = self._prefetched.get(path)
+        if device is not None:
+            return device
+        if ckpt_dict is None:
+            # keep the checkpoint dictionary for @acquire, it is read from disk only once
+            ckpt_dict = load_dict_from_checkpoint(ckpt_path)
+            with self._lock:
+                self._prefetched[path] = ckpt_dict
+                while len(self._prefetched) > self.max_prefetched:
+                    self._prefetched.popitem(last=False)
+        config, _ = config_from_checkpoint(ckpt_dict=ckpt_dict)
+        device = TorchUtils.get_torch_device(try_to_use_cuda=config.train.cuda)
+        with self._lock:
+            self._default_devices[path] = device
+        return device
+
+    def acquire(self, ckpt_path, device=None, lang=None, verbose=False):
+        """
+        Get a policy for @ckpt_path on @device, reset for a new episode with language @lang.
+
+        Args:
+            ckpt_path (str): path to checkpoint file
+
+            device (torch.device): device to put the model on, if None it is chosen by @resolve_device
+
+            lang (str): language instruction passed to @RolloutPolicy.start_episode
+
+            verbose (bool): if True, include print statements
+
+        Returns:
+            policy (RolloutPolicy): policy that should be given back with @release after use
+        """
+        device = self.resolve_device(ckpt_path, device)
+        key = (os.path.abspath(ckpt_path), str(device))
+        with self._lock:
+            policy = None
+            if len(self._idle.get(key, [])) > 0:
+                policy = self._idle[key].pop()
+                if len(self._idle[key]) == 0:
+                    del self._idle[key]
+                self.num_reuses += 1
+            ckpt_dict = self._prefetched.pop(key[0], None) if policy is None else None
+        if policy is not None:
+            # restore observation modalities of this checkpoint, they are global state in ObsUtils
+            ObsUtils.initialize_obs_utils_with_config(policy.policy.global_config, verbose=False)
+        else:
+            policy, _ = policy_from_checkpoint(ckpt_path=ckpt_path, ckpt_dict=ckpt_dict, device=device, verbose=verbose)
+            policy._pool_key = key
+            policy._pool_nbytes = self._policy_nbytes(policy)
+            with self._lock:
+                self.num_loads += 1
+        policy.start_episode(lang=lang)
+        return policy
+
+    def release(self, policy):
+        """
+        Give back a policy obtained from @acquire, so that it can be reused later.
+        """
+        key = policy._pool_key
+        with self._lock:
+            self._idle.setdefault(key, []).append(policy)
+            self._idle.move_to_end(key)
+            self._evict(self._device_type(key))
+
+    def prefetch(self, ckpt_path):
+        """
+        Read the checkpoint dictionary of @ckpt_path ahead of time, so that the next @acquire
+        does not wait for the disk. Safe to call from a background thread, the model itself is
+        still built in @acquire because building it changes global ObsUtils state.
+        """
+        path = os.path.abspath(ckpt_path)
+        with self._lock:
+            if path in self._prefetched or any(key[0] == path for key in self._idle):
+                return
+        ckpt_dict = load_dict_from_checkpoint(ckpt_path)
+        with self._lock:
+            self._prefetched[path] = ckpt_dict
+            while len(self._prefetched) > self.max_prefetched:
+                self._prefetched.popitem(last=False)
+            self.num_prefetches += 1
+
+    def _idle_bytes(self, device_type):
+        return sum(
+            policy._pool_nbytes
+            for key, policies in self._idle.items() if self._device_type(key) == device_type
+            for policy in policies
+        )
+
+    def _evict(self, device_type):
+        """
+        Drop least recently used idle policies on @device_type until the memory budget is met.
+        """
+        evicted = False
+        while self._idle_bytes(device_type) > self.max_bytes[device_type]:
+            key = next(key for key in self._idle if self._device_type(key) == device_type)
+            self._idle[key].pop(0)
+            if len(self._idle[key]) == 0:
+                del self._idle[key]
+            evicted = True
+        if evicted and device_type == "cuda":
+            torch.cuda.empty_cache()
+
+    def clear(self):
+        """
+        Drop all idle policies and prefetched checkpoints.
+        """
+        with self._lock:
+            self._idle.clear()
+            self._prefetched.clear()
+            self._default_devices.clear()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+# process-wide policy pool used by the agent rollout scripts
+POLICY_POOL = PolicyPool()
+
+
 def env_from_checkpoint(ckpt_path=None, ckpt_dict=None, env_name=None, render=False, render_offscreen=False, verbose=False):
     """
     Creates an environment using the metadata saved in a checkpoint.
@@ -0,0 +1,212 @@
+"""
+A collection of utilities for serving one policy checkpoint to several concurrent rollouts,
+e.g. both agents of a two agent environment, by gathering their requests into batched
+forward passes.
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+import robomimic.utils.tensor_utils as TensorUtils
+import robomimic.utils.file_utils as FileUtils
+from robomimic.algo import RolloutPolicy
+
+
+class PolicySession(RolloutPolicy):
+    """
+    One rollout on a policy shared through @BatchedInferenceServer. It is used like a
+    RolloutPolicy, but keeps its own language embedding and rollout state (e.g. rnn hidden
+    state), and its requests are batched with concurrent requests of other sessions on the
+    same checkpoint. A session should have at most one request in flight.
+    """
+    def __init__(self, server, key, shared_policy):
+        """
+        Args:
+            server (BatchedInferenceServer): server that runs the requests of this session
+
+            key (tuple): (ckpt_path, device) key of the shared policy in @server
+
+            shared_policy (RolloutPolicy): policy shared by all sessions on the checkpoint
+        """
+        super(PolicySession, self).__init__(
+            shared_policy.policy,
+            obs_normalization_stats=shared_policy.obs_normalization_stats,
+            action_normalization_stats=shared_policy.action_normalization_stats,
+            lang_encoder=shared_policy.lang_encoder,
+        )
+        self.server = server
+        self.key = key
+        self.rollout_state = None
+
+    def start_episode(self, lang=None):
+        """
+        Prepare the session to start a new rollout, the shared policy is not reset.
+        """
+        if self.lang_encoder is not None:
+            self._ep_lang_emb = TensorUtils.to_numpy(self.lang_encoder.get_lang_emb(lang))
+        self.policy.set_eval()
+        self.rollout_state = None
+
+    def submit(self, ob, goal=None):
+        """
+        Queue a request for the action of a single observation dictionary.
+
+        Returns:
+            future (Future): resolves to the action as np.array
+        """
+        return self.server.submit(self, ob, goal)
+
+    def __call__(self, ob, goal=None, batched=False):
+        """
+        Produce action from a single raw observation dict, blocks until the batch it joined has run.
+        """
+        assert batched is False
+        return self.submit(ob, goal).result()
+
+
+class BatchedInferenceServer(object):
+    """
+    Local inference service. Requests of all sessions on the same checkpoint and device are
+    gathered by one worker thread, until @max_batch_size requests arrived or @max_wait seconds
+    passed since the first one, then run as one batched forward pass and scattered back.
+    Checkpoints whose algorithm does not support batched rollouts get a dedicated policy from
+    the policy pool instead, so callers do not need to tell them apart.
+    """
+    def __init__(self, policy_pool, max_batch_size=16, max_wait=0.002):
+        """
+        Args:
+            policy_pool (PolicyPool): pool that loads and keeps the policies
+
+            max_batch_size (int): maximum number of requests in one forward pass
+
+            max_wait (float): latency deadline in seconds for gathering a batch
+        """
+        self.policy_pool = policy_pool
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._workers = dict() # (ckpt_path, device) -> worker state
+        self._lock = threading.Lock()
+        self.num_requests = 0
+        self.num_batches = 0
+
+    def acquire(self, ckpt_path, device=None, lang=None, verbose=False):
+        """
+        Get a policy for @ckpt_path on @device, reset for a new episode with language @lang.
+
+        Returns:
+            policy (RolloutPolicy): a @PolicySession if the checkpoint can be batched, otherwise a
+                dedicated policy, in both cases it should be given back with @release after use
+        """
+        device = self.policy_pool.resolve_device(ckpt_path, device)
+        key = (os.path.abspath(ckpt_path), str(device))
+        with self._lock:
+            worker = self._workers.get(key)
+            if worker is None:
+                policy = self.policy_pool.acquire(ckpt_path=ckpt_path, device=device, lang=lang, verbose=verbose)
+                if not policy.policy.supports_batched_rollout:
+                    return policy
+                worker = dict(policy=policy, queue=queue.Queue(), sessions=0)
+                worker["thread"] = threading.Thread(target=self._serve, args=(worker,), daemon=True)
+                worker["thread"].start()
+                self._workers[key] = worker
+            worker["sessions"] += 1
+        session = PolicySession(self, key, worker["policy"])
+        session.start_episode(lang=lang)
+        return session
+
+    def release(self, policy):
+        """
+        Give back a policy obtained from @acquire. The shared policy of a checkpoint goes back to
+        the policy pool once its last session is released.
+        """
+        if not isinstance(policy, PolicySession):
+            self.policy_pool.release(policy)
+            return
+        with self._lock:
+            worker = self._workers[policy.key]
+            worker["sessions"] -= 1
+            if worker["sessions"] > 0:
+                return
+            del self._workers[policy.key]
+        worker["queue"].put(None) # stop the worker after pending requests
+        worker["thread"].join()
+        self.policy_pool.release(worker["policy"])
+
+    def submit(self, session, ob, goal=None):
+        """
+        Queue a request of @session, returns a Future of the action.
+        """
+        future = Future()
+        self._workers[session.key]["queue"].put((session, ob, goal, future))
+        return future
+
+    def _serve(self, worker):
+        """
+        Worker loop of one checkpoint, gather requests into batches until stopped.
+        """
+        stopped = False
+        while not stopped:
+            request = worker["queue"].get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = worker["queue"].get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopped = True
+                    break
+                batch.append(request)
+
+            # only requests with the same observation keys and goal usage can be stacked
+            groups = dict()
+            for request in batch:
+                session, ob, goal, future = request
+                group_key = (tuple(sorted(ob.keys())), goal is None)
+                groups.setdefault(group_key, []).append(request)
+            for requests in groups.values():
+                self._run_batch(worker["policy"], requests)
+
+    def _run_batch(self, policy, requests):
+        """
+        Run one batched forward pass for @requests and scatter actions and rollout states back.
+        """
+        try:
+            sessions = [request[0] for request in requests]
+            lang_emb = None
+            if sessions[0]._ep_lang_emb is not None:
+                lang_emb = np.stack([session._ep_lang_emb for session in sessions], axis=0)
+            ob = {k: np.stack([request[1][k] for request in requests], axis=0) for k in requests[0][1]}
+            ob = policy._prepare_observation(ob, batched=True, lang_emb=lang_emb)
+            goal = None
+            if requests[0][2] is not None:
+                goal = {k: np.stack([request[2][k] for request in requests], axis=0) for k in requests[0][2]}
+                goal = policy._prepare_observation(goal, batched=True, lang_emb=lang_emb)
+            with torch.no_grad():
+                ac, states = policy.policy.get_batched_action(
+                    obs_dict=ob, goal_dict=goal, states=[session.rollout_state for session in sessions])
+            ac = TensorUtils.to_numpy(ac)
+            for (session, _, _, future), row, state in zip(requests, ac, states):
+                session.rollout_state = state
+                future.set_result(policy._postprocess_action(row))
+            self.num_requests += len(requests)
+            self.num_batches += 1
+        except Exception as e:
+            for request in requests:
+                if not request[3].done():
+                    request[3].set_exception(e)
+
+
+# process-wide inference server on top of the policy pool, used by the agent rollout scripts
+INFERENCE_SERVER = BatchedInferenceServer(FileUtils.POLICY_POOL)
@@ -12,11 +12,16 @@ class LangEncoder:
             cache_dir=os.path.expanduser("~/tmp/clip")
         ).to(device).eval()
         self.tz = AutoTokenizer.from_pretrained(model_variant, TOKENIZERS_PARALLELISM=True)
+        self._lang_emb_cache = dict() # language string -> embedding
 
     def get_lang_emb(self, lang):
         if lang is None:
             return None
         
+        # single strings (e.g. task instructions) repeat across subtasks, reuse their embeddings
+        if isinstance(lang, str) and lang in self._lang_emb_cache:
+            return self._lang_emb_cache[lang]
+        
         with torch.no_grad():
             tokens = self.tz(
                 text=lang,                   # the sentence to be encoded
@@ -32,6 +37,21 @@ class LangEncoder:
         # check if input is batched or single string
         if isinstance(lang, str):
             lang_emb = lang_emb[0]
+            self._lang_emb_cache[lang] = lang_emb
 
         return lang_emb
 
+
+# process-wide language encoders, one per device
+LANG_ENCODERS = dict()
+
+def get_lang_encoder(device):
+    """
+    Returns a shared LangEncoder for @device, so that the CLIP model is only
+    instantiated once per process.
+    """
+    key = str(device)
+    if key not in LANG_ENCODERS:
+        LANG_ENCODERS[key] = LangEncoder(device=device)
+    return LANG_ENCODERS[key]
+
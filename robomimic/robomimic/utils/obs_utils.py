@@ -462,6 +462,94 @@ def get_processed_shape(obs_modality, input_shape):
     return list(process_obs(obs=np.zeros(input_shape), obs_modality=obs_modality).shape)
 
 
+class ObservationArena(object):
+    """
+    Preallocated float buffers for single (unbatched) observation dicts during rollouts. All
+    keys used by a policy live in one contiguous tensor (pinned when the policy is on GPU),
+    keys with normalization stats first. Each step the observation is written into this fixed
+    memory, all normalized keys are normalized with one vectorized op, and everything is moved
+    to the device with one copy. On CPU the returned tensors are views of the arena, so they
+    are only valid until the next @write.
+    """
+    def __init__(self, obs_keys, device=None, normalization_stats=None):
+        """
+        Args:
+            obs_keys (iterable): observation keys read by the policy, other keys are ignored
+
+            device (torch.device): device the policy runs on
+
+            normalization_stats (dict): optional "offset" and "scale" for observation keys,
+                see @normalize_dict
+        """
+        self.obs_keys = set(obs_keys)
+        self.device = torch.device("cpu") if device is None else torch.device(device)
+        self.normalization_stats = normalization_stats
+        self._layout_key = None
+
+    def _build(self, layout_key):
+        """
+        Allocate the arena and per-key views for observations with keys and shapes in @layout_key.
+        """
+        stats = self.normalization_stats if self.normalization_stats is not None else dict()
+        shapes = OrderedDict(layout_key)
+        order = [k for k in shapes if k in stats] + [k for k in shapes if k not in stats]
+
+        self.slices = OrderedDict()
+        start = 0
+        for k in order:
+            size = int(np.prod(shapes[k]))
+            self.slices[k] = (start, start + size, shapes[k])
+            start += size
+
+        pin_memory = (self.device.type == "cuda") and torch.cuda.is_available()
+        self.arena = torch.empty(start, dtype=torch.float32, pin_memory=pin_memory)
+        self.arena_np = self.arena.numpy() # shares memory with the tensor
+        self.arena_views = OrderedDict((k, self.arena_np[a:b].reshape(shape)) for k, (a, b, shape) in self.slices.items())
+
+        # flattened stats of all normalized keys, broadcast to observation shapes as in @normalize_dict
+        self.num_normalized = 0
+        offsets, inv_scales = [], []
+        for k in order:
+            if k not in stats:
+                break
+            offset = np.asarray(stats[k]["offset"], dtype=np.float32)
+            scale = np.asarray(stats[k]["scale"], dtype=np.float32)
+            if len(offset.shape) - len(shapes[k]) == 1:
+                offset, scale = offset[0], scale[0]
+            offsets.append(np.broadcast_to(offset, shapes[k]).ravel())
+            inv_scales.append(np.broadcast_to(1. / scale, shapes[k]).ravel())
+            self.num_normalized = self.slices[k][1]
+        if self.num_normalized > 0:
+            self.offset = np.concatenate(offsets)
+            self.inv_scale = np.concatenate(inv_scales)
+
+        self.tensors = OrderedDict((k, self.arena[a:b].view(1, *shape)) for k, (a, b, shape) in self.slices.items())
+        self._layout_key = layout_key
+
+    def write(self, ob):
+        """
+        Write observation dict @ob into the arena.
+
+        Returns:
+            ob (dict): float tensors with batch dimension on the policy device, only for used keys
+        """
+        layout_key = tuple((k, tuple(np.shape(ob[k]))) for k in ob if k in self.obs_keys)
+        if layout_key != self._layout_key:
+            self._build(layout_key)
+        for k, view in self.arena_views.items():
+            np.copyto(view, ob[k], casting="unsafe")
+        if self.num_normalized > 0:
+            normalized = self.arena_np[:self.num_normalized]
+            normalized -= self.offset
+            normalized *= self.inv_scale
+        if self.device.type == "cpu":
+            return self.tensors
+        # the copy is ordered before the forward pass on the same stream, and reading the action back
+        # synchronizes, so the pinned arena is not overwritten while the copy is in flight
+        arena = self.arena.to(self.device, non_blocking=True)
+        return OrderedDict((k, arena[a:b].view(1, *shape)) for k, (a, b, shape) in self.slices.items())
+
+
 def normalize_dict(dict, normalization_stats):
     """
     Normalize dict using the provided "offset" and "scale" entries 
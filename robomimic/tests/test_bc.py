@@ -7,9 +7,16 @@ to see stdout output).
 import argparse
 from collections import OrderedDict
 
+import numpy as np
+import torch
+
 import robomimic
-from robomimic.config import Config
+from robomimic.algo import RolloutPolicy, algo_factory
+from robomimic.config import Config, config_factory
+import robomimic.utils.obs_utils as ObsUtils
 import robomimic.utils.test_utils as TestUtils
+import robomimic.utils.torch_utils as TorchUtils
+from robomimic.utils.inference_utils import BatchedInferenceServer
 from robomimic.utils.log_utils import silence_stdout
 from robomimic.utils.torch_utils import dummy_context_mgr
 
@@ -266,6 +273,106 @@ def test_bc(silence=True):
         print("{}: {}".format(test_name, res_str))
 
 
+# observation shapes and action dimension of the untrained policies used by the batched inference test
+BATCHED_OBS_SHAPES = OrderedDict(robot0_eef_pos=[3], robot0_eef_quat=[4], robot0_gripper_qpos=[2], object=[10])
+BATCHED_AC_DIM = 7
+
+
+class SinglePolicyPool(object):
+    """
+    Policy pool with a single, already created policy, for testing the inference server without checkpoints.
+    """
+    def __init__(self, policy):
+        self.policy = policy
+
+    def resolve_device(self, ckpt_path, device=None):
+        return self.policy.policy.device
+
+    def acquire(self, ckpt_path, device=None, lang=None, verbose=False):
+        return self.policy
+
+    def release(self, policy):
+        pass
+
+
+def make_untrained_policy(rnn):
+    """
+    Build an untrained BC (or BC-RNN) rollout policy on cpu, with a short rnn horizon so that
+    hidden state resets happen during the test.
+    """
+    config = config_factory("bc")
+    with config.unlocked():
+        config.observation.modalities.obs.low_dim = list(BATCHED_OBS_SHAPES.keys())
+        config.observation.modalities.obs.rgb = []
+        config.algo.gaussian.enabled = False
+        config.algo.gmm.enabled = False
+        config.algo.vae.enabled = False
+        config.algo.rnn.enabled = rnn
+        config.algo.rnn.horizon = 4
+    ObsUtils.initialize_obs_utils_with_config(config)
+    device = TorchUtils.get_torch_device(try_to_use_cuda=False)
+    algo = algo_factory(
+        algo_name=config.algo_name,
+        config=config,
+        obs_key_shapes=BATCHED_OBS_SHAPES,
+        ac_dim=BATCHED_AC_DIM,
+        device=device,
+    )
+    return RolloutPolicy(algo)
+
+
+def random_observations(num_sessions, num_steps):
+    """
+    Random observation dicts, indexed by session and step.
+    """
+    return [
+        [{k: np.random.randn(*shape).astype(np.float32) for k, shape in BATCHED_OBS_SHAPES.items()} for _ in range(num_steps)]
+        for _ in range(num_sessions)
+    ]
+
+
+def test_bc_batched_inference(num_sessions=3, num_steps=10):
+    """
+    Actions served in batches by the inference server, and the per-row hidden states kept by
+    BC_RNN.get_batched_action, match running each session on its own with a RolloutPolicy.
+    """
+    np.random.seed(0)
+    torch.manual_seed(0)
+    for rnn in (False, True):
+        policy = make_untrained_policy(rnn=rnn)
+        obs = random_observations(num_sessions, num_steps)
+
+        # reference: one session after the other on the plain rollout policy
+        ref_actions = []
+        ref_hidden_states = []
+        for session_obs in obs:
+            policy.start_episode()
+            ref_actions.append([policy(ob=ob) for ob in session_obs])
+            ref_hidden_states.append(policy.policy._rnn_hidden_state if rnn else None)
+
+        # batched: all sessions step together, each request of a step joins the same batch
+        server = BatchedInferenceServer(SinglePolicyPool(policy), max_batch_size=num_sessions, max_wait=1.0)
+        sessions = [server.acquire("untrained", device="cpu") for _ in range(num_sessions)]
+        for t in range(num_steps):
+            futures = [session.submit(obs[i][t]) for i, session in enumerate(sessions)]
+            for i, future in enumerate(futures):
+                assert np.allclose(future.result(), ref_actions[i][t], atol=1e-5)
+        assert server.num_requests == num_sessions * num_steps
+        assert server.num_batches < server.num_requests
+
+        # rollout state of each session continues the hidden state of its own rollout
+        for session, ref_hidden_state in zip(sessions, ref_hidden_states):
+            if rnn:
+                hidden_state, counter, _ = session.rollout_state
+                assert counter == num_steps
+                for h, ref_h in zip(hidden_state, ref_hidden_state):
+                    assert torch.allclose(h, ref_h, atol=1e-5)
+            else:
+                assert session.rollout_state is None
+        for session in sessions:
+            server.release(session)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -276,3 +383,4 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     test_bc(silence=(not args.verbose))
+    test_bc_batched_inference()
@@ -11,6 +11,8 @@ import robosuite.utils.sim_utils as SU
 from robosuite.renderers.base import load_renderer_config
 from robosuite.utils import OpenCVRenderer, SimulationError, XMLError
 from robosuite.utils.binding_utils import MjRenderContextOffscreen, MjSim
+from robosuite.utils.model_cache import MODEL_CACHE
+from robosuite.utils.observables import LazyObservationCache, LazyObservations
 
 REGISTERED_ENVS = {}
 
@@ -118,14 +120,16 @@ class MujocoEnv(metaclass=EnvMeta):
         # Simulation-specific attributes
         self._observables = {}  # Maps observable names to observable objects
         self._obs_cache = {}  # Maps observable names to pre-/partially-computed observable values
+        self.lazy_observations = macros.LAZY_OBSERVATIONS  # Whether observables are only computed when read
         self.control_freq = control_freq
         self.lite_physics = lite_physics
         self.horizon = horizon
         self.ignore_done = ignore_done
         self.hard_reset = hard_reset
-        # Function to process model xml in _initialize_sim() call
-        # include edit_model_xml function by default
-        self._xml_processors = [self.edit_model_xml]
+        # Functions to process model xml in _initialize_sim() call. Tree processors edit the parsed model in place
+        # and share a single parse and serialization, include edit_model_tree function by default
+        self._xml_tree_processors = [self.edit_model_tree]
+        self._xml_processors = []
         self.model = None
         self.cur_time = None
         self.model_timestep = None
@@ -162,6 +166,8 @@ class MujocoEnv(metaclass=EnvMeta):
             self._observables = self.viewer._setup_observables()
         else:
             self._observables = self._setup_observables()
+        if self._lazy_observations_active():
+            self._invalidate_observations()
 
         # check if viewer has get observations method and set a flag for future use.
         self.viewer_get_obs = hasattr(self.viewer, "_get_observations")
@@ -220,9 +226,38 @@ class MujocoEnv(metaclass=EnvMeta):
         Args:
             processor (None or function): If set, processing method should take in a xml string and
                 return no arguments.
+        Note that these processors run on the serialized xml after all tree processors, prefer
+        set_xml_tree_processor() to avoid parsing the model again.
         """
         self._xml_processors.append(processor)
 
+    def set_xml_tree_processor(self, processor):
+        """
+        Sets a processor function that the parsed model will be passed to inside _initialize_sim() calls. Tree
+        processors run before string processors set with set_xml_processor(), on the same parsed tree.
+        Args:
+            processor (function): processing method should take in the root element of the parsed xml, edit it in
+                place and return no arguments.
+        """
+        self._xml_tree_processors.append(processor)
+
+    def _process_model_xml(self, xml):
+        """
+        Runs all xml processors on @xml. The xml is parsed and serialized once for all tree processors.
+        Args:
+            xml (str): model xml
+        Returns:
+            str: processed model xml
+        """
+        root = ET.fromstring(xml)
+        for processor in self._xml_tree_processors:
+            processor(root)
+        xml = ET.tostring(root, encoding="unicode")
+
+        for processor in self._xml_processors:
+            xml = processor(xml)
+        return xml
+
     def _load_model(self):
         """Loads an xml model, puts it in self.model"""
         pass
@@ -254,11 +289,13 @@ class MujocoEnv(metaclass=EnvMeta):
         xml = xml_string if xml_string else self.model.get_xml()
 
         # process the xml before initializing sim
-        for processor in self._xml_processors:
-            xml = processor(xml)
+        xml = self._process_model_xml(xml)
 
-        # Create the simulation instance
-        self.sim = MjSim.from_xml_string(xml)
+        # Create the simulation instance, reusing the compiled model if the same xml was loaded recently
+        if macros.CACHE_COMPILED_MODELS:
+            self.sim = MjSim(MODEL_CACHE.get_model(xml))
+        else:
+            self.sim = MjSim.from_xml_string(xml)
 
         # run a single step to make sure changes have propagated through sim state
         self.sim.forward()
@@ -289,7 +326,10 @@ class MujocoEnv(metaclass=EnvMeta):
         self._reset_internal()
         self.sim.forward()
         # Setup observables, reloading if
-        self._obs_cache = {}
+        if self._lazy_observations_active():
+            self._invalidate_observations()
+        else:
+            self._obs_cache = {}
         self._reset_observables()
 
         # Make sure that all sites are toggled OFF by default
@@ -350,7 +390,10 @@ class MujocoEnv(metaclass=EnvMeta):
         self.done = False
 
         # Empty observation cache and reset all observables
-        self._obs_cache = {}
+        if self._lazy_observations_active():
+            self._invalidate_observations()
+        else:
+            self._obs_cache = {}
         for observable in self._observables.values():
             observable.reset()
 
@@ -378,9 +421,43 @@ class MujocoEnv(metaclass=EnvMeta):
                 value. This is useful if, e.g., you want to grab observations when directly setting simulation states
                 without actually stepping the simulation.
         """
+        if self._lazy_observations_active():
+            # Observables are sampled when read, only drop the values computed so far
+            if force or not isinstance(self._obs_cache, LazyObservationCache):
+                self._invalidate_observations()
+            return
+        if isinstance(self._obs_cache, LazyObservationCache):
+            # Lazy observations were turned off, e.g. because an observable got a delay
+            self._obs_cache.expire()
+            self._obs_cache = {}
         for observable in self._observables.values():
             observable.update(timestep=self.model_timestep, obs_cache=self._obs_cache, force=force)
 
+    def _lazy_observations_active(self):
+        """
+        Whether observables are currently computed lazily. A lazily computed observable is always sampled from the
+        simulation state at read time, so lazy observations are only used if every enabled observable samples at the
+        control frequency without corrupter, filter or delayer. Otherwise all observables are updated every substep.
+        Returns:
+            bool: True if env.lazy_observations is set and all enabled observables support lazy sampling
+        """
+        if not self.lazy_observations:
+            return False
+        return all(
+            observable.supports_lazy_sampling(self.control_freq)
+            for observable in self._observables.values()
+            if observable.is_enabled()
+        )
+
+    def _invalidate_observations(self):
+        """
+        Discards all observable values computed for the previous simulation state, so that they are recomputed from
+        the current state when read next. Only used with lazy observations.
+        """
+        if isinstance(self._obs_cache, LazyObservationCache):
+            self._obs_cache.expire()
+        self._obs_cache = LazyObservationCache(self._observables)
+
     def _get_observations(self, force_update=False):
         """
         Grabs observations from the environment.
@@ -389,8 +466,12 @@ class MujocoEnv(metaclass=EnvMeta):
                 value. This is useful if, e.g., you want to grab observations when directly setting simulation states
                 without actually stepping the simulation.
         Returns:
-            OrderedDict: OrderedDict containing observations [(name_string, np.array), ...]
+            OrderedDict: OrderedDict containing observations [(name_string, np.array), ...]. With lazy observations,
+                a read-only mapping with the same keys, whose values are computed when first read
         """
+        if self._lazy_observations_active():
+            return self._get_lazy_observations(force_update=force_update)
+
         observations = OrderedDict()
         obs_by_modality = OrderedDict()
 
@@ -406,9 +487,9 @@ class MujocoEnv(metaclass=EnvMeta):
                 modality = observable.modality + "-state"
                 if modality not in obs_by_modality:
                     obs_by_modality[modality] = []
-                # Make sure all observations are numpy arrays so we can concatenate them
-                array_obs = [obs] if type(obs) in {int, float} or not obs.shape else obs
-                obs_by_modality[modality].append(np.array(array_obs))
+                # Make sure all observations are at least 1d numpy arrays so we can concatenate them,
+                # without copying them first as the concatenation below copies anyway
+                obs_by_modality[modality].append(np.atleast_1d(obs))
 
         # Add in modality observations
         for modality, obs in obs_by_modality.items():
@@ -419,6 +500,32 @@ class MujocoEnv(metaclass=EnvMeta):
 
         return observations
 
+    def _get_lazy_observations(self, force_update=False):
+        """
+        Grabs observations from the environment without computing them. Each observable is sampled from the current
+        simulation state when its value is first read, and at most once until the simulation steps again.
+        Args:
+            force_update (bool): If True, will discard values computed so far, e.g. after directly setting
+                simulation states without actually stepping the simulation.
+        Returns:
+            LazyObservations: read-only mapping with the keys of _get_observations()
+        """
+        self._update_observables(force=force_update)
+
+        names = []
+        keys_by_modality = OrderedDict()
+        for obs_name, observable in self._observables.items():
+            if observable.is_enabled() and observable.is_active():
+                names.append(obs_name)
+                modality = observable.modality + "-state"
+                if modality not in keys_by_modality:
+                    keys_by_modality[modality] = []
+                keys_by_modality[modality].append(obs_name)
+
+        return LazyObservations(
+            self._obs_cache, names, keys_by_modality, concatenate_images=macros.CONCATENATE_IMAGES
+        )
+
     def step(self, action):
         """
         Takes a step in simulation with control command @action.
@@ -443,6 +550,7 @@ class MujocoEnv(metaclass=EnvMeta):
         # 'policy_step' whether the current step we're taking is simply an internal update of the controller,
         # or an actual policy update
         policy_step = True
+        lazy_observations = self._lazy_observations_active()
 
         # Loop through the simulation at the model timestep rate until we're ready to take the next policy step
         # (as defined by the control frequency specified at the environment level)
@@ -456,9 +564,13 @@ class MujocoEnv(metaclass=EnvMeta):
                 self.sim.step2()
             else:
                 self.sim.step()
-            self._update_observables()
+            if not lazy_observations:
+                self._update_observables()
             policy_step = False
 
+        if lazy_observations:
+            self._invalidate_observations()
+
         # Note: this is done all at once to avoid floating point inaccuracies
         self.cur_time += self.control_timestep
 
@@ -584,13 +696,22 @@ class MujocoEnv(metaclass=EnvMeta):
         Returns:
             str: Edited xml file as string
         """
+        root = ET.fromstring(xml_str)
+        self.edit_model_tree(root)
+        return ET.tostring(root, encoding="utf8").decode("utf8")
 
+    def edit_model_tree(self, root):
+        """
+        Applies the edits of edit_model_xml() in place to an already parsed model, so that they can share a single
+        parse with other processing steps. Environment subclasses should extend this function rather than
+        edit_model_xml.
+        Args:
+            root (ET.Element): root element of the Mujoco sim demonstration XML
+        """
         path = os.path.split(robosuite.__file__)[0]
         path_split = path.split("/")
 
         # replace mesh and texture file paths
-        tree = ET.fromstring(xml_str)
-        root = tree
         asset = root.find("asset")
         meshes = asset.findall("mesh")
         textures = asset.findall("texture")
@@ -610,8 +731,6 @@ class MujocoEnv(metaclass=EnvMeta):
                 new_path = "/".join(new_path_split)
                 elem.set("file", new_path)
 
-        return ET.tostring(root, encoding="utf8").decode("utf8")
-
     def reset_from_xml_string(self, xml_string):
         """
         Reloads the environment from an XML description of the environment.
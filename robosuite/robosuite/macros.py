@@ -34,6 +34,25 @@ CONCATENATE_IMAGES = False
 
 MUJOCO_GPU_RENDERING = True
 
+# Lazy observations
+# By default, all enabled observables are updated after every simulation substep and sampled according to their
+# sampling rate and delay. If this flag is set to True, an observable is instead computed from the current simulation
+# state the first time it is read after a step, and kept until the simulation steps again, so unread observables cost
+# nothing. Only used while every enabled observable samples at the control frequency without corrupter, filter or
+# delayer, otherwise all observables are updated every substep as usual. Can also be toggled per env via
+# env.lazy_observations. Only pays off if callers read a subset of the keys, e.g. robomimic's EnvRobosuite wrapper
+# reads every key once per step and gains nothing from it
+LAZY_OBSERVATIONS = False
+
+# Compiled model cache
+# Hard resets that load a scene with the same processed xml as a recent reset reuse its compiled model, instead of
+# having MuJoCo compile the xml again (see robosuite/utils/model_cache.py). COMPILED_MODEL_CACHE_SIZE is the number of
+# models kept in memory (0 disables the in-memory cache). If COMPILED_MODEL_CACHE_DIR is set, compiled models are
+# also saved there as MJB files and shared between processes. Clear that directory after modifying assets in place
+CACHE_COMPILED_MODELS = True
+COMPILED_MODEL_CACHE_SIZE = 4
+COMPILED_MODEL_CACHE_DIR = None
+
 # Spacemouse settings. Used by SpaceMouse class in robosuite/devices/spacemouse.py
 SPACEMOUSE_VENDOR_ID = 9583
 SPACEMOUSE_PRODUCT_ID = 50734
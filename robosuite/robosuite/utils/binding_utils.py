@@ -1072,6 +1072,11 @@ class MjSim:
         # offscreen render context object
         self._render_context_offscreen = None
 
+        # incremented whenever mujoco recomputes the simulation data, so that derived quantities (e.g. the contact
+        # index in robosuite.utils.sim_utils) can be cached until the next step
+        self.data_version = 0
+        self._contact_index = None
+
     @classmethod
     def from_xml_string(cls, xml):
         model = mujoco.MjModel.from_xml_string(xml)
@@ -1087,22 +1092,27 @@ class MjSim:
     def reset(self):
         """Reset simulation."""
         mujoco.mj_resetData(self.model._model, self.data._data)
+        self.data_version += 1
 
     def forward(self):
         """Forward call to synchronize derived quantities."""
         mujoco.mj_forward(self.model._model, self.data._data)
+        self.data_version += 1
 
     def step(self, with_udd=True):
         """Step simulation."""
         mujoco.mj_step(self.model._model, self.data._data)
+        self.data_version += 1
 
     def step1(self):
         """Step1 (before actions are set)."""
         mujoco.mj_step1(self.model._model, self.data._data)
+        self.data_version += 1
 
     def step2(self):
         """Step2 (after actions are set)."""
         mujoco.mj_step2(self.model._model, self.data._data)
+        self.data_version += 1
 
     def render(
         self,
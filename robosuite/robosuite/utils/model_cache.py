@@ -0,0 +1,133 @@
+"""
+Content-addressed cache of compiled MuJoCo models. Environments that reload the same scene (e.g. hard resets with a
+fixed layout, style and object set) get a copy of the previously compiled model instead of having MuJoCo parse and
+compile the xml (and load all meshes and textures) again.
+"""
+
+import copy
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import mujoco
+import numpy as np
+
+import robosuite.macros as macros
+
+
+class CompiledModelCache:
+    """
+    Maps the sha1 of a fully processed model xml to its compiled mujoco.MjModel. Models are kept in memory in
+    least-recently-used order, and optionally saved as MJB files in @cache_dir, so that other processes and later runs
+    can load them without compiling.
+
+    Note that the key only covers the xml itself, not the contents of the mesh and texture files it references. Clear
+    the cache directory after modifying assets in place.
+
+    Args:
+        max_size (int): maximum number of models kept in memory. If 0, models are only cached on disk (if enabled)
+
+        cache_dir (None or str): directory for MJB files. If None, models are only cached in memory
+    """
+
+    def __init__(self, max_size=4, cache_dir=None):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def xml_key(xml):
+        """
+        Args:
+            xml (str): model xml
+
+        Returns:
+            str: content address of @xml
+        """
+        return hashlib.sha1(xml.encode("utf-8")).hexdigest()
+
+    def get_model(self, xml):
+        """
+        Returns a compiled model of @xml. The caller owns the returned model and may modify it, cached models are
+        never handed out directly.
+
+        Args:
+            xml (str): fully processed model xml
+
+        Returns:
+            mujoco.MjModel: compiled model
+        """
+        key = self.xml_key(xml)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(model)
+
+        model = self._load(key)
+        if model is None:
+            self.misses += 1
+            model = mujoco.MjModel.from_xml_string(xml)
+            self._save(key, model)
+
+        with self._lock:
+            if self.max_size > 0:
+                self._models[key] = model
+                while len(self._models) > self.max_size:
+                    self._models.popitem(last=False)
+        return copy.deepcopy(model) if self.max_size > 0 else model
+
+    def clear(self):
+        """
+        Drops all models kept in memory. MJB files in the cache directory are kept.
+        """
+        with self._lock:
+            self._models.clear()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".mjb")
+
+    def _load(self, key):
+        """
+        Loads the model of @key from the cache directory, or returns None if it is not there.
+        """
+        if self.cache_dir is None or not os.path.exists(self._path(key)):
+            return None
+        try:
+            model = mujoco.MjModel.from_binary_path(self._path(key))
+        except Exception:
+            # e.g. file written by a different mujoco version, it is overwritten after compiling
+            return None
+        self.hits += 1
+        return model
+
+    def _save(self, key, model):
+        """
+        Atomically writes @model as MJB file, so that concurrent workers never load a partial file.
+        """
+        if self.cache_dir is None:
+            return
+        buffer = np.empty(mujoco.mj_sizeModel(model), dtype=np.uint8)
+        mujoco.mj_saveModel(model, None, buffer)
+        tmp_path = "{}.{}.tmp".format(self._path(key), os.getpid())
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(buffer.tobytes())
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            # e.g. read-only cache directory, the model is still cached in memory
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+# process-wide cache used by MujocoEnv._initialize_sim
+MODEL_CACHE = CompiledModelCache(
+    max_size=macros.COMPILED_MODEL_CACHE_SIZE,
+    cache_dir=macros.COMPILED_MODEL_CACHE_DIR,
+)
@@ -1,3 +1,6 @@
+import threading
+from collections.abc import Mapping
+
 import numpy as np
 
 
@@ -230,11 +233,7 @@ class Observable:
             if (
                 not self._sampled and self._sampling_timestep - self._current_delay >= self._time_since_last_sample
             ) or force:
-                # Get newest raw value, corrupt it, filter it, and set it as our current observed value
-                obs = np.array(self._filter(self._corrupter(self._sensor(obs_cache))))
-                self._current_observed_value = obs[0] if len(obs.shape) == 1 and obs.shape[0] == 1 else obs
-                # Update cache entry as well
-                obs_cache[self.name] = np.array(self._current_observed_value)
+                self.sample(obs_cache)
                 # Toggle sampled and re-sample next time delay
                 self._sampled = True
                 self._current_delay = self._delayer()
@@ -248,16 +247,45 @@ class Observable:
                         f"Warning: sampling rate for observable {self.name} is either too low or delay is too high. "
                         f"Please adjust one (or both)"
                     )
-                    # Get newest raw value, corrupt it, filter it, and set it as our current observed value
-                    obs = np.array(self._filter(self._corrupter(self._sensor(obs_cache))))
-                    self._current_observed_value = obs[0] if len(obs.shape) == 1 and obs.shape[0] == 1 else obs
-                    # Update cache entry as well
-                    obs_cache[self.name] = np.array(self._current_observed_value)
+                    self.sample(obs_cache)
                     # Re-sample next time delay
                     self._current_delay = self._delayer()
                 self._time_since_last_sample %= self._sampling_timestep
                 self._sampled = False
 
+    def sample(self, obs_cache):
+        """
+        Grabs the newest raw value from the sensor, corrupts it, filters it, and sets it as the current observed value,
+        regardless of sampling rate and delay.
+
+        Args:
+            obs_cache (dict): Observation cache mapping observable names to pre-computed values to pass to sensor. This
+                will be updated in-place during this call.
+        """
+        obs = np.array(self._filter(self._corrupter(self._sensor(obs_cache))))
+        self._current_observed_value = obs[0] if len(obs.shape) == 1 and obs.shape[0] == 1 else obs
+        # Update cache entry as well
+        obs_cache[self.name] = np.array(self._current_observed_value)
+
+    def supports_lazy_sampling(self, control_freq):
+        """
+        Whether sampling this observable once per control step, from the simulation state at read time, gives the
+        same values as update() called every substep, i.e. whether it has no corrupter, filter or delayer and samples
+        at the control frequency. Corrupters and filters may be stateful or random, so they are never sampled lazily.
+
+        Args:
+            control_freq (float): Control frequency of the environment (Hz)
+
+        Returns:
+            bool: True if this observable can be sampled lazily
+        """
+        return (
+            self._corrupter is NO_CORRUPTION
+            and self._filter is NO_FILTER
+            and self._delayer is NO_DELAY
+            and np.isclose(self._sampling_timestep, 1.0 / control_freq)
+        )
+
     def reset(self):
         """
         Resets this observable's internal values (but does not reset its sensor, corrupter, delayer, or filter)
@@ -401,3 +429,134 @@ class Observable:
             str: Modality name for this observable
         """
         return self._sensor.__modality__
+
+
+class LazyObservationCache(dict):
+    """
+    Observation cache that samples enabled observables on demand: the first time an observable name is looked up,
+    the observable is sampled and its value stored, so each observable is computed at most once per cache. A new cache
+    should be created whenever the simulation state changes, after which this one should be expired.
+
+    Some sensors read their own name from the cache, expecting the sensor registered right before them to have written
+    it as a side effect (e.g. object-to-eef quaternions, camera depths). When that happens, the preceding observable is
+    sampled first.
+
+    Args:
+        observables (OrderedDict): Dictionary mapping observable names to Observable objects, in registration order
+    """
+
+    def __init__(self, observables):
+        super().__init__()
+        self._observables = observables
+        self._sampling = set()
+        self._lock = threading.RLock()  # observations may be read from several threads, e.g. concurrent checkers
+        self.expired = False
+
+    def __contains__(self, key):
+        if not dict.__contains__(self, key):
+            self._sample(key)
+        return dict.__contains__(self, key)
+
+    def __getitem__(self, key):
+        if not dict.__contains__(self, key):
+            self._sample(key)
+        return dict.__getitem__(self, key)
+
+    def __bool__(self):
+        # Sensors treat an empty cache as "nothing pre-computed", but every entry here can be computed on demand
+        return True
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def expire(self):
+        """
+        Marks this cache as out of date, so that values not sampled yet can no longer be computed
+        """
+        self.expired = True
+
+    def _sample(self, key):
+        """
+        Samples observable @key into this cache if it is enabled and not being sampled already
+
+        Args:
+            key (str): Name of the observable to sample
+
+        Raises:
+            RuntimeError: [Sampling after the simulation state changed]
+        """
+        with self._lock:
+            if not dict.__contains__(self, key):
+                self._sample_locked(key)
+
+    def _sample_locked(self, key):
+        """
+        Same as _sample(), but expects the lock to be held by the caller
+        """
+        observable = self._observables.get(key)
+        if observable is None or not observable.is_enabled():
+            return
+        if self.expired:
+            raise RuntimeError(
+                f"Observation {key} was read after the simulation stepped. Read lazy observations before "
+                f"the next step, or copy them with dict(obs)."
+            )
+        if key in self._sampling:
+            # The sensor reads its own entry, which the sensor registered right before it writes as a side effect
+            names = list(self._observables.keys())
+            index = names.index(key)
+            if index > 0 and names[index - 1] not in self._sampling and not dict.__contains__(self, names[index - 1]):
+                self._sample_locked(names[index - 1])
+            return
+        self._sampling.add(key)
+        try:
+            observable.sample(self)
+        finally:
+            self._sampling.discard(key)
+
+
+class LazyObservations(Mapping):
+    """
+    Read-only observation dictionary returned by environments with lazy observations. It has the same keys as an
+    eagerly computed observation dictionary, but each value is only computed from @obs_cache when it is first read,
+    and then kept, so observables nobody reads are never sampled.
+
+    Args:
+        obs_cache (LazyObservationCache): Cache of the current simulation state to sample observables from
+        names (list): Names of the enabled and active observables, in registration order
+        keys_by_modality (OrderedDict): Maps "<modality>-state" keys to the names in @names of that modality
+        concatenate_images (bool): Whether to provide the concatenated "image-state" key
+    """
+
+    def __init__(self, obs_cache, names, keys_by_modality, concatenate_images=False):
+        self._obs_cache = obs_cache
+        self._keys_by_modality = keys_by_modality
+        self._keys = list(names)
+        self._keys += [
+            modality for modality in keys_by_modality if concatenate_images or modality != "image-state"
+        ]
+        self._key_set = set(self._keys)
+        self._values = {}
+
+    def __getitem__(self, key):
+        if key in self._values:
+            return self._values[key]
+        if key not in self._key_set:
+            raise KeyError(key)
+        if key in self._keys_by_modality:
+            value = np.concatenate([np.atleast_1d(self[name]) for name in self._keys_by_modality[key]], axis=-1)
+        else:
+            value = self._obs_cache[key]
+            # Scalar observables are returned as numbers, like Observable.obs
+            value = value[()] if value.ndim == 0 else value
+        self._values[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._key_set
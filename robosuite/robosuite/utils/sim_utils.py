@@ -2,9 +2,146 @@
 Collection of useful simulation utilities
 """
 
+import threading
+
+import numpy as np
+
 from robosuite.models.base import MujocoModel
 
 
+class ContactIndex:
+    """
+    Index of the active contacts of a simulation, for fast contact queries between geom groups. The contacts are read
+    in a single vectorized pass over sim.data.contact, and query results are cached, until the simulation data changes
+    (step, forward or reset). Geom groups are converted to geom id masks once per simulation. Queries may be made
+    from several threads.
+
+    Args:
+        sim (MjSim): Simulation to index
+    """
+
+    def __init__(self, sim):
+        self.sim = sim
+        self._lock = threading.RLock()
+        self._group_masks = {}  # Maps geom group keys to boolean masks over geom ids
+        self._data_version = None
+        self._geom1 = None
+        self._geom2 = None
+        self._touching = None  # Unique ids of geoms in any contact
+        self._results = {}  # Maps query keys to cached results for the current contacts
+
+    @staticmethod
+    def _group_key(geoms):
+        """
+        Hashable key of a geom group.
+
+        Args:
+            geoms (str or list of str or MujocoModel or None): geom group
+
+        Returns:
+            str or tuple or MujocoModel or None: key for @geoms
+        """
+        if geoms is None or type(geoms) is str or isinstance(geoms, MujocoModel):
+            return geoms
+        return tuple(geoms)
+
+    def _group_mask(self, geoms, key):
+        """
+        Boolean mask over geom ids of the geoms in @geoms, geom names not in the simulation are ignored.
+
+        Args:
+            geoms (str or list of str or MujocoModel): geom group
+            key: hashable key of @geoms from _group_key
+
+        Returns:
+            np.array: (ngeom,) boolean mask
+        """
+        mask = self._group_masks.get(key)
+        if mask is None:
+            if type(geoms) is str:
+                geoms = [geoms]
+            elif isinstance(geoms, MujocoModel):
+                geoms = geoms.contact_geoms
+            mask = np.zeros(self.sim.model.ngeom, dtype=bool)
+            for name in geoms:
+                try:
+                    mask[self.sim.model.geom_name2id(name)] = True
+                except ValueError:
+                    pass
+            self._group_masks[key] = mask
+        return mask
+
+    def _update(self):
+        """
+        Reads the active contacts if the simulation data changed since the last query. Must be called with the lock held.
+        """
+        if self._data_version == self.sim.data_version:
+            return
+        ncon = self.sim.data.ncon
+        contact = self.sim.data.contact
+        self._geom1 = np.array(contact.geom1[:ncon], dtype=int)
+        self._geom2 = np.array(contact.geom2[:ncon], dtype=int)
+        self._touching = np.unique(np.concatenate([self._geom1, self._geom2]))
+        self._results = {}
+        self._data_version = self.sim.data_version
+
+    def check_contact(self, geoms_1, geoms_2=None):
+        """
+        Same as robosuite.utils.sim_utils.check_contact
+        """
+        key_1, key_2 = self._group_key(geoms_1), self._group_key(geoms_2)
+        query = ("check", key_1, key_2)
+        with self._lock:
+            self._update()
+            result = self._results.get(query)
+            if result is None:
+                mask_1 = self._group_mask(geoms_1, key_1)
+                if not mask_1[self._touching].any():
+                    result = False
+                elif geoms_2 is None:
+                    result = True
+                else:
+                    mask_2 = self._group_mask(geoms_2, key_2)
+                    result = bool(
+                        (
+                            (mask_1[self._geom1] & mask_2[self._geom2]) | (mask_2[self._geom1] & mask_1[self._geom2])
+                        ).any()
+                    )
+                self._results[query] = result
+        return result
+
+    def get_contacts(self, model):
+        """
+        Same as robosuite.utils.sim_utils.get_contacts
+        """
+        query = ("contacts", model)
+        with self._lock:
+            self._update()
+            result = self._results.get(query)
+            if result is None:
+                mask = self._group_mask(model, model)
+                in_1, in_2 = mask[self._geom1], mask[self._geom2]
+                other_ids = np.unique(np.concatenate([self._geom2[in_1 & ~in_2], self._geom1[in_2 & ~in_1]]))
+                result = {self.sim.model.geom_id2name(geom_id) for geom_id in other_ids}
+                self._results[query] = result
+        return set(result)
+
+
+def get_contact_index(sim):
+    """
+    Returns the contact index of @sim, creating it on first use.
+
+    Args:
+        sim (MjSim): Current simulation object
+
+    Returns:
+        ContactIndex: contact index of @sim
+    """
+    if sim._contact_index is None:
+        sim._contact_index = ContactIndex(sim)
+    return sim._contact_index
+
+
 def check_contact(sim, geoms_1, geoms_2=None):
     """
     Finds contact between two geom groups.
@@ -18,26 +155,7 @@ def check_contact(sim, geoms_1, geoms_2=None):
     Returns:
         bool: True if any geom in @geoms_1 is in contact with any geom in @geoms_2.
     """
-    # Check if either geoms_1 or geoms_2 is a string, convert to list if so
-    if type(geoms_1) is str:
-        geoms_1 = [geoms_1]
-    elif isinstance(geoms_1, MujocoModel):
-        geoms_1 = geoms_1.contact_geoms
-    if type(geoms_2) is str:
-        geoms_2 = [geoms_2]
-    elif isinstance(geoms_2, MujocoModel):
-        geoms_2 = geoms_2.contact_geoms
-    for i in range(sim.data.ncon):
-        contact = sim.data.contact[i]
-        # check contact geom in geoms
-        c1_in_g1 = sim.model.geom_id2name(contact.geom1) in geoms_1
-        c2_in_g2 = sim.model.geom_id2name(contact.geom2) in geoms_2 if geoms_2 is not None else True
-        # check contact geom in geoms (flipped)
-        c2_in_g1 = sim.model.geom_id2name(contact.geom2) in geoms_1
-        c1_in_g2 = sim.model.geom_id2name(contact.geom1) in geoms_2 if geoms_2 is not None else True
-        if (c1_in_g1 and c2_in_g2) or (c1_in_g2 and c2_in_g1):
-            return True
-    return False
+    return get_contact_index(sim).check_contact(geoms_1, geoms_2)
 
 
 def get_contacts(sim, model):
@@ -56,12 +174,4 @@ def get_contacts(sim, model):
     assert isinstance(model, MujocoModel), "Inputted model must be of type MujocoModel; got type {} instead!".format(
         type(model)
     )
-    contact_set = set()
-    for contact in sim.data.contact[: sim.data.ncon]:
-        # check contact geom in geoms; add to contact set if match is found
-        g1, g2 = sim.model.geom_id2name(contact.geom1), sim.model.geom_id2name(contact.geom2)
-        if g1 in model.contact_geoms and g2 not in model.contact_geoms:
-            contact_set.add(g2)
-        elif g2 in model.contact_geoms and g1 not in model.contact_geoms:
-            contact_set.add(g1)
-    return contact_set
+    return get_contact_index(sim).get_contacts(model)
@@ -71,7 +71,7 @@ class VisualizationWrapper(Wrapper):
         self._vis_settings = {vis: True for vis in self.env._visualizations}
 
         # Add the post-processor to make sure indicator objects get added to model before it's actually loaded in sim
-        self.env.set_xml_processor(processor=self._add_indicators_to_model)
+        self.env.set_xml_tree_processor(processor=self._add_indicators_to_model)
 
         # Conduct a (hard) reset to make sure visualization changes propagate
         reset_mode = self.env.hard_reset
@@ -164,15 +164,14 @@ class VisualizationWrapper(Wrapper):
 
         return ret
 
-    def _add_indicators_to_model(self, xml):
+    def _add_indicators_to_model(self, root):
         """
         Adds indicators to the mujoco simulation model
 
         Args:
-            xml (string): MJCF model in xml format, for the current simulation to be loaded
+            root (ET.Element): root of the parsed MJCF model, for the current simulation to be loaded
         """
         if self.indicator_configs is not None:
-            root = ET.fromstring(xml)
             worldbody = root.find("worldbody")
 
             for indicator_config in self.indicator_configs:
@@ -180,7 +179,3 @@ class VisualizationWrapper(Wrapper):
                 indicator_body = new_body(name=config["name"] + "_body", pos=config.pop("pos", (0, 0, 0)))
                 indicator_body.append(new_site(**config))
                 worldbody.append(indicator_body)
-
-            xml = ET.tostring(root, encoding="utf8").decode("utf8")
-
-        return xml
@@ -0,0 +1,146 @@
+"""
+Test script for the contact index behind check_contact and get_contacts. Random actions are applied to the Lift
+environment, and at every step the indexed queries are compared against a plain loop over the active contacts (the
+implementation the index replaced). Also checks that cached results are dropped when the simulation data changes.
+"""
+import random
+
+import numpy as np
+
+import robosuite
+from robosuite.controllers import load_controller_config
+from robosuite.models.base import MujocoModel
+from robosuite.utils.sim_utils import check_contact, get_contact_index, get_contacts
+
+
+def _loop_check_contact(sim, geoms_1, geoms_2=None):
+    if type(geoms_1) is str:
+        geoms_1 = [geoms_1]
+    elif isinstance(geoms_1, MujocoModel):
+        geoms_1 = geoms_1.contact_geoms
+    if type(geoms_2) is str:
+        geoms_2 = [geoms_2]
+    elif isinstance(geoms_2, MujocoModel):
+        geoms_2 = geoms_2.contact_geoms
+    for i in range(sim.data.ncon):
+        contact = sim.data.contact[i]
+        c1_in_g1 = sim.model.geom_id2name(contact.geom1) in geoms_1
+        c2_in_g2 = sim.model.geom_id2name(contact.geom2) in geoms_2 if geoms_2 is not None else True
+        c2_in_g1 = sim.model.geom_id2name(contact.geom2) in geoms_1
+        c1_in_g2 = sim.model.geom_id2name(contact.geom1) in geoms_2 if geoms_2 is not None else True
+        if (c1_in_g1 and c2_in_g2) or (c1_in_g2 and c2_in_g1):
+            return True
+    return False
+
+
+def _loop_get_contacts(sim, model):
+    contact_set = set()
+    for contact in sim.data.contact[: sim.data.ncon]:
+        g1, g2 = sim.model.geom_id2name(contact.geom1), sim.model.geom_id2name(contact.geom2)
+        if g1 in model.contact_geoms and g2 not in model.contact_geoms:
+            contact_set.add(g2)
+        elif g2 in model.contact_geoms and g1 not in model.contact_geoms:
+            contact_set.add(g1)
+    return contact_set
+
+
+def _make_env():
+    return robosuite.make(
+        "Lift",
+        robots=["Panda"],
+        controller_configs=load_controller_config(default_controller="OSC_POSE"),
+        has_renderer=False,
+        has_offscreen_renderer=False,
+        ignore_done=True,
+        use_camera_obs=False,
+        control_freq=20,
+    )
+
+
+def test_contact_index_matches_loop():
+    # set seeds
+    random.seed(0)
+    np.random.seed(0)
+
+    env = _make_env()
+    env.reset()
+    sim = env.sim
+    gripper = env.robots[0].gripper
+    robot_model = env.robots[0].robot_model
+    cube_geom = env.cube.contact_geoms[0]
+    finger_geoms = gripper.important_geoms["left_fingerpad"] + gripper.important_geoms["right_fingerpad"]
+
+    queries = [
+        (env.cube, None),
+        (gripper, None),
+        (cube_geom, None),
+        (env.cube, gripper),
+        (gripper, env.cube),
+        (finger_geoms, cube_geom),
+        (cube_geom, "table_collision"),
+        (env.cube, ["table_collision", "unknown_geom"]),
+        ("unknown_geom", None),
+        (["unknown_geom"], env.cube),
+        (robot_model, env.cube),
+    ]
+
+    low, high = env.action_spec
+    for _ in range(100):
+        env.step(np.random.uniform(low, high))
+        for geoms_1, geoms_2 in queries:
+            expected = _loop_check_contact(sim, geoms_1, geoms_2)
+            # ask twice, the second answer comes from the cached results of this step
+            assert check_contact(sim, geoms_1, geoms_2) == expected
+            assert check_contact(sim, geoms_1, geoms_2) == expected
+        for model in (env.cube, gripper, robot_model):
+            assert get_contacts(sim, model) == _loop_get_contacts(sim, model)
+
+    env.close()
+
+
+def test_contact_index_invalidation():
+    # set seeds
+    random.seed(0)
+    np.random.seed(0)
+
+    env = _make_env()
+    env.reset()
+    sim = env.sim
+    index = get_contact_index(sim)
+
+    # the cube rests on the table after reset
+    assert check_contact(sim, env.cube, "table_collision")
+    assert get_contacts(sim, env.cube) == _loop_get_contacts(sim, env.cube)
+    version = sim.data_version
+
+    # lift the cube far above the table, contacts are only recomputed by forward
+    qpos = np.array(sim.data.get_joint_qpos(env.cube.joints[0]))
+    qpos[2] += 0.5
+    sim.data.set_joint_qpos(env.cube.joints[0], qpos)
+    assert sim.data_version == version
+    assert check_contact(sim, env.cube, "table_collision")
+
+    sim.forward()
+    assert sim.data_version > version
+    assert not check_contact(sim, env.cube, "table_collision")
+    assert not check_contact(sim, env.cube)
+    assert get_contacts(sim, env.cube) == set()
+    assert index._data_version == sim.data_version
+    assert get_contact_index(sim) is index
+
+    # stepping lets the cube fall, and reset puts it back on the table
+    version = sim.data_version
+    env.step(np.zeros(env.action_dim))
+    assert sim.data_version > version
+    env.reset()
+    sim = env.sim
+    assert check_contact(sim, env.cube, "table_collision")
+    assert check_contact(sim, env.cube, "table_collision") == _loop_check_contact(sim, env.cube, "table_collision")
+
+    env.close()
+
+
+if __name__ == "__main__":
+    test_contact_index_matches_loop()
+    test_contact_index_invalidation()
+    print("Contact index tests completed.")
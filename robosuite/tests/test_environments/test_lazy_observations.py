@@ -0,0 +1,108 @@
+"""
+Test script for lazy observations. Two Lift environments with the same seed are stepped with the same random actions,
+one computing observations eagerly and one lazily, and their observations are compared at every step. Also checks
+that lazy values can not be read after the simulation stepped, and that environments fall back to eager updates when
+an observable is delayed.
+"""
+import random
+
+import numpy as np
+import pytest
+
+import robosuite
+from robosuite.controllers import load_controller_config
+from robosuite.utils.observables import LazyObservations, create_gaussian_noise_corrupter
+
+
+def _make_env(lazy):
+    random.seed(0)
+    np.random.seed(0)
+    env = robosuite.make(
+        "Lift",
+        robots=["Panda"],
+        controller_configs=load_controller_config(default_controller="OSC_POSE"),
+        has_renderer=False,
+        has_offscreen_renderer=False,
+        ignore_done=True,
+        use_camera_obs=False,
+        control_freq=20,
+    )
+    env.lazy_observations = lazy
+    return env
+
+
+def _assert_obs_equal(lazy_obs, eager_obs):
+    assert list(lazy_obs.keys()) == list(eager_obs.keys())
+    for key in eager_obs:
+        assert np.allclose(lazy_obs[key], eager_obs[key]), key
+
+
+def test_lazy_matches_eager():
+    eager_env = _make_env(lazy=False)
+    lazy_env = _make_env(lazy=True)
+    np.random.seed(1)
+    eager_obs = eager_env.reset()
+    np.random.seed(1)
+    lazy_obs = lazy_env.reset()
+    assert isinstance(lazy_obs, LazyObservations)
+    _assert_obs_equal(lazy_obs, eager_obs)
+
+    low, high = eager_env.action_spec
+    for _ in range(50):
+        action = np.random.uniform(low, high)
+        eager_obs, _, _, _ = eager_env.step(action)
+        lazy_obs, _, _, _ = lazy_env.step(action)
+        _assert_obs_equal(lazy_obs, eager_obs)
+        _assert_obs_equal(lazy_env._get_observations(), eager_env._get_observations())
+
+    eager_env.close()
+    lazy_env.close()
+
+
+def test_expired_lazy_observations():
+    env = _make_env(lazy=True)
+    env.reset()
+    action = np.zeros(env.action_dim)
+
+    obs, _, _, _ = env.step(action)
+    eef_pos = np.array(obs["robot0_eef_pos"])
+    env.step(action)
+
+    # values read before the step are kept, values not read yet are not computed from the new state
+    assert np.allclose(obs["robot0_eef_pos"], eef_pos)
+    with pytest.raises(RuntimeError):
+        obs["cube_pos"]
+
+    # copied observations stay readable
+    obs, _, _, _ = env.step(action)
+    copied = dict(obs)
+    env.step(action)
+    assert copied["cube_pos"].shape == (3,)
+
+    env.close()
+
+
+def test_lazy_fallback_for_delayed_observables():
+    env = _make_env(lazy=True)
+    env.reset()
+    assert env._lazy_observations_active()
+
+    # delayed or corrupted observables need every substep, all observables are updated eagerly again
+    env.modify_observable("cube_pos", "delayer", lambda: 0.01)
+    assert not env._lazy_observations_active()
+    obs, _, _, _ = env.step(np.zeros(env.action_dim))
+    assert not isinstance(obs, LazyObservations)
+
+    env.modify_observable("cube_pos", "delayer", None)
+    assert env._lazy_observations_active()
+    env.modify_observable("cube_pos", "corrupter", create_gaussian_noise_corrupter(mean=0.0, std=0.01))
+    assert not env._lazy_observations_active()
+
+    env.close()
+
+
+if __name__ == "__main__":
+    test_lazy_matches_eager()
+    test_expired_lazy_observations()
+    test_lazy_fallback_for_delayed_observables()
+    print("Lazy observation tests completed.")
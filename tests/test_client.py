@@ -0,0 +1,98 @@
+"""
+Test script for the pooled transport, early stopping and response caching of the clients. A local stub server plays
+an Ollama style endpoint that fails with 503 a few times and then streams a fixed answer token by token.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from agents.cache import ResponseCache
+from agents.client import TRUE_FALSE_PATTERN, OllamaClient
+from agents.transport import Transport
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    failures = 0  # number of requests still answered with 503
+    tokens = []  # streamed answer
+    requests = 0  # number of answered requests
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if StubHandler.failures > 0:
+            StubHandler.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+        StubHandler.requests += 1
+        self.send_response(200)
+        self.end_headers()
+        for token in StubHandler.tokens:
+            self.wfile.write((json.dumps({"response": token}) + "\n").encode("utf-8"))
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubHandler.failures = 0
+    StubHandler.tokens = []
+    StubHandler.requests = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/api/generate"
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(url, tmp_path):
+    transport = Transport(base_delay=0.01, max_delay=0.05)
+    cache = ResponseCache(str(tmp_path / "cache"))
+    return OllamaClient(model="stub", url=url, cache=cache, transport=transport)
+
+
+def test_true_false_pattern():
+    # judgement in the answer slot or on its own line
+    assert TRUE_FALSE_PATTERN.search("A: True.").group(1) == "True"
+    assert TRUE_FALSE_PATTERN.search("A: **false**").group(1) == "false"
+    assert TRUE_FALSE_PATTERN.search("True\n").group(1) == "True"
+    assert TRUE_FALSE_PATTERN.search("A: False the door is closed").group(1) == "False"
+
+    # echoed template or undecided partial answers
+    assert TRUE_FALSE_PATTERN.search("A: <True or False>") is None
+    assert TRUE_FALSE_PATTERN.search("A: True or") is None
+    assert TRUE_FALSE_PATTERN.search("A: True o") is None
+    assert TRUE_FALSE_PATTERN.search("A: True") is None
+
+    # true / false outside of the answer slot
+    assert TRUE_FALSE_PATTERN.search("Q: Condition: the statement is true.\nA:") is None
+    assert TRUE_FALSE_PATTERN.search("A: <True or False>\nA: False.").group(1) == "False"
+
+
+def test_retry_and_early_stop(stub_url, tmp_path):
+    StubHandler.failures = 2
+    StubHandler.tokens = ["A: ", "<True", " or", " False>", "\n", "A: ", "False", ".", " The", " door", " is", " closed."]
+    client = make_client(stub_url, tmp_path)
+
+    response = client.get_response("Q: Condition: the door is open", early_stop=TRUE_FALSE_PATTERN)
+    assert response == "A: <True or False>\nA: False."
+    assert StubHandler.failures == 0
+    assert StubHandler.requests == 1
+
+
+def test_early_stopped_responses_are_cached_separately(stub_url, tmp_path):
+    StubHandler.tokens = ["A: ", "True", ".", " The", " door", " is", " open."]
+    client = make_client(stub_url, tmp_path)
+    message = "Q: Condition: the door is open"
+
+    assert client.get_response(message, early_stop=TRUE_FALSE_PATTERN) == "A: True."
+    assert client.get_response(message, early_stop=TRUE_FALSE_PATTERN) == "A: True."
+    assert StubHandler.requests == 1
+
+    # a full request never gets the truncated response
+    assert client.get_response(message) == "A: True. The door is open."
+    assert StubHandler.requests == 2
+    assert client.get_response(message) == "A: True. The door is open."
+    assert StubHandler.requests == 2
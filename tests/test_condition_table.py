@@ -0,0 +1,63 @@
+"""
+Test script for the condition table. Few-shot seeds are only kept in memory and win over stored entries, LLM answers
+recorded by several tables sharing one file are merged on save.
+"""
+import json
+
+from agents.condition_table import ConditionTable
+
+EXAMPLES = """
+Q: Task name: place to sink.
+A: there is a sink in the image; gripper is not holding anything.
+
+Q: Task name: pick up fish.
+A: gripper is holding the fish.
+""".strip()
+
+
+def read_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_seeds_are_not_persisted(tmp_path):
+    path = str(tmp_path / "condition_table.json")
+    table = ConditionTable(path)
+    table.seed("post", EXAMPLES)
+    assert table.lookup("post", "place to sink") == "there is a sink in the image; gripper is not holding anything."
+
+    table.record("post", "pick up bowl", "gripper is holding the bowl.")
+    assert read_file(path)["post"] == {"pick up|bowl|": "gripper is holding the bowl."}
+
+    # answers for seeded tasks are not recorded, the seed is used instead of asking the LLM
+    table.record("post", "pick up fish", "gripper is holding a fish.")
+    assert table.lookup("post", "pick up fish") == "gripper is holding the fish."
+    assert "pick up|fish|" not in read_file(path)["post"]
+
+
+def test_seeds_override_stored_entries(tmp_path):
+    path = str(tmp_path / "condition_table.json")
+    with open(path, "w", encoding="utf-8") as f:
+        # entry written from an older version of the examples
+        json.dump({"pre": {}, "post": {"place to|sink|": "there is a cabinet in the image; gripper is not holding anything."}}, f)
+
+    table = ConditionTable(path)
+    table.seed("post", EXAMPLES)
+    assert table.lookup("post", "place to sink") == "there is a sink in the image; gripper is not holding anything."
+
+
+def test_recorded_entries_are_merged(tmp_path):
+    path = str(tmp_path / "condition_table.json")
+    table_a = ConditionTable(path)
+    table_b = ConditionTable(path)
+    table_a.seed("post", EXAMPLES)
+    table_b.seed("post", EXAMPLES)
+
+    table_a.record("post", "pick up bowl", "gripper is holding the bowl.")
+    table_b.record("post", "pick up pan", "gripper is holding the pan.")
+    assert read_file(path)["post"] == {
+        "pick up|bowl|": "gripper is holding the bowl.",
+        "pick up|pan|": "gripper is holding the pan.",
+    }
+    assert table_b.lookup("post", "pick up bowl") == "gripper is holding the bowl."
+    assert ConditionTable(path).lookup("post", "place to sink") is None
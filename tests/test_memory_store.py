@@ -0,0 +1,81 @@
+"""
+Test script for the interaction memory store. Records of two episodes of the same task are written interleaved, as by
+two rollout workers, and each episode rewrites its own record after reflection.
+"""
+import json
+import sqlite3
+
+from agents.memory_store import MemoryStore
+
+
+def make_record(episode, result, reflection=None):
+    return dict(episode=episode, task="PnPCounterToSink", env_info="counter, sink", result=result, reflection=reflection)
+
+
+def test_replace_keeps_other_episodes(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    store.append("PnPCounterToSink", make_record("a", "failure"))
+    store.append("PnPCounterToSink", make_record("b", "success"))
+
+    # episode a reflects after episode b was appended
+    store.replace("PnPCounterToSink", make_record("a", "failure", reflection="move closer to the sink"))
+    records = store.query("PnPCounterToSink")
+    assert [(record["episode"], record["reflection"]) for record in records] == [
+        ("a", "move closer to the sink"),
+        ("b", None),
+    ]
+
+    store.replace("PnPCounterToSink", make_record("b", "success", reflection="plan worked"))
+    store.append("PnPCounterToSink", make_record("c", "success"))
+    records = store.query("PnPCounterToSink")
+    assert [(record["episode"], record["reflection"]) for record in records] == [
+        ("a", "move closer to the sink"),
+        ("b", "plan worked"),
+        ("c", None),
+    ]
+    assert store.count("PnPCounterToSink", result="success") == 2
+
+
+def test_replace_appends_new_episode(tmp_path):
+    store = MemoryStore(str(tmp_path / "memory.db"))
+    store.append("PnPCounterToSink", make_record("a", "failure"))
+    store.replace("PnPCounterToSink", make_record("b", "success"))
+    store.replace("PnPCounterToSink", make_record("b", "success", reflection="plan worked"))
+    records = store.query("PnPCounterToSink")
+    assert [(record["episode"], record["reflection"]) for record in records] == [("a", None), ("b", "plan worked")]
+
+    # records of other tasks are never replaced
+    store.replace("PnPSinkToCounter", make_record("a", "success"))
+    assert store.count("PnPCounterToSink") == 2
+    assert store.count("PnPSinkToCounter") == 1
+
+
+def test_episode_column_added_to_existing_store(tmp_path):
+    db_path = str(tmp_path / "memory.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE interactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            task TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            result TEXT,
+            env_fingerprint TEXT,
+            created REAL NOT NULL,
+            data TEXT NOT NULL
+        )
+    """)
+    conn.execute(
+        "INSERT INTO interactions (task, kind, result, env_fingerprint, created, data) VALUES (?, ?, ?, ?, ?, ?)",
+        ("PnPCounterToSink", "oneagent", "failure", "", 0.0, json.dumps(make_record("a", "failure"))),
+    )
+    conn.commit()
+    conn.close()
+
+    store = MemoryStore(db_path)
+    store.append("PnPCounterToSink", make_record("b", "success"))
+    store.replace("PnPCounterToSink", make_record("a", "failure", reflection="move closer to the sink"))
+    records = store.query("PnPCounterToSink")
+    assert [(record["episode"], record["reflection"]) for record in records] == [
+        ("a", "move closer to the sink"),
+        ("b", None),
+    ]
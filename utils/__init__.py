@@ -1,4 +1,4 @@
-from .file_utils import append_to_json, write_to_json, extract_path_list
+from .file_utils import read_json, append_to_json, write_to_json, extract_path_list
 from .env_utils import unwrap_env
 from .plan_utils import merge_plans_with_last, merge_plans_without_last
-from .re_utils import extract_content
\ No newline at end of file
+from .re_utils import extract_content, extract_judgements
\ No newline at end of file
@@ -2,60 +2,96 @@ import os
 import json
 import glob
 import re
+import fcntl
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(file_path, shared=False):
+    """
+    inter-process lock on <file_path>.lock, used when several rollout workers read and write the same file
+    writers take the exclusive lock, readers the shared one so that they never see a file being rewritten
+    """
+    with open(file_path + ".lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_json(file_path):
+    """
+    read json file under the shared lock, return None if it does not exist
+    """
+    if not os.path.exists(file_path):
+        return None
+    with file_lock(file_path, shared=True):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
 
 
 def append_to_json(file_path, new_data):
     """
     try to append new data to json file
     """
-    # check if file exists or empty
-    if not os.path.exists(file_path) or os.stat(file_path).st_size == 0:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump([new_data], f, indent=4)
-        return
+    with file_lock(file_path):
+        # check if file exists or empty
+        if not os.path.exists(file_path) or os.stat(file_path).st_size == 0:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump([new_data], f, indent=4)
+            return
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        try:
-            data = json.load(f)
-            if not isinstance(data, list):  # ensure ist
-                data = [data]
-        except json.JSONDecodeError: # handle empty json file
-            data = []
+        with open(file_path, 'r', encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+                if not isinstance(data, list):  # ensure ist
+                    data = [data]
+            except json.JSONDecodeError: # handle empty json file
+                data = []
 
-    # append new data
-    data.append(new_data)
+        # append new data
+        data.append(new_data)
 
-    # write back to file
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+        # write back to file
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
 
 
-def write_to_json(file_path, new_data):
+def write_to_json(file_path, new_data, key="episode"):
     """
-    write new data to original json file
+    write new data to original json file, replacing the record with the same new_data[key] (e.g. the same episode),
+    other workers may have appended their records in the meantime. records without key replace the last one
     """
-    # check if file exists or empty
-    if not os.path.exists(file_path) or os.stat(file_path).st_size == 0:
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump([new_data], f, indent=4)
-        return
+    with file_lock(file_path):
+        # check if file exists or empty
+        if not os.path.exists(file_path) or os.stat(file_path).st_size == 0:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump([new_data], f, indent=4)
+            return
     
-    with open(file_path, 'r', encoding='utf-8') as f:
-        try:
-            data = json.load(f)
-            if not isinstance(data, list):  # ensure ist
-                data = [data]
-        except json.JSONDecodeError: # handle empty json file
-            data = []
+        with open(file_path, 'r', encoding='utf-8') as f:
+            try:
+                data = json.load(f)
+                if not isinstance(data, list):  # ensure ist
+                    data = [data]
+            except json.JSONDecodeError: # handle empty json file
+                data = []
     
-    if data:
-        data[-1] = new_data
-    else:
-        data.append(new_data)
+        if key in new_data:
+            indices = [i for i, record in enumerate(data) if isinstance(record, dict) and record.get(key) == new_data[key]]
+            if indices:
+                data[indices[-1]] = new_data
+            else:
+                data.append(new_data)
+        elif data:
+            data[-1] = new_data
+        else:
+            data.append(new_data)
     
-    # write back to file
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+        # write back to file
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4, ensure_ascii=False)
 
 
 def extract_path_list(folder_path, name='*_frame0.jpg'):
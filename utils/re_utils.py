@@ -39,6 +39,26 @@ def extract_content(content, filter=None):
     return content.strip()
 
 
+
+def extract_judgements(content, num):
+    """
+    extract a list of True / False judgements like 'A: [True, False]' from batched checking answer
+    return None if the answer cannot be parsed or the number of judgements does not match
+    """
+    content = extract_content(content, filter='A:')
+    matches = re.findall(r'\[(.*?)\]', content, re.DOTALL)
+    if len(matches) == 0:
+        return None
+    judgements = []
+    for item in matches[-1].split(','):
+        item = item.strip().strip('\'"').lower()
+        if item not in ('true', 'false'):
+            return None
+        judgements.append('True' if item == 'true' else 'False')
+    if len(judgements) != num:
+        return None
+    return judgements
+
 if __name__ == '__main__':
     content1 = """
 ```python
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager
+
+# top-level phases of an episode, spans of other categories (e.g. client requests) are nested inside them
+PHASES = [
+    "llm_planning",
+    "vlm_check",
+    "ground_truth_check",
+    "policy_inference",
+    "planner_control",
+    "physics",
+    "render",
+    "jpeg_encode",
+]
+
+
+class Tracer:
+    """
+    collect timed spans of an episode, and export them as chrome trace (chrome://tracing, perfetto) or jsonl
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.events = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+
+    def reset(self):
+        """
+        drop recorded spans, called at the beginning of each episode
+        """
+        with self._lock:
+            self.events = []
+            self._start = time.perf_counter()
+
+
+    @contextmanager
+    def span(self, name, category, **args):
+        """
+        time the enclosed block, the yielded dict can be filled with extra info such as token counts
+        """
+        if not self.enabled:
+            yield args
+            return
+        begin = time.perf_counter()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (begin - self._start) * 1e6, # microseconds
+                "dur": (end - begin) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+            with self._lock:
+                self.events.append(event)
+
+
+    def summary(self):
+        """
+        wall-clock seconds, span count and attached counters (tokens, bytes) per category
+        a span nested in a span of the same category and thread is not counted again, and spans of
+        the category running at the same time in several threads only count once (union of their intervals),
+        busy is the summed duration of the counted spans, above time if they overlap
+        """
+        with self._lock:
+            events = sorted(self.events, key=lambda event: (event["ts"], -event["dur"]))
+        summary = {phase: {"time": 0.0, "count": 0, "busy": 0.0} for phase in PHASES}
+        outermost = {} # (category, thread) -> end of the current outermost span
+        intervals = {} # category -> [begin, end] of its outermost spans in begin order
+        for event in events:
+            category = event["cat"]
+            phase = summary.setdefault(category, {"time": 0.0, "count": 0, "busy": 0.0})
+            for key, value in event["args"].items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    phase[key] = phase.get(key, 0) + value
+            begin, end = event["ts"], event["ts"] + event["dur"]
+            thread = (category, event["pid"], event["tid"])
+            if thread in outermost and begin < outermost[thread]:
+                continue # nested in a span of the same category
+            outermost[thread] = end
+            phase["count"] += 1
+            phase["busy"] += event["dur"] / 1e6
+            intervals.setdefault(category, []).append([begin, end])
+        for category, spans in intervals.items():
+            # merge overlapping spans of all threads
+            time_union, current = 0.0, None
+            for begin, end in spans:
+                if current is not None and begin <= current[1]:
+                    current[1] = max(current[1], end)
+                    continue
+                if current is not None:
+                    time_union += current[1] - current[0]
+                current = [begin, end]
+            time_union += current[1] - current[0]
+            summary[category]["time"] = time_union / 1e6
+        return summary
+
+
+    def save(self, file_path):
+        """
+        save spans as chrome trace if file_path ends with .json, otherwise as one json object per line
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+        with self._lock:
+            events = list(self.events)
+        with open(file_path, "w", encoding="utf-8") as f:
+            if file_path.endswith(".json"):
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+            else:
+                for event in events:
+                    f.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+def format_summary(summary):
+    """
+    format phase summary as a plain text table, share is computed over top-level phases only
+    time is wall-clock time, busy the summed time of concurrent spans
+    """
+    total = sum(phase["time"] for name, phase in summary.items() if name in PHASES)
+    lines = [f"{'phase':<20}{'count':>8}{'time (s)':>12}{'busy (s)':>12}{'share':>8}  extra"]
+    for name, phase in sorted(summary.items(), key=lambda item: -item[1]["time"]):
+        extra = ", ".join(f"{key}={value}" for key, value in phase.items() if key not in ("time", "count", "busy"))
+        share = phase["time"] / total if total > 0 else 0.0
+        lines.append(f"{name:<20}{phase['count']:>8}{phase['time']:>12.2f}{phase['busy']:>12.2f}{share:>8.1%}  {extra}")
+    return "\n".join(lines)
+
+
+def phase_results(summary):
+    """
+    flatten phase summary into rollout_info entries, Time_<phase> keys are averaged and logged as timing stats
+    """
+    results = {f"Time_{phase}": summary[phase]["time"] for phase in PHASES}
+    requests = summary.get("client_request", {})
+    results["Prompt_Tokens"] = requests.get("prompt_tokens", 0)
+    results["Completion_Tokens"] = requests.get("completion_tokens", 0)
+    results["Payload_Bytes"] = requests.get("payload_bytes", 0)
+    return results
+
+
+def format_phase_times(rollout_logs):
+    """
+    format Time_<phase> entries of (averaged) rollout logs as a plain text table
+    """
+    total = sum(rollout_logs.get(f"Time_{phase}", 0.0) for phase in PHASES)
+    lines = [f"{'phase':<20}{'time (s)':>12}{'share':>8}"]
+    for phase in sorted(PHASES, key=lambda phase: -rollout_logs.get(f"Time_{phase}", 0.0)):
+        value = rollout_logs.get(f"Time_{phase}", 0.0)
+        share = value / total if total > 0 else 0.0
+        lines.append(f"{phase:<20}{value:>12.2f}{share:>8.1%}")
+    return "\n".join(lines)
+
+
+def traced(category, name=None):
+    """
+    decorator recording each call of the function as a span of the given category
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with TRACER.span(name or func.__qualname__, category):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# process-wide tracer shared by agents, clients and rollout scripts
+TRACER = Tracer()